@@ -1,3 +1,4 @@
+from collections import defaultdict
 from typing import Literal
 
 from meilisearch import Client
@@ -5,18 +6,10 @@ from meilisearch import Client
 from django.conf import settings
 from django.db import transaction, models
 
-from core.speeds.models import Speed
+from core.speeds.models import Speed, MeilisearchTask, SearchOutbox
 from . import logger
 
 
-def run_if_not_disabled(method):
-    def wrapper(self, *args, **kwargs):
-        if not self.is_disabled():
-            method(self, *args, **kwargs)
-
-    return wrapper
-
-
 class MeilisearchClient(Client):
     django_settings = settings
 
@@ -38,6 +31,50 @@ class MeilisearchClient(Client):
             ]
         }
         self.index_models = {Speed.__name__.lower() + "s": Speed}
+        # ref: `updatespeedsindex` and `reindexspeeds` management commands
+        self.index_settings = {
+            "speeds": {
+                "rankingRules": [
+                    "words",
+                    "typo",
+                    "proximity",
+                    "attribute",
+                    "sort",
+                    "exactness",
+                ],
+                "searchableAttributes": [
+                    "name",
+                    "description",
+                    "speed_type",
+                ],
+                "displayedAttributes": [
+                    *self.displayed_attributes_dict["speeds"]
+                ],
+                "sortableAttributes": [],
+                "stopWords": [
+                    "the",
+                    "a",
+                    "an",
+                    "is",
+                    "on",
+                    "in",
+                    "of",
+                    "and",
+                    "to",
+                    "with",
+                    "for",
+                    "can",
+                    "be",
+                    "at",
+                ],
+                "typoTolerance": {
+                    "enabled": True,
+                    "minWordSizeForTypos": {"oneTypo": 6, "twoTypos": 10},
+                    "disableOnAttributes": ["description", "speed_type"],
+                },
+                "pagination": {"maxTotalHits": 10},
+            }
+        }
 
         for index_name, model in self.index_models.items():
             fields = [field.name for field in model._meta.get_fields()]
@@ -62,37 +99,165 @@ class MeilisearchClient(Client):
             return False
         return True
 
-    @run_if_not_disabled
-    def sync_document(
+    def get_batch_size(self) -> int:
+        return self.django_settings.MEILISEARCH["BATCH_SIZE"]
+
+    def get_batch_window(self) -> float:
+        return self.django_settings.MEILISEARCH["BATCH_WINDOW"]
+
+    def get_instance_document(self, index_name: Literal["speeds"], instance) -> dict:
+        """
+        Builds a document from the current state of a row, the same way `SpeedBaseHyperlinkedSerializer` does.
+        """
+        document = {}
+        for attr in self.displayed_attributes_dict[index_name]:
+            value = getattr(instance, attr)
+            if attr == "id":
+                value = str(value)
+            elif attr == "user":
+                value = value.username if value is not None else None
+            document[attr] = value
+        return document
+
+    def drain_outbox(self, index_name: Literal["speeds"], limit: None | int = None) -> int:
+        """
+        Sends the latest state of rows of up to `limit` outbox entries with one `update_documents` call,
+        and deleted documents with one `delete_documents` call.
+        Entries are locked with `SKIP LOCKED` so concurrent drainers don't send the same documents,
+        and are deleted in the same transaction, if sending fails they are drained again.
+        Returns the number of drained entries.
+        """
+        model = self.index_models[index_name]
+        limit = limit or self.get_batch_size()
+
+        with transaction.atomic():
+            entries = list(
+                SearchOutbox.objects.select_for_update(skip_locked=True)
+                .filter(index_name=index_name)
+                .order_by("updated_at")[:limit]
+            )
+            if not entries:
+                return 0
+
+            instances = model.objects.select_related("user").in_bulk(
+                [entry.document_id for entry in entries]
+            )
+            pending, deleted_ids = [], []
+            for entry in entries:
+                if entry.action == SearchOutbox.Action.DELETE:
+                    deleted_ids.append(str(entry.document_id))
+                    continue
+                instance = instances.get(entry.document_id)
+                # already deleted, ref: `core.speeds.tasks.delete_meilisearch_deleted_user_data`
+                if instance is None:
+                    continue
+                pending.append((entry.action, self.get_instance_document(index_name, instance)))
+
+            self.sync_documents(index_name, pending)
+            self.delete_documents(index_name, deleted_ids)
+            SearchOutbox.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+
+        return len(entries)
+
+    def sync_documents(
         self,
         index_name: Literal["speeds"],
-        action: Literal["add", "update"],
-        data: dict,
+        pending: list[tuple[Literal["add", "update"], dict]],
     ) -> None:
-        with transaction.atomic():
-            try:
-                model: models.Model = self.index_models[index_name]
-                data = {
-                    key: val
-                    for key, val in data.items()
-                    if key in self.displayed_attributes_dict[index_name]
-                }
-                pk = data["id"]
-                instance = model.objects.select_for_update().get(pk=pk)
-            except Exception as e:
-                logger.error(f"{__name__}; {str(e)}")
-                return
-
-            document: dict = data
-            task_info = self.index(index_name).update_documents([document])
-
-            if self.task_succeeded(task_info):
-                if action == "add":
-                    instance.mark_added_to_meilisearch()
-                elif action == "update":
-                    instance.mark_synced_in_meilisearch()
+        """
+        Sends documents with one `update_documents` call and records the Meilisearch task,
+        without waiting for it.
+        """
+        if not pending:
+            return
+
+        task_info = self.index(index_name).update_documents(
+            [document for _, document in pending]
+        )
+        # rows are marked by `reconcile_tasks` once the task has succeeded
+        updated = [document for action, document in pending if action == "update"]
+        MeilisearchTask.objects.create(
+            task_uid=task_info.task_uid,
+            index_name=index_name,
+            added_ids=[document["id"] for action, document in pending if action == "add"],
+            updated_ids=[document["id"] for document in updated],
+            updated_scores=[document.get("score") for document in updated],
+        )
+
+    def delete_documents(self, index_name: Literal["speeds"], document_ids: list[str]) -> None:
+        """
+        Deletes documents with one `delete_documents` call and records the Meilisearch task,
+        without waiting for it.
+        """
+        if not document_ids:
+            return
+
+        task_info = self.index(index_name).delete_documents(document_ids)
+        # failed deletes are queued again by `reconcile_tasks`
+        MeilisearchTask.objects.create(
+            task_uid=task_info.task_uid,
+            index_name=index_name,
+            deleted_ids=document_ids,
+        )
+
+    def reconcile_tasks(self, limit: int = 1000) -> int:
+        """
+        Checks statuses of pending Meilisearch tasks with one `get_tasks` call,
+        marks rows of succeeded tasks with one `UPDATE` per index and action.
+        Updated rows are marked only if their scores are still the sent ones,
+        rows changed after the send are synced again, deletes of failed tasks are queued again.
+        Returns the number of reconciled tasks.
+        """
+        # tasks are processed in the order of their uids, the latest sent score of a row counts
+        pending_tasks = list(MeilisearchTask.objects.order_by("task_uid")[:limit])
+        if not pending_tasks:
+            return 0
+
+        results = self.get_tasks(
+            {
+                "uids": [str(pending_task.task_uid) for pending_task in pending_tasks],
+                "limit": len(pending_tasks),
+            }
+        )
+        statuses = {task.uid: task.status for task in results.results}
+
+        reconciled = []
+        added_ids, updated_scores = defaultdict(list), defaultdict(dict)
+        deleted_ids = defaultdict(list)
+        for pending_task in pending_tasks:
+            status = statuses.get(pending_task.task_uid)
+            if status in ("enqueued", "processing"):
+                continue
+
+            if status == "succeeded":
+                added_ids[pending_task.index_name] += pending_task.added_ids
+                updated_scores[pending_task.index_name].update(
+                    zip(pending_task.updated_ids, pending_task.updated_scores)
+                )
             else:
-                logger.error(f"{__name__}; {pk} was not {action}ed!")
+                # scores of not marked updated rows are synced again by the
+                # `synchronize_scores_in_meilisearch` task, documents of failed adds aren't
+                # retried, they are restored by the `reindexspeeds` command
+                deleted_ids[pending_task.index_name] += pending_task.deleted_ids
+                synced = pending_task.added_ids + pending_task.updated_ids + pending_task.deleted_ids
+                logger.error(
+                    f"{__name__}; the task {pending_task.task_uid} has {status or 'not been found'}, "
+                    + f"{len(synced)} documents were not synced!"
+                )
+            reconciled.append(pending_task.pk)
+
+        with transaction.atomic():
+            for index_name, ids in added_ids.items():
+                self.index_models[index_name].bulk_mark_added_to_meilisearch(ids)
+            for index_name, scores in updated_scores.items():
+                self.index_models[index_name].bulk_mark_synced_in_meilisearch(
+                    list(scores), list(scores.values())
+                )
+            for index_name, ids in deleted_ids.items():
+                SearchOutbox.enqueue(index_name, SearchOutbox.Action.DELETE, ids)
+            MeilisearchTask.objects.filter(pk__in=reconciled).delete()
+
+        return len(reconciled)
 
 
 URL = settings.MEILISEARCH["URL"]
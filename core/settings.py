@@ -383,6 +383,12 @@ MEILISEARCH = {
     "disabled": bool(int(get_env_variable("MEILISEARCH_DISABLED"))) or TESTING,
     "MASTER_KEY": None,
     "URL": None,
+    # the search outbox is drained every `BATCH_WINDOW` seconds,
+    # up to `BATCH_SIZE` documents are sent in one `update_documents` call
+    "BATCH_SIZE": int(os.environ.get("MEILISEARCH_BATCH_SIZE", "500")),
+    "BATCH_WINDOW": float(os.environ.get("MEILISEARCH_BATCH_WINDOW", "2")),
+    # statuses of Meilisearch tasks are checked every `RECONCILE_INTERVAL` seconds
+    "RECONCILE_INTERVAL": float(os.environ.get("MEILISEARCH_RECONCILE_INTERVAL", "5")),
 }
 
 if not MEILISEARCH["disabled"]:
@@ -390,6 +396,54 @@ if not MEILISEARCH["disabled"]:
     MEILISEARCH["URL"] = get_env_variable("MEILISEARCH_URL")
 
 
+# Speeds settings
+
+SPEEDS = {
+    # votes are counted in Redis and periodically folded into `Speed` rows,
+    # ref: `core.speeds.services.VoteCounter`
+    "VOTES_WRITE_BEHIND": bool(int(os.environ.get("SPEEDS_VOTES_WRITE_BEHIND", "0")))
+    and not TESTING,
+    "VOTES_FLUSH_INTERVAL": float(os.environ.get("SPEEDS_VOTES_FLUSH_INTERVAL", "10")),
+    # votes are counted in `SpeedCounters` rows, changed counters are copied into `Speed` rows
+    # every this many seconds, ref: `core.speeds.models.SpeedCounters.fold`
+    "COUNTERS_FOLD_INTERVAL": float(os.environ.get("SPEEDS_COUNTERS_FOLD_INTERVAL", "60")),
+    # the number of items cap of the `bulk` endpoint
+    "BULK_CREATE_MAX_SIZE": 100,
+    # the number of items cap of the `speeds-feedback` `batch` endpoint
+    "FEEDBACK_BATCH_MAX_SIZE": 100,
+    # a time-decayed "hot" ranking of speeds, a vote's weight halves every `HOT_HALF_LIFE` seconds,
+    # it's recomputed from votes every `HOT_REBUILD_INTERVAL` seconds, ref: `core.speeds.services.HotSpeeds`
+    "HOT_HALF_LIFE": int(os.environ.get("SPEEDS_HOT_HALF_LIFE", str(60 * 60 * 12))),
+    "HOT_REBUILD_INTERVAL": float(os.environ.get("SPEEDS_HOT_REBUILD_INTERVAL", "3600")),
+    # the `k` query param cap of the `hot` endpoint
+    "HOT_LIST_MAX_SIZE": 50,
+    # the `k` query param cap of the `leaderboard` endpoint,
+    # ref: `core.speeds.leaderboards.SpeedLeaderboards`
+    "LEADERBOARD_MAX_SIZE": 50,
+    # leaderboards (and their tracked tags) are rebuilt from PostgreSQL every this many seconds
+    "LEADERBOARD_REBUILD_INTERVAL": float(
+        os.environ.get("SPEEDS_LEADERBOARD_REBUILD_INTERVAL", "3600")
+    ),
+    # the `k` query param cap of the `random-list` endpoint
+    "RANDOM_LIST_MAX_SIZE": 50,
+    # random speeds pools are cached for each speed type and for this many most popular tags
+    "RANDOM_POOL_TAGS": 20,
+    # anonymous `list` and `retrieve` responses are cached in Redis,
+    # ref: `core.speeds.cache.SpeedResponseCache`
+    "RESPONSE_CACHE": bool(int(os.environ.get("SPEEDS_RESPONSE_CACHE", "1")))
+    and not TESTING,
+    "RESPONSE_CACHE_TTL": int(os.environ.get("SPEEDS_RESPONSE_CACHE_TTL", "300")),
+    # public parts of `Speed` representations of paginated lists are cached in Redis,
+    # ref: `core.speeds.cache.SpeedFragmentCache`
+    "FRAGMENT_CACHE": bool(int(os.environ.get("SPEEDS_FRAGMENT_CACHE", "1")))
+    and not TESTING,
+    "FRAGMENT_CACHE_TTL": int(os.environ.get("SPEEDS_FRAGMENT_CACHE_TTL", "3600")),
+    # paginated lists are serialized from `.values_list()` rows,
+    # ref: `core.speeds.serializers.SpeedFastListSerializer`
+    "FAST_LIST_SERIALIZER": True,
+}
+
+
 # OAuth settings
 
 OAUTH_PROVIDERS = {
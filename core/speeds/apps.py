@@ -1,4 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
+
+from .signals import (
+    handle_speed_change,
+    handle_user_speed_data_change,
+    handle_speed_leaderboards_change,
+    handle_speed_feedback_delete,
+    handle_hot_speeds_change,
+)
 
 
 class SpeedsConfig(AppConfig):
@@ -6,4 +15,17 @@ class SpeedsConfig(AppConfig):
     name = "core.speeds"
 
     def ready(self) -> None:
+        from .models import Speed, SpeedFeedback, SpeedBookmark
+
+        post_save.connect(receiver=handle_speed_change, sender=Speed)
+        post_delete.connect(receiver=handle_speed_change, sender=Speed)
+        post_save.connect(receiver=handle_speed_leaderboards_change, sender=Speed)
+        post_delete.connect(receiver=handle_speed_leaderboards_change, sender=Speed)
+        post_save.connect(receiver=handle_hot_speeds_change, sender=Speed)
+        post_delete.connect(receiver=handle_hot_speeds_change, sender=Speed)
+        post_delete.connect(receiver=handle_speed_feedback_delete, sender=SpeedFeedback)
+        for model in (SpeedFeedback, SpeedBookmark):
+            post_save.connect(receiver=handle_user_speed_data_change, sender=model)
+            post_delete.connect(receiver=handle_user_speed_data_change, sender=model)
+
         return super().ready()
@@ -0,0 +1,334 @@
+"""
+Benchmarks for the `speeds` app, ran by the `benchmarkspeeds` management command.
+
+Seeded rows are real rows in the configured database, `Speed` objects are tagged with
+the `BENCHMARK_TAG` tag and owned by `benchmark-<n>` users, `cleanup` removes all of them.
+"""
+
+import time
+from math import ceil
+from statistics import median
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.functions import Random
+
+from .models import Speed, SpeedFeedback, SpeedBookmark, SpeedReport
+from .queries import SpeedQueries
+from .services import (
+    set_user_speed_data,
+    cache_random_speeds_pool,
+    get_random_speeds_pools,
+    r,
+    RANDOM_SPEEDS_POOL_PREFIX,
+    RANDOM_SPEEDS_POOL_POINTER_PREFIX,
+)
+
+
+BENCHMARK_TAG = "benchmark"
+BENCHMARK_USERNAME_PREFIX = "benchmark-"
+# random speeds pools are refreshed under scratch names, served pools are never replaced
+BENCHMARK_POOL_PREFIX = "benchmark:"
+
+
+def get_benchmark_users():
+    return get_user_model().objects.filter(
+        username__startswith=BENCHMARK_USERNAME_PREFIX
+    )
+
+
+def seed(speeds: int, feedback: int, bookmarks_per_user: int = 1000) -> dict:
+    """
+    Inserts `speeds` public and private `Speed` rows and `feedback` `SpeedFeedback` rows,
+    every benchmark user votes at most once for a single `Speed` object.
+    """
+    users = max(1, ceil(feedback / speeds))
+
+    user_table = get_user_model()._meta.db_table
+    speed_table = Speed._meta.db_table
+    feedback_table = SpeedFeedback._meta.db_table
+    bookmark_table = SpeedBookmark._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {user_table} (
+                id, password, last_login, is_superuser, email, email_verified, username,
+                created_at, updated_at, is_admin, is_active, is_banned, oauth_providers
+            )
+            SELECT
+                gen_random_uuid(), '!', NULL, false, %(prefix)s || n || '@v', true, %(prefix)s || n,
+                now(), now(), false, true, false, '{{}}'
+            FROM generate_series(1, %(users)s) AS n
+            ON CONFLICT DO NOTHING
+            """,
+            {"prefix": BENCHMARK_USERNAME_PREFIX, "users": users},
+        )
+
+        cursor.execute(
+            f"""
+            WITH benchmark_users AS (
+                SELECT array_agg(id ORDER BY username) AS ids
+                FROM {user_table}
+                WHERE username LIKE %(prefix)s || '%%'
+            )
+            INSERT INTO {speed_table} (
+                id, name, description, speed_type, tags, kmph, estimated, user_id, is_public,
+                created_at, updated_at, downvotes, upvotes, score,
+                is_synced_in_meilisearch, is_added_to_meilisearch
+            )
+            SELECT
+                gen_random_uuid(),
+                'benchmark name ' || n,
+                'benchmark description ' || n,
+                (ARRAY['average', 'top', 'constant', 'relative'])[1 + n %% 4],
+                ARRAY[%(tag)s, 'tag' || (n %% 100)],
+                1 + random() * 1000,
+                false,
+                benchmark_users.ids[1 + n %% array_length(benchmark_users.ids, 1)],
+                n %% 10 <> 0,
+                now() - n * interval '1 second',
+                now() - n * interval '1 second',
+                0, 1, 1,
+                false, false
+            FROM generate_series(1, %(speeds)s) AS n, benchmark_users
+            """,
+            {"prefix": BENCHMARK_USERNAME_PREFIX, "tag": BENCHMARK_TAG, "speeds": speeds},
+        )
+
+        cursor.execute(
+            f"""
+            INSERT INTO {feedback_table} (vote, created_at, updated_at, user_id, speed_id)
+            SELECT
+                CASE WHEN random() < 0.8 THEN 1 ELSE -1 END, now(), now(), u.id, s.id
+            FROM {user_table} AS u
+            CROSS JOIN LATERAL (
+                SELECT id FROM {speed_table}
+                WHERE tags @> ARRAY[%(tag)s]::varchar(20)[]
+                LIMIT %(per_user)s
+            ) AS s
+            WHERE u.username LIKE %(prefix)s || '%%'
+            ON CONFLICT DO NOTHING
+            """,
+            {
+                "prefix": BENCHMARK_USERNAME_PREFIX,
+                "tag": BENCHMARK_TAG,
+                "per_user": ceil(feedback / users),
+            },
+        )
+
+        cursor.execute(
+            f"""
+            INSERT INTO {bookmark_table} (category, created_at, updated_at, user_id, speed_id)
+            SELECT 'favorites', now(), now(), u.id, s.id
+            FROM {user_table} AS u
+            CROSS JOIN LATERAL (
+                SELECT id FROM {speed_table}
+                WHERE tags @> ARRAY[%(tag)s]::varchar(20)[]
+                ORDER BY updated_at DESC
+                LIMIT %(per_user)s
+            ) AS s
+            WHERE u.username LIKE %(prefix)s || '%%'
+            ON CONFLICT DO NOTHING
+            """,
+            {
+                "prefix": BENCHMARK_USERNAME_PREFIX,
+                "tag": BENCHMARK_TAG,
+                "per_user": bookmarks_per_user,
+            },
+        )
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {speed_table}, {feedback_table}, {bookmark_table}")
+
+    return {"users": users, "speeds": speeds, "feedback": feedback}
+
+
+def cleanup() -> None:
+    speeds = Speed.objects.filter(tags__contains=[BENCHMARK_TAG])
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # votes of deleted `Speed` objects aren't subtracted one by one,
+            # ref: `core.speeds.signals.handle_speed_feedback_delete`
+            cursor.execute(
+                f"""
+                DELETE FROM {SpeedFeedback._meta.db_table} AS f
+                USING {Speed._meta.db_table} AS s
+                WHERE s.id = f.speed_id AND s.tags @> ARRAY[%s]::varchar(20)[]
+                """,
+                [BENCHMARK_TAG],
+            )
+        SpeedBookmark.objects.filter(speed__in=speeds).delete()
+        SpeedReport.objects.filter(speed__in=speeds).delete()
+        # skips collecting millions of objects in Python, related rows are already deleted
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {Speed._meta.db_table} WHERE tags @> ARRAY[%s]::varchar(20)[]",
+                [BENCHMARK_TAG],
+            )
+        get_benchmark_users().delete()
+
+
+def measure(func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        timestamp = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - timestamp) * 1000)
+    return {"min_ms": min(timings), "median_ms": median(timings)}
+
+
+def benchmark_user_speed_data(
+    repeat: int = 5, page_size: int = 10, pages: tuple[int, ...] = (1, 100, 10_000)
+) -> list[dict]:
+    """
+    Compares `SpeedQueries.annotate_user_speed_data` (per row `ArraySubquery`)
+    with `services.set_user_speed_data` (per page `IN (...)` queries).
+    """
+    user = get_benchmark_users().order_by("username").first()
+    if user is None:
+        raise ValueError("Benchmark data is missing, run the `seed` subcommand first.")
+
+    def annotated(offset):
+        queryset = SpeedQueries.get_authenticated_user_query(
+            user, "public_and_personal"
+        )
+        for speed in queryset[offset : offset + page_size]:
+            speed.user_speed_feedback, speed.user_speed_bookmark
+
+    def overlaid(offset):
+        queryset = SpeedQueries.get_authenticated_user_query(
+            user, "public_and_personal", with_user_speed_data=False
+        )
+        set_user_speed_data(list(queryset[offset : offset + page_size]), user)
+
+    results = []
+    for page in pages:
+        offset = (page - 1) * page_size
+        for strategy, func in (("annotate", annotated), ("overlay", overlaid)):
+            results.append(
+                {
+                    "strategy": strategy,
+                    "page": page,
+                    **measure(lambda: func(offset), repeat),
+                }
+            )
+    return results
+
+
+def benchmark_random_pool(
+    repeat: int = 3,
+    sizes: tuple[int, ...] = (100_000, 1_000_000, 10_000_000),
+    limit: int = 1200,
+) -> list[dict]:
+    """
+    Compares `ORDER BY random()` with `SpeedQueries.get_random_sample_ids` (`TABLESAMPLE SYSTEM`)
+    at each table size, `refresh` writes all pools of `services.cache_random_speeds`
+    (under scratch names, deleted afterwards).
+    Benchmark data is reseeded for every size and deleted afterwards.
+    """
+
+    def refresh():
+        for pool_name, filters in get_random_speeds_pools().items():
+            cache_random_speeds_pool(f"{BENCHMARK_POOL_PREFIX}{pool_name}", limit, **filters)
+
+    results = []
+    for size in sizes:
+        cleanup()
+        seed(speeds=size, feedback=0, bookmarks_per_user=0)
+
+        def order_by_random():
+            list(
+                Speed.objects.filter(is_public=True, score__gt=0)
+                .order_by(Random())
+                .values_list("id", flat=True)[:limit]
+            )
+
+        strategies = (
+            ("order_by_random", order_by_random),
+            ("tablesample", lambda: SpeedQueries.get_random_sample_ids(limit)),
+            ("refresh", refresh),
+        )
+        for strategy, func in strategies:
+            results.append(
+                {"strategy": strategy, "rows": size, **measure(func, repeat)}
+            )
+    cleanup()
+    for pattern in (
+        f"{RANDOM_SPEEDS_POOL_PREFIX}{BENCHMARK_POOL_PREFIX}*",
+        f"{RANDOM_SPEEDS_POOL_POINTER_PREFIX}{BENCHMARK_POOL_PREFIX}*",
+    ):
+        keys = list(r.scan_iter(match=pattern))
+        if keys:
+            r.delete(*keys)
+    return results
+
+
+def benchmark_list_serializers(
+    repeat: int = 5, page_sizes: tuple[int, ...] = (10, 100, 1000)
+) -> list[dict]:
+    """
+    Compares `SpeedBaseHyperlinkedSerializer` (anonymous users) and `SpeedHyperlinkedSerializer`
+    (authenticated users) with `SpeedFastListSerializer`, queries are not measured.
+    `identical` tells whether rendered outputs are byte-identical.
+    """
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from django.contrib.auth.models import AnonymousUser
+
+    from .serializers import (
+        SpeedBaseHyperlinkedSerializer,
+        SpeedHyperlinkedSerializer,
+        SpeedFastListSerializer,
+        SpeedListRow,
+    )
+
+    user = get_benchmark_users().order_by("username").first()
+    if user is None:
+        raise ValueError("Benchmark data is missing, run the `seed` subcommand first.")
+
+    results = []
+    for page_size in page_sizes:
+        for serializer_class, request_user in (
+            (SpeedBaseHyperlinkedSerializer, AnonymousUser()),
+            (SpeedHyperlinkedSerializer, user),
+        ):
+            request = Request(
+                APIRequestFactory().get("/speeds/", HTTP_HOST=settings.ALLOWED_HOSTS[0])
+            )
+            request.user = request_user
+            context = {"request": request, "format": None, "view": None}
+
+            queryset = SpeedQueries.get_authenticated_user_query(
+                user, "public_and_personal", with_user_speed_data=False
+            )[:page_size]
+            speeds = list(queryset)
+            rows = [
+                SpeedListRow(row)
+                for row in SpeedFastListSerializer.get_values_queryset(queryset)
+            ]
+            if request_user.is_authenticated:
+                set_user_speed_data(speeds, user)
+                set_user_speed_data(rows, user)
+
+            drf = JSONRenderer().render(
+                serializer_class(speeds, many=True, context=context).data
+            )
+            fast = JSONRenderer().render(SpeedFastListSerializer(rows, context).data)
+
+            for strategy, func in (
+                ("drf", lambda: serializer_class(speeds, many=True, context=context).data),
+                ("fast", lambda: SpeedFastListSerializer(rows, context).data),
+            ):
+                results.append(
+                    {
+                        "strategy": strategy,
+                        "user": "authenticated" if request_user.is_authenticated else "anonymous",
+                        "page_size": page_size,
+                        "identical": drf == fast,
+                        **measure(func, repeat),
+                    }
+                )
+    return results
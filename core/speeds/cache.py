@@ -0,0 +1,314 @@
+import time
+from hashlib import sha1
+from uuid import uuid4
+from urllib.parse import urlencode
+
+from redis.exceptions import RedisError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import logger
+
+
+r = cache.client.get_client()
+
+
+# Returns the generation and the entry of it (if it exists) with a single round trip.
+# KEYS[1] - the generation counter, ARGV[1] - the entry's key prefix.
+GET_ENTRY_SCRIPT = r.register_script(
+    """
+    local generation = redis.call('GET', KEYS[1]) or '0'
+    return {generation, redis.call('GET', ARGV[1] .. generation)}
+    """
+)
+
+
+# Returns the epoch (set to `ARGV[1]` if it doesn't exist), generations of `KEYS[2..]`
+# and timestamps of their last changes (`<key>:modified_at`).
+# KEYS[1] - the epoch.
+GET_GENERATIONS_SCRIPT = r.register_script(
+    """
+    redis.call('SET', KEYS[1], ARGV[1], 'NX')
+    local generations = {redis.call('GET', KEYS[1])}
+    local timestamps = {}
+    for i = 2, #KEYS do
+        generations[#generations + 1] = redis.call('GET', KEYS[i]) or '0'
+        timestamps[#timestamps + 1] = redis.call('GET', KEYS[i] .. ':modified_at') or ''
+    end
+    for _, timestamp in ipairs(timestamps) do
+        generations[#generations + 1] = timestamp
+    end
+    return generations
+    """
+)
+
+
+class SpeedResponseCache:
+    """
+    A response cache of anonymous `SpeedViewSet` `list` and `retrieve` actions
+    (enabled by `settings.SPEEDS["RESPONSE_CACHE"]`), anonymous responses are the same for everyone.
+    Entries are keyed by a generation counter, `bump` increments counters of the list
+    and of changed `Speed` objects, so stale entries are never read again and expire with their TTL.
+    A missing entry is rebuilt by a single worker, others wait for it (a thundering herd guard).
+    """
+
+    list_generation = "speeds_response_generation:list"
+    epoch = "speeds_response_generation:epoch"
+    lock_timeout_ms = 5000
+    wait_timeout = 2.0
+    wait_interval = 0.05
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.SPEEDS["RESPONSE_CACHE"]
+
+    @classmethod
+    def is_cacheable(cls, request, action: str) -> bool:
+        return (
+            cls.is_enabled()
+            and action in ("list", "retrieve")
+            and request.method == "GET"
+            and not request.user.is_authenticated
+            and request.accepted_renderer.format == "json"
+        )
+
+    @classmethod
+    def get_generation_key(cls, speed_id=None) -> str:
+        if speed_id is None:
+            return cls.list_generation
+        return f"speeds_response_generation:{speed_id}"
+
+    @classmethod
+    def get_user_generation_key(cls, user_id) -> str:
+        return f"speeds_response_generation:user:{user_id}"
+
+    @classmethod
+    def get_list_generations(cls, user_id=None) -> tuple[list, None | int]:
+        """
+        Returns the epoch and generations of lists (and of the user's feedback and bookmarks),
+        and the latest timestamp of their changes, with a single round trip.
+        The epoch changes if Redis loses counters, a reset counter never repeats an older `ETag`,
+        ref: `core.speeds.conditional.SpeedConditionalGet`.
+        """
+        keys = [cls.epoch, cls.list_generation]
+        if user_id is not None:
+            keys.append(cls.get_user_generation_key(user_id))
+        values = GET_GENERATIONS_SCRIPT(keys=keys, args=[uuid4().hex])
+
+        generations = [value.decode("utf-8") for value in values[: len(keys)]]
+        timestamps = [int(value) for value in values[len(keys) :] if value]
+        return generations, max(timestamps, default=None)
+
+    @staticmethod
+    def get_entry_key_prefix(request, action: str, speed_id=None) -> str:
+        """
+        Query params are normalized (sorted keys and values), representations
+        contain absolute URLs, so the scheme and the host are a part of the key.
+        """
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+        )
+        digest = sha1(
+            "|".join(
+                [
+                    request.scheme,
+                    request.get_host(),
+                    action,
+                    str(speed_id),
+                    urlencode(params),
+                ]
+            ).encode("utf-8")
+        ).hexdigest()
+        return f"speeds_response:{digest}:"
+
+    @classmethod
+    def get_or_build(cls, request, action: str, build, speed_id=None):
+        """
+        Returns a cached response body or the response of `build`,
+        only successful responses are cached.
+        """
+        prefix = cls.get_entry_key_prefix(request, action, speed_id)
+        try:
+            # a missing entry is `false` in Lua, `None` here
+            generation, entry = GET_ENTRY_SCRIPT(
+                keys=[cls.get_generation_key(speed_id)], args=[prefix]
+            )
+            if entry is not None:
+                return cls.get_response(entry)
+
+            key = prefix + generation.decode("utf-8")
+            if not r.set(f"{key}:lock", 1, nx=True, px=cls.lock_timeout_ms):
+                # another worker is building the entry
+                deadline = time.monotonic() + cls.wait_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(cls.wait_interval)
+                    body, locked = r.mget([key, f"{key}:lock"])
+                    if body is not None:
+                        return cls.get_response(body)
+                    if locked is None:
+                        # the response wasn't cacheable
+                        break
+                return build()
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.get_or_build` has failed, {str(e)}"
+            )
+            return build()
+
+        try:
+            response = build()
+        except Exception:
+            # e.g. `NotFound`, waiting workers stop waiting and build responses themselves
+            cls.release_lock(key)
+            raise
+        try:
+            if response.status_code == 200:
+                # lists assembled from fragments are already rendered
+                body = (
+                    JSONRenderer().render(response.data)
+                    if isinstance(response, Response)
+                    else response.content
+                )
+                r.set(key, body, ex=settings.SPEEDS["RESPONSE_CACHE_TTL"])
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.get_or_build` has failed, {str(e)}"
+            )
+        cls.release_lock(key)
+        return response
+
+    @classmethod
+    def release_lock(cls, key: str) -> None:
+        # otherwise the lock expires after `lock_timeout_ms`
+        try:
+            r.delete(f"{key}:lock")
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.release_lock` has failed, {str(e)}"
+            )
+
+    @staticmethod
+    def get_response(body: bytes) -> HttpResponse:
+        return HttpResponse(body, content_type="application/json", status=200)
+
+    @classmethod
+    def bump(cls, speed_ids: list) -> None:
+        """
+        Invalidates cached lists and cached `Speed` objects of `speed_ids`,
+        and their fragments (ref: `SpeedFragmentCache`).
+        """
+        if not cls.is_enabled() and not SpeedFragmentCache.is_enabled():
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            if cls.is_enabled():
+                pipe.incr(cls.list_generation)
+                pipe.set(f"{cls.list_generation}:modified_at", int(time.time()))
+                # counters don't expire, a reset counter could point to an entry of an older generation
+                for speed_id in speed_ids:
+                    pipe.incr(cls.get_generation_key(speed_id))
+            if SpeedFragmentCache.is_enabled() and speed_ids:
+                pipe.delete(*[SpeedFragmentCache.get_key(speed_id) for speed_id in speed_ids])
+            pipe.execute()
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.bump` has failed, {str(e)}"
+            )
+
+    @classmethod
+    def bump_user(cls, user_id) -> None:
+        """
+        Invalidates validators of lists of a user whose feedback or bookmarks have changed.
+        """
+        if not cls.is_enabled():
+            return
+        try:
+            key = cls.get_user_generation_key(user_id)
+            pipe = r.pipeline(transaction=False)
+            pipe.incr(key)
+            pipe.set(f"{key}:modified_at", int(time.time()))
+            pipe.execute()
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.bump_user` has failed, {str(e)}"
+            )
+
+
+
+class SpeedFragmentCache:
+    """
+    A cache of pre-encoded public parts of `Speed` representations of paginated lists
+    (enabled by `settings.SPEEDS["FRAGMENT_CACHE"]`), fields from `id` to `user`
+    without braces, ref: `core.speeds.serializers.SpeedFastListSerializer.render`.
+    `url` (absolute, it depends on the host), `score` (votes are overlaid live) and data
+    of the user are encoded per request.
+
+    A fragment is stored under the `Speed` object's key with its `updated_at` and `username`,
+    a fragment of another version of the row is a miss (e.g. written by a request that has read
+    the row before a change). `SpeedResponseCache.bump` deletes fragments of changed `Speed` objects.
+    """
+
+    prefix = "speeds_fragment:"
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.SPEEDS["FRAGMENT_CACHE"]
+
+    @classmethod
+    def get_key(cls, speed_id) -> str:
+        return f"{cls.prefix}{speed_id}"
+
+    @staticmethod
+    def get_version(row) -> bytes:
+        return f"{row.updated_at.isoformat()}|{row.username or ''}|".encode("utf-8")
+
+    @classmethod
+    def get_many(cls, rows: list) -> list[None | bytes]:
+        """
+        Returns fragments of `rows` (`None` for missing and stale ones) with a single `MGET`.
+        """
+        if not rows:
+            return []
+        try:
+            values = r.mget([cls.get_key(row.id) for row in rows])
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.get_many` has failed, {str(e)}"
+            )
+            return [None] * len(rows)
+
+        fragments = []
+        for row, value in zip(rows, values):
+            version = cls.get_version(row)
+            if value is not None and value.startswith(version):
+                fragments.append(value[len(version) :])
+            else:
+                fragments.append(None)
+        return fragments
+
+    @classmethod
+    def set_many(cls, fragments: list[tuple]) -> None:
+        """
+        Stores `(row, fragment)` pairs with a single pipeline.
+        """
+        if not fragments:
+            return
+        try:
+            pipe = r.pipeline(transaction=False)
+            for row, fragment in fragments:
+                pipe.set(
+                    cls.get_key(row.id),
+                    cls.get_version(row) + fragment,
+                    ex=settings.SPEEDS["FRAGMENT_CACHE_TTL"],
+                )
+            pipe.execute()
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.set_many` has failed, {str(e)}"
+            )
@@ -0,0 +1,168 @@
+from hashlib import sha1
+
+from redis.exceptions import RedisError
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import logger
+from .cache import SpeedResponseCache
+from .models import SpeedCounters, SpeedFeedback, SpeedBookmark
+from .services import VoteCounter
+
+
+class SpeedConditionalGet:
+    """
+    Strong `ETag` and `Last-Modified` validators of `SpeedViewSet` `list` and `retrieve` actions,
+    a client with a matching `If-None-Match` (or `If-Modified-Since`) gets `304 Not Modified`
+    before the main query and serialization run.
+
+    Validators are probed only for conditional requests, other responses get an `ETag`
+    of their content. A conditional request with such an `ETag` gets `304 Not Modified`
+    (with probed validators) once the response is built, following requests are validated early.
+
+    Lists are validated by generation counters of `SpeedResponseCache` (a single Redis call),
+    without them (a disabled cache or a failed Redis call) only by an `ETag` of the content,
+    probing the whole filtered queryset would cost as much as the main query. `retrieve` probes
+    a single row. Votes of `VoteCounter` change list validators once they are flushed.
+    Vote counters are updated without touching `updated_at`, so `Last-Modified` is sent only
+    with generation counters, which keep timestamps of their bumps.
+    """
+
+    @staticmethod
+    def get_etag(*parts) -> str:
+        digest = sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+        return f'"{digest}"'
+
+    @staticmethod
+    def get_request_parts(view, speed_id=None) -> list:
+        request = view.request
+        return [
+            SpeedResponseCache.get_entry_key_prefix(request, view.action, speed_id),
+            request.accepted_renderer.format,
+            request.user.pk,
+        ]
+
+    @classmethod
+    def get_list_validators(cls, view) -> None | tuple[str, None | int]:
+        """
+        Returns `None` without generation counters, the content is validated once it's built.
+        """
+        if not SpeedResponseCache.is_enabled():
+            return None
+
+        user = view.request.user
+        try:
+            generations, last_modified = SpeedResponseCache.get_list_generations(
+                user.pk if user.is_authenticated else None
+            )
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.get_list_validators` has failed, {str(e)}"
+            )
+            return None
+        return cls.get_etag(*cls.get_request_parts(view), *generations), last_modified
+
+    @classmethod
+    def get_detail_validators(cls, view, speed_id) -> None | tuple[str, None | int]:
+        """
+        Returns `None` if the `Speed` object doesn't exist (or isn't visible to the user),
+        the action responds with `404 Not Found` then.
+        """
+        user = view.request.user
+        try:
+            row = (
+                view.get_queryset()
+                .filter(pk=speed_id)
+                .values_list("updated_at", "score", "upvotes", "downvotes")
+                .first()
+            )
+        except (DjangoValidationError, TypeError, ValueError):
+            return None
+        if row is None:
+            return None
+
+        parts = cls.get_request_parts(view, speed_id) + list(row)
+        # not yet folded votes, ref: `SpeedCounters`
+        parts.append(
+            SpeedCounters.objects.filter(speed_id=speed_id, is_folded=False)
+            .values_list("upvotes", "downvotes")
+            .first()
+        )
+        if VoteCounter.is_enabled():
+            try:
+                parts.append(VoteCounter.get_pending([speed_id]))
+            except RedisError as e:
+                logger.error(
+                    f"core.speeds.{__name__}; `{cls.__name__}.get_detail_validators` has failed, {str(e)}"
+                )
+                return None
+        if user.is_authenticated:
+            for model, field in ((SpeedFeedback, "vote"), (SpeedBookmark, "category")):
+                user_rows = list(
+                    model.objects.filter(user=user, speed_id=speed_id)
+                    .order_by("id")
+                    .values_list("id", field, "updated_at")
+                )
+                parts.append(user_rows)
+
+        return cls.get_etag(*parts), None
+
+    @staticmethod
+    def is_conditional(request) -> bool:
+        return "HTTP_IF_NONE_MATCH" in request.META or "HTTP_IF_MODIFIED_SINCE" in request.META
+
+    @classmethod
+    def respond(cls, request, get_validators, build):
+        """
+        Returns `304 Not Modified` if the client's copy is fresh, otherwise the response of `build`
+        with validators (only successful responses get them). `get_validators` is called only
+        for conditional requests, without validators the content is validated once it's built.
+        """
+        if not cls.is_conditional(request):
+            return cls.set_content_etag(request, build())
+
+        validators = get_validators()
+        if validators is None:
+            return cls.set_content_etag(request, build())
+        etag, last_modified = validators
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            return cls.set_content_etag(request, build(), validators)
+        return cls.set_validators(response, etag, last_modified)
+
+    @classmethod
+    def set_content_etag(cls, request, response, validators: None | tuple = None):
+        """
+        Sets an `ETag` of the rendered content of a successful response (a DRF `Response`
+        is rendered after the view returns). A client whose copy matches the content
+        gets `304 Not Modified` instead, with probed `validators` if there are any.
+        """
+        if response.status_code != 200:
+            return response
+
+        def callback(rendered):
+            content_etag = f'"{sha1(rendered.content).hexdigest()}"'
+            not_modified = get_conditional_response(request, etag=content_etag)
+            if not_modified is not None:
+                rendered = not_modified
+            if validators is None:
+                rendered["ETag"] = content_etag
+                return rendered
+            return cls.set_validators(rendered, *validators)
+
+        if getattr(response, "is_rendered", True):
+            return callback(response)
+        response.add_post_render_callback(callback)
+        return response
+
+    @staticmethod
+    def set_validators(response, etag: str, last_modified: None | int):
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -3,6 +3,15 @@ from functools import wraps
 from rest_framework.exceptions import PermissionDenied
 
 
+def check_unauthorized_create_and_data_reveal(user, speed) -> None:
+    """
+    Raises `PermissionDenied` if `user` isn't allowed to create (or update) objects
+    with a `speed` (Foreign Key) field of `speed`, ref: `prevent_unauthorized_create_and_data_reveal`.
+    """
+    if user != speed.user and speed.is_public == False:
+        raise PermissionDenied("You do not have permission to perform this action.")
+
+
 def prevent_unauthorized_create_and_data_reveal(func):
     """
     Decorate the `create` method of serializers that save objects with
@@ -27,10 +36,7 @@ def prevent_unauthorized_create_and_data_reveal(func):
         speed = validated_data["speed"]
         user = serializer_instance.context["request"].user
 
-        if user != speed.user and speed.is_public == False:
-            raise PermissionDenied(
-                "You do not have permission to perform this action."
-            )
+        check_unauthorized_create_and_data_reveal(user, speed)
 
         return func(*args, **kwargs)
 
@@ -0,0 +1,7 @@
+from rest_framework.exceptions import APIException
+
+
+class Gone(APIException):
+    status_code = 410
+    default_detail = "The resource is no longer available."
+    default_code = "gone"
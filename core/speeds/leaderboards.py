@@ -0,0 +1,287 @@
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import logger
+from .models import Speed, SpeedCounters, SpeedFeedback
+from .queries import SpeedQueries
+
+
+r = cache.client.get_client()
+
+
+# Removes the `ARGV[2]` member from all leaderboards, then (unless `ARGV[3]` is empty) adds it with
+# the `ARGV[3]` score and the `ARGV[4]` kmph to leaderboards of its speed type (`ARGV[6 + n]`)
+# and of its tracked tags (`ARGV[7 + n..]`). A changed speed type or tags would leave it in old ones.
+# KEYS[1] - the set of tracked tags, ARGV[1] - the key prefix, ARGV[6..5 + n] - all speed types.
+SYNC_LEADERBOARDS_SCRIPT = r.register_script(
+    """
+    local prefix, member = ARGV[1], ARGV[2]
+    local n = tonumber(ARGV[5])
+    local boards = {'all'}
+    for i = 6, 5 + n do
+        boards[#boards + 1] = 'speed_type:' .. ARGV[i]
+    end
+    for _, tag in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+        boards[#boards + 1] = 'tag:' .. tag
+    end
+    for _, board in ipairs(boards) do
+        redis.call('ZREM', prefix .. 'score:' .. board, member)
+        redis.call('ZREM', prefix .. 'kmph:' .. board, member)
+    end
+    if ARGV[3] == '' then
+        return 0
+    end
+
+    local current = {'all', 'speed_type:' .. ARGV[6 + n]}
+    for i = 7 + n, #ARGV do
+        if redis.call('SISMEMBER', KEYS[1], ARGV[i]) == 1 then
+            current[#current + 1] = 'tag:' .. ARGV[i]
+        end
+    end
+    for _, board in ipairs(current) do
+        redis.call('ZADD', prefix .. 'score:' .. board, ARGV[3], member)
+        redis.call('ZADD', prefix .. 'kmph:' .. board, ARGV[4], member)
+    end
+    return #current
+    """
+)
+
+
+# Sets `(member, score)` pairs (`ARGV[3 + n..]`) on `score` leaderboards the members are already on,
+# private (and not yet ranked) `Speed` objects stay off leaderboards.
+# KEYS[1] - the set of tracked tags, ARGV[1] - the key prefix, ARGV[3..2 + n] - all speed types.
+SET_LEADERBOARD_SCORES_SCRIPT = r.register_script(
+    """
+    local prefix = ARGV[1] .. 'score:'
+    local n = tonumber(ARGV[2])
+    local boards = {prefix .. 'all'}
+    for i = 3, 2 + n do
+        boards[#boards + 1] = prefix .. 'speed_type:' .. ARGV[i]
+    end
+    for _, tag in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+        boards[#boards + 1] = prefix .. 'tag:' .. tag
+    end
+    for i = 3 + n, #ARGV, 2 do
+        for _, board in ipairs(boards) do
+            redis.call('ZADD', board, 'XX', ARGV[i + 1], ARGV[i])
+        end
+    end
+    return 0
+    """
+)
+
+
+class SpeedLeaderboards:
+    """
+    Leaderboards of public `Speed` objects by `score` and by `kmph`, of all `Speed` objects,
+    of each `Speed.SpeedType` and of each of `settings.SPEEDS["RANDOM_POOL_TAGS"]` most popular tags,
+    in Redis sorted sets (`speeds_leaderboard:<metric>:<board>`, boards are named the same as
+    random speeds pools). Pages and ranks are read in O(log n), instead of sorting rows in PostgreSQL.
+
+    `Speed` objects are synced on save and delete (ref: `core.speeds.signals`), scores are set
+    where votes are counted, `rebuild` restores leaderboards (and tracked tags) from PostgreSQL.
+    """
+
+    prefix = "speeds_leaderboard:"
+    tags = "speeds_leaderboard_tags"
+    metrics = ("score", "kmph")
+    # fields of `Speed` objects that leaderboards depend on
+    fields = {"is_public", "speed_type", "tags", "kmph", "score"}
+    chunk_size = 5000
+
+    @classmethod
+    def get_key(cls, metric: str, board: str) -> str:
+        return f"{cls.prefix}{metric}:{board}"
+
+    @classmethod
+    def sync(
+        cls,
+        speed_id,
+        score: None | int,
+        kmph: float = 0,
+        speed_type: str = "",
+        tags: tuple = (),
+    ) -> None:
+        """
+        Moves a `Speed` object to leaderboards of its current speed type and tags,
+        a `None` score removes it from all leaderboards (private and deleted `Speed` objects).
+        """
+        try:
+            SYNC_LEADERBOARDS_SCRIPT(
+                keys=[cls.tags],
+                args=[
+                    cls.prefix,
+                    str(speed_id),
+                    "" if score is None else score,
+                    float(kmph),
+                    len(Speed.SpeedType.values),
+                    *Speed.SpeedType.values,
+                    speed_type,
+                    *tags,
+                ],
+            )
+        except RedisError as e:
+            # the next `rebuild` restores it
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.sync` has failed, {str(e)}"
+            )
+
+    @classmethod
+    def sync_instance(cls, instance: Speed) -> None:
+        if not instance.is_public:
+            cls.sync(instance.id, None)
+            return
+        # `Speed.score` is a folded copy, ref: `SpeedCounters`
+        score = (
+            SpeedCounters.objects.filter(speed_id=instance.id, is_folded=False)
+            .values_list("score", flat=True)
+            .first()
+        )
+        cls.sync(
+            instance.id,
+            instance.score if score is None else score,
+            instance.kmph,
+            instance.speed_type,
+            instance.tags,
+        )
+
+    @classmethod
+    def set_scores(cls, scores: dict) -> None:
+        """
+        Sets current scores (by `Speed` ids) of counted votes.
+        """
+        items = list(scores.items())
+        try:
+            for i in range(0, len(items), cls.chunk_size):
+                args = [cls.prefix, len(Speed.SpeedType.values), *Speed.SpeedType.values]
+                for speed_id, score in items[i : i + cls.chunk_size]:
+                    args += [str(speed_id), score]
+                SET_LEADERBOARD_SCORES_SCRIPT(keys=[cls.tags], args=args)
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.set_scores` has failed, {str(e)}"
+            )
+
+    @classmethod
+    def set_scores_on_commit(cls, scores: dict) -> None:
+        if scores:
+            transaction.on_commit(lambda: cls.set_scores(scores))
+
+    @classmethod
+    def get_page(
+        cls, metric: str, board: str, k: int, offset: int = 0
+    ) -> tuple[list[str], int]:
+        """
+        Returns up to `k` ids of a leaderboard from `offset` (highest first) and its size,
+        with a single round trip.
+        """
+        key = cls.get_key(metric, board)
+        pipe = r.pipeline(transaction=False)
+        pipe.zcard(key)
+        pipe.zrevrange(key, offset, offset + k - 1)
+        count, members = pipe.execute()
+        return [member.decode("utf-8") for member in members], count
+
+    @classmethod
+    def get_rank(cls, metric: str, board: str, speed_id) -> None | tuple[int, float, int]:
+        """
+        Returns the 0-based rank of a `Speed` object (highest first), its value and the size
+        of a leaderboard, with a single round trip, `None` if it isn't ranked.
+        """
+        key = cls.get_key(metric, board)
+        pipe = r.pipeline(transaction=False)
+        pipe.zrevrank(key, str(speed_id))
+        pipe.zscore(key, str(speed_id))
+        pipe.zcard(key)
+        rank, value, count = pipe.execute()
+        if rank is None:
+            return None
+        return rank, value, count
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        Rebuilds leaderboards from public `Speed` objects (with not yet folded counters) and picks
+        tracked tags anew, returns the number of ranked `Speed` objects. Leaderboards are written
+        under temporary keys and published together with a single `MULTI`. `Speed` objects changed
+        in the meantime are caught up from rows updated since the rebuild has started
+        (the same as `reindexspeeds` catches up documents).
+        """
+        from .services import get_random_speeds_pool_name
+
+        started_at = timezone.now()
+        tags = [
+            tag
+            for tag, _ in SpeedQueries.get_popular_tags(settings.SPEEDS["RANDOM_POOL_TAGS"])
+        ]
+        boards = [get_random_speeds_pool_name()]
+        boards += [
+            get_random_speeds_pool_name(speed_type=speed_type)
+            for speed_type in Speed.SpeedType.values
+        ]
+        boards += [get_random_speeds_pool_name(tag=tag) for tag in tags]
+        keys = [cls.get_key(metric, board) for metric in cls.metrics for board in boards]
+        for key in keys:
+            r.delete(f"{key}:building")
+
+        tracked_tags = set(tags)
+        mappings = {}
+        ranked = 0
+        queryset = SpeedQueries.get_leaderboards_query()
+        for speed_id, speed_type, speed_tags, kmph, score in queryset.iterator(
+            chunk_size=cls.chunk_size
+        ):
+            speed_boards = [
+                get_random_speeds_pool_name(),
+                get_random_speeds_pool_name(speed_type=speed_type),
+            ]
+            speed_boards += [
+                get_random_speeds_pool_name(tag=tag) for tag in speed_tags if tag in tracked_tags
+            ]
+            for board in speed_boards:
+                mappings.setdefault(cls.get_key("score", board), {})[str(speed_id)] = score
+                mappings.setdefault(cls.get_key("kmph", board), {})[str(speed_id)] = float(kmph)
+            ranked += 1
+            if ranked % cls.chunk_size == 0:
+                cls.write(mappings)
+                mappings = {}
+        cls.write(mappings)
+
+        previous_tags = {tag.decode("utf-8") for tag in r.smembers(cls.tags)}
+        pipe = r.pipeline(transaction=True)
+        for key in keys:
+            # an empty leaderboard has no temporary key
+            if r.exists(f"{key}:building"):
+                pipe.rename(f"{key}:building", key)
+            else:
+                pipe.delete(key)
+        for tag in previous_tags - tracked_tags:
+            for metric in cls.metrics:
+                pipe.delete(cls.get_key(metric, get_random_speeds_pool_name(tag=tag)))
+        pipe.delete(cls.tags)
+        if tags:
+            pipe.sadd(cls.tags, *tags)
+        pipe.execute()
+
+        changed_speed_ids = set(
+            SpeedFeedback.objects.filter(updated_at__gte=started_at)
+            .order_by()
+            .values_list("speed_id", flat=True)
+        )
+        changed_speed_ids.update(
+            Speed.objects.filter(updated_at__gte=started_at).values_list("id", flat=True)
+        )
+        for speed in Speed.objects.filter(id__in=changed_speed_ids):
+            cls.sync_instance(speed)
+        return ranked
+
+    @classmethod
+    def write(cls, mappings: dict) -> None:
+        pipe = r.pipeline(transaction=False)
+        for key, mapping in mappings.items():
+            pipe.zadd(f"{key}:building", mapping)
+        pipe.execute()
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from core.speeds import benchmarks
+
+
+class Command(BaseCommand):
+    help = """
+    Seeds benchmark data and runs benchmarks of the `speeds` app (available only if `DEBUG` is enabled).
+    Examples:
+        python3 manage.py benchmarkspeeds seed --speeds 1000000 --feedback 10000000
+        python3 manage.py benchmarkspeeds user-speed-data --repeat 5
+        python3 manage.py benchmarkspeeds random-pool --sizes 100000 1000000 10000000
+        python3 manage.py benchmarkspeeds list-serializers --page-sizes 10 100 1000
+        python3 manage.py benchmarkspeeds cleanup
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        subparsers = parser.add_subparsers(dest="subcommand", required=True)
+
+        seed = subparsers.add_parser("seed", help="Insert benchmark data.")
+        seed.add_argument("--speeds", type=int, default=1_000_000)
+        seed.add_argument("--feedback", type=int, default=10_000_000)
+
+        subparsers.add_parser("cleanup", help="Delete benchmark data.")
+
+        user_speed_data = subparsers.add_parser(
+            "user-speed-data",
+            help="Compare per row `ArraySubquery` annotations with the per page overlay.",
+        )
+        user_speed_data.add_argument("--repeat", type=int, default=5)
+        user_speed_data.add_argument("--page-size", type=int, default=10)
+
+        random_pool = subparsers.add_parser(
+            "random-pool",
+            help="Compare `ORDER BY random()` with `TABLESAMPLE` sampling of the random speeds pool, reseeds benchmark data.",
+        )
+        random_pool.add_argument("--repeat", type=int, default=3)
+        random_pool.add_argument(
+            "--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000]
+        )
+
+        list_serializers = subparsers.add_parser(
+            "list-serializers",
+            help="Compare DRF `Speed` serializers with the fast path list serializer.",
+        )
+        list_serializers.add_argument("--repeat", type=int, default=5)
+        list_serializers.add_argument(
+            "--page-sizes", type=int, nargs="+", default=[10, 100, 1000]
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError(
+                "Benchmarks insert data into the configured database, enable `DEBUG` to run them."
+            )
+
+        subcommand = options["subcommand"]
+        if subcommand == "seed":
+            seeded = benchmarks.seed(options["speeds"], options["feedback"])
+            self.stdout.write(self.style.SUCCESS(f"Seeded: {seeded}."))
+        elif subcommand == "cleanup":
+            benchmarks.cleanup()
+            self.stdout.write(self.style.SUCCESS("Benchmark data was deleted."))
+        elif subcommand == "user-speed-data":
+            self.write_results(
+                benchmarks.benchmark_user_speed_data(
+                    repeat=options["repeat"], page_size=options["page_size"]
+                )
+            )
+        elif subcommand == "random-pool":
+            self.write_results(
+                benchmarks.benchmark_random_pool(
+                    repeat=options["repeat"], sizes=tuple(options["sizes"])
+                )
+            )
+        elif subcommand == "list-serializers":
+            self.write_results(
+                benchmarks.benchmark_list_serializers(
+                    repeat=options["repeat"], page_sizes=tuple(options["page_sizes"])
+                )
+            )
+
+    def write_results(self, results: list[dict]) -> None:
+        if not results:
+            return
+        columns = list(results[0].keys())
+        self.stdout.write(" | ".join(f"{column:>12}" for column in columns))
+        for result in results:
+            self.stdout.write(
+                " | ".join(
+                    f"{value:>12.3f}" if isinstance(value, float) else f"{value!s:>12}"
+                    for value in result.values()
+                )
+            )
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.speeds.leaderboards import SpeedLeaderboards
+
+
+class Command(BaseCommand):
+    help = """
+    Rebuilds `score` and `kmph` leaderboards of public `Speed` objects in Redis from the database,
+    of all `Speed` objects, of each speed type and of each popular tag.
+    Leaderboards keep serving their previous versions until the rebuilt ones are published.
+    Examples:
+        python3 manage.py rebuildleaderboards
+    """
+
+    def handle(self, *args, **options):
+        timestamp = time.time()
+        ranked = SpeedLeaderboards.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Leaderboards were rebuilt with {ranked} `Speed` objects "
+                + f"in {time.time() - timestamp:.1f} seconds!"
+            )
+        )
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from core.speeds.services import VoteCounter
+from core.speeds.cache import SpeedResponseCache
+from core.speeds.leaderboards import SpeedLeaderboards
+
+
+class Command(BaseCommand):
+    help = """
+    Recounts `upvotes`, `downvotes` and `score` of `Speed` objects from `SpeedFeedback` rows.
+    Examples:
+        python3 manage.py recountvotes
+        python3 manage.py recountvotes --dry-run
+        python3 manage.py recountvotes --dirty-since 2024-03-17T14:00:00
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted counters without updating them.",
+        )
+        parser.add_argument(
+            "--dirty-since",
+            type=str,
+            help="Recount only `Speed` objects with feedback created or changed since this ISO 8601 datetime.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        dry_run: bool = options["dry_run"]
+
+        dirty_since = None
+        if options["dirty_since"]:
+            try:
+                dirty_since = datetime.fromisoformat(options["dirty_since"])
+            except ValueError:
+                raise CommandError("The `--dirty-since` flag should be an ISO 8601 datetime.")
+            if timezone.is_naive(dirty_since):
+                dirty_since = timezone.make_aware(dirty_since)
+
+        # pending write-behind deltas aren't counted in `Speed` rows yet
+        drifted = VoteCounter.recount_all_votes(
+            dirty_since=dirty_since,
+            dry_run=dry_run,
+            chunk_size=options["chunk_size"],
+        )
+
+        if not dry_run:
+            SpeedResponseCache.bump([row["id"] for row in drifted])
+            SpeedLeaderboards.set_scores({row["id"]: row["new_score"] for row in drifted})
+
+        for row in drifted:
+            self.stdout.write(
+                f"{row['id']}: "
+                f"upvotes {row['upvotes']} -> {row['new_upvotes']}, "
+                f"downvotes {row['downvotes']} -> {row['new_downvotes']}, "
+                f"score {row['score']} -> {row['new_score']}"
+            )
+
+        if dry_run:
+            message = f"{len(drifted)} `Speed` objects have drifted counters (dry run)."
+        else:
+            message = f"{len(drifted)} `Speed` objects have been recounted."
+        self.stdout.write(self.style.SUCCESS(message))
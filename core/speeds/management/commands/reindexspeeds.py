@@ -0,0 +1,175 @@
+import time
+
+from meilisearch.errors import MeilisearchApiError
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
+
+from core.meilisearch import client
+from core.speeds.models import Speed
+from core.speeds.queries import SpeedQueries
+
+
+class Command(BaseCommand):
+    help = """
+    Rebuilds the 'speeds' index for the Meilisearch search engine from the database without downtime.
+    Public `Speed` objects are streamed into a shadow index, which is swapped with the live index
+    once all documents have been indexed, search keeps using the live index in the meantime.
+    Documents of `Speed` objects hidden or deleted during the rebuild are deleted after the swap.
+    Examples:
+        python3 manage.py reindexspeeds
+        python3 manage.py reindexspeeds --batch-size 20000
+    """
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=600,
+            help="Seconds to wait for each Meilisearch task.",
+        )
+
+    def handle(self, *args, **options):
+        if client.is_disabled():
+            raise CommandError(
+                "Meilisearch is currently disabled in this application. If you'd like to enable it, please configure the settings in your settings.py file."
+            )
+        if not client.is_healthy():
+            raise CommandError("Meilisearch is not healthy :(.")
+
+        index_name = None
+        for index, model in client.index_models.items():
+            if model == Speed:
+                index_name = index
+
+        self.batch_size: int = options["batch_size"]
+        self.timeout_in_ms: int = options["timeout"] * 1000
+        shadow_index_name = f"{index_name}_reindex"
+
+        # leftovers of a failed run
+        if self.index_exists(shadow_index_name):
+            self.wait(client.delete_index(shadow_index_name))
+
+        # `swap_indexes` requires both indexes to exist
+        for uid in (index_name, shadow_index_name):
+            if not self.index_exists(uid):
+                self.wait(client.create_index(uid=uid, options={"primaryKey": "id"}))
+
+        self.wait(
+            client.index(shadow_index_name).update_settings(
+                client.index_settings[index_name]
+            )
+        )
+
+        started_at = timezone.now()
+        # ids of indexed documents, ref: `delete_stale_documents`
+        self.indexed_ids: set[str] = set()
+        queryset = SpeedQueries.get_reindex_query()
+        total = queryset.count()
+        self.stdout.write(f"Indexing {total} documents into `{shadow_index_name}`...")
+        indexed = self.index_documents(index_name, shadow_index_name, queryset, total)
+
+        # rows changed during the rebuild, changes to the live index are lost with the swap
+        caught_up_at = timezone.now()
+        self.index_documents(
+            index_name,
+            shadow_index_name,
+            queryset.filter(updated_at__gte=started_at),
+        )
+
+        self.wait(
+            client.swap_indexes([{"indexes": [index_name, shadow_index_name]}])
+        )
+        # rows changed between the catch-up and the swap, the outbox sends later ones
+        self.index_documents(
+            index_name,
+            index_name,
+            queryset.filter(updated_at__gte=caught_up_at),
+        )
+        # the shadow index holds documents of the previous live index now
+        self.wait(client.delete_index(shadow_index_name))
+        self.delete_stale_documents(index_name)
+
+        # scores of added rows are synced by the `synchronize_scores_in_meilisearch` task
+        Speed.objects.filter(
+            is_public=True, is_added_to_meilisearch=False, created_at__lt=started_at
+        ).update(added_to_mielisearch_at=timezone.now(), is_added_to_meilisearch=True)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Meilisearch's `{index_name}` index was rebuilt with {indexed} documents "
+                + f"in {(timezone.now() - started_at).total_seconds():.1f} seconds!"
+            )
+        )
+
+    def index_documents(
+        self, index_name: str, target_index_name: str, queryset, total: None | int = None
+    ) -> int:
+        """
+        Streams rows with a server-side cursor and sends them in batches of `batch_size` documents,
+        waits for all tasks once every batch has been enqueued.
+        """
+        index = client.index(target_index_name)
+        task_infos = []
+        documents = []
+        sent = 0
+        timestamp = time.time()
+        for speed in queryset.iterator(chunk_size=self.batch_size):
+            documents.append(client.get_instance_document(index_name, speed))
+            self.indexed_ids.add(documents[-1]["id"])
+            if len(documents) == self.batch_size:
+                task_infos.append(index.add_documents(documents))
+                sent += len(documents)
+                documents = []
+                if total:
+                    self.stdout.write(
+                        f"{sent}/{total} documents sent ({time.time() - timestamp:.1f}s)"
+                    )
+        if documents:
+            task_infos.append(index.add_documents(documents))
+            sent += len(documents)
+
+        for i, task_info in enumerate(task_infos, 1):
+            self.wait(task_info)
+            if total:
+                self.stdout.write(f"{i}/{len(task_infos)} batches indexed")
+
+        return sent
+
+    def delete_stale_documents(self, index_name: str) -> int:
+        """
+        Deletes documents of `Speed` objects that were indexed, but were hidden or deleted
+        in the meantime. Their changes were applied to the previous live index only,
+        later ones are applied to the live index by the outbox and periodic tasks.
+        Returns the number of deleted documents.
+        """
+        public_ids = {
+            str(speed_id)
+            for speed_id in SpeedQueries.get_reindex_query()
+            .values_list("id", flat=True)
+            .iterator(chunk_size=self.batch_size)
+        }
+        stale_ids = sorted(self.indexed_ids - public_ids)
+        for i in range(0, len(stale_ids), self.batch_size):
+            self.wait(
+                client.index(index_name).delete_documents(stale_ids[i : i + self.batch_size])
+            )
+        if stale_ids:
+            self.stdout.write(f"{len(stale_ids)} documents of hidden or deleted speeds deleted")
+        return len(stale_ids)
+
+    def index_exists(self, uid: str) -> bool:
+        try:
+            client.get_index(uid)
+        except MeilisearchApiError as e:
+            if e.code != "index_not_found":
+                raise
+            return False
+        return True
+
+    def wait(self, task_info) -> None:
+        if not client.task_succeeded(task_info, self.timeout_in_ms):
+            raise CommandError(
+                f"The Meilisearch task {task_info.task_uid} has not succeeded."
+            )
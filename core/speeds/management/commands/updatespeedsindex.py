@@ -30,49 +30,7 @@ class Command(BaseCommand):
             if not index:
                 raise Exception("Something went wrong")
 
-            index.update_settings(
-                {
-                    "rankingRules": [
-                        "words",
-                        "typo",
-                        "proximity",
-                        "attribute",
-                        "sort",
-                        "exactness",
-                    ],
-                    "searchableAttributes": [
-                        "name",
-                        "description",
-                        "speed_type",
-                    ],
-                    "displayedAttributes": [
-                        *client.displayed_attributes_dict[index_name]
-                    ],
-                    "sortableAttributes": [],
-                    "stopWords": [
-                        "the",
-                        "a",
-                        "an",
-                        "is",
-                        "on",
-                        "in",
-                        "of",
-                        "and",
-                        "to",
-                        "with",
-                        "for",
-                        "can",
-                        "be",
-                        "at",
-                    ],
-                    "typoTolerance": {
-                        "enabled": True,
-                        "minWordSizeForTypos": {"oneTypo": 6, "twoTypos": 10},
-                        "disableOnAttributes": ["description", "speed_type"],
-                    },
-                    "pagination": {"maxTotalHits": 10},
-                }
-            )
+            index.update_settings(client.index_settings[index_name])
             self.stdout.write(
                 self.style.SUCCESS("Meilisearch's `speeds` index was updated!")
             )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='speed',
+            index=models.Index(fields=['-updated_at', '-id'], name='speed_updated_at_id_idx'),
+        ),
+    ]
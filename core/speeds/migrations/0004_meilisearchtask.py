@@ -0,0 +1,28 @@
+# Generated by Django 4.2.5 on 2026-10-18 11:02
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0003_speed_updated_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeilisearchTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_uid', models.BigIntegerField(unique=True, verbose_name='task uid')),
+                ('index_name', models.CharField(max_length=64, verbose_name='index name')),
+                ('added_ids', django.contrib.postgres.fields.ArrayField(base_field=models.UUIDField(), default=list, size=None)),
+                ('updated_ids', django.contrib.postgres.fields.ArrayField(base_field=models.UUIDField(), default=list, size=None)),
+                ('enqueued_at', models.DateTimeField(auto_now_add=True, verbose_name='enqueued at')),
+            ],
+            options={
+                'ordering': ['enqueued_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0004_meilisearchtask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index_name', models.CharField(max_length=64, verbose_name='index name')),
+                ('document_id', models.UUIDField(verbose_name='document id')),
+                ('action', models.CharField(choices=[('add', 'Add'), ('update', 'Update')], max_length=8, verbose_name='action')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+            options={
+                'ordering': ['updated_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchoutbox',
+            constraint=models.UniqueConstraint(fields=('index_name', 'document_id'), name='so_unique_index_document'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 16:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0005_searchoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpeedCounters',
+            fields=[
+                ('speed', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='speeds.speed')),
+                ('downvotes', models.PositiveIntegerField(default=0, verbose_name='downvotes')),
+                ('upvotes', models.PositiveIntegerField(default=1, verbose_name='upvotes')),
+                ('score', models.IntegerField(default=1, verbose_name='score')),
+                ('is_folded', models.BooleanField(default=False)),
+            ],
+        ),
+        # free space on every page for HOT (heap-only tuple) updates of counters
+        migrations.RunSQL(
+            sql='ALTER TABLE speeds_speedcounters SET (fillfactor = 70);',
+            reverse_sql='ALTER TABLE speeds_speedcounters RESET (fillfactor);',
+        ),
+    ]
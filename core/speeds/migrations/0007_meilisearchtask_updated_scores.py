@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:14
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0006_speedcounters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meilisearchtask',
+            name='updated_scores',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(null=True), default=list, size=None),
+        ),
+    ]
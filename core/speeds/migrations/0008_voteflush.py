@@ -0,0 +1,20 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0007_meilisearchtask_updated_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VoteFlush',
+            fields=[
+                ('flush_id', models.UUIDField(primary_key=True, serialize=False, verbose_name='flush id')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+            ],
+        ),
+    ]
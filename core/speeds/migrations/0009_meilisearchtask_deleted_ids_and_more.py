@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-18 12:52
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speeds', '0008_voteflush'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meilisearchtask',
+            name='deleted_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.UUIDField(), default=list, size=None),
+        ),
+        migrations.AlterField(
+            model_name='searchoutbox',
+            name='action',
+            field=models.CharField(choices=[('add', 'Add'), ('update', 'Update'), ('delete', 'Delete')], max_length=8, verbose_name='action'),
+        ),
+    ]
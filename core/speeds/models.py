@@ -1,7 +1,8 @@
 from uuid import uuid4
 from datetime import datetime
 
-from django.db import models, transaction
+from django.db import connection, models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from django.core.validators import MaxValueValidator
@@ -16,10 +17,29 @@ def get_sentinel_user():
     return get_user_model().objects.get(username="deleted")
 
 
+def get_returning_columns(model) -> str:
+    """
+    A `RETURNING` list of `model` columns, ref: `from_returning`.
+    """
+    return ", ".join(field.column for field in model._meta.concrete_fields)
+
+
+def from_returning(model, row: tuple):
+    """
+    Builds a saved `model` object from a row returned by `get_returning_columns`.
+    """
+    attnames = [field.attname for field in model._meta.concrete_fields]
+    return model.from_db(connection.alias, attnames, row[: len(attnames)])
+
+
 class Speed(models.Model):
     class Meta:
         ordering = ["-updated_at"]
-        indexes = [GinIndex(fields=["tags"])]
+        indexes = [
+            GinIndex(fields=["tags"]),
+            # keyset pagination, ref: `core.speeds.pagination.SpeedKeysetPagination`
+            models.Index(fields=["-updated_at", "-id"], name="speed_updated_at_id_idx"),
+        ]
 
     class SpeedType(models.TextChoices):
         AVERAGE = "average"
@@ -77,6 +97,10 @@ class Speed(models.Model):
         return self.score
 
     def recount_votes(self):
+        """
+        Writes recounted votes to the `SpeedCounters` row only, the `Speed` row
+        is rewritten by `SpeedCounters.fold`.
+        """
         downvotes_counter = 0
         upvotes_counter = 0
         with transaction.atomic():
@@ -91,13 +115,140 @@ class Speed(models.Model):
             self.downvotes = downvotes_counter
             self.upvotes = upvotes_counter
             self.score = upvotes_counter - downvotes_counter
-            self.save(update_fields=["downvotes", "upvotes", "score"])
+            SpeedCounters.objects.update_or_create(
+                speed=self,
+                defaults={
+                    "downvotes": self.downvotes,
+                    "upvotes": self.upvotes,
+                    "score": self.score,
+                    "is_folded": False,
+                },
+            )
+
+    @classmethod
+    def recount_all_votes(
+        cls,
+        dirty_since: None | datetime = None,
+        dry_run: bool = False,
+        chunk_size: int = 10_000,
+        get_pending=None,
+    ) -> list[dict]:
+        """
+        Recounts `upvotes`, `downvotes` and `score` with a `GROUP BY speed_id` aggregate
+        of `SpeedFeedback` rows, written to `SpeedCounters` in chunks of `chunk_size` `Speed` objects
+        and folded into `Speed` rows.
+        If `dirty_since` is set, only `Speed` objects with feedback created or changed since then are recounted
+        (deleted feedback is subtracted on delete, ref: `core.speeds.signals.handle_speed_feedback_delete`).
+        `get_pending` returns not yet flushed `(upvotes, downvotes)` deltas of `Speed` ids
+        (ref: `core.speeds.services.VoteCounter.recount_all_votes`), their votes are already counted,
+        so they're subtracted from written counters.
+        Returns drifted counters (before and after values), if `dry_run` is set nothing is updated.
+        """
+        if dirty_since is None:
+            speed_ids = cls.objects.order_by("id").values_list("id", flat=True)
+        else:
+            speed_ids = (
+                SpeedFeedback.objects.filter(updated_at__gte=dirty_since)
+                .order_by("speed_id")
+                .values_list("speed_id", flat=True)
+                .distinct()
+            )
+
+        drifted = []
+        chunk = []
+        for speed_id in speed_ids.iterator(chunk_size=chunk_size):
+            chunk.append(speed_id)
+            if len(chunk) == chunk_size:
+                drifted += cls._recount_votes_of(chunk, dry_run, get_pending)
+                chunk = []
+        if chunk:
+            drifted += cls._recount_votes_of(chunk, dry_run, get_pending)
+
+        if not dry_run:
+            SpeedCounters.fold(chunk_size)
+        return drifted
 
     @classmethod
-    def recount_all_votes(cls):
-        queryset = cls.objects.all()
-        for object in queryset:
-            object.recount_votes()
+    def _recount_votes_of(cls, speed_ids: list, dry_run: bool, get_pending=None) -> list[dict]:
+        speed_table = cls._meta.db_table
+        feedback_table = SpeedFeedback._meta.db_table
+        counters_table = SpeedCounters._meta.db_table
+
+        # read right before the aggregate, a vote's delta is added once the vote is committed
+        pending = get_pending(speed_ids) if get_pending is not None else {}
+        pending_params = [
+            list(pending),
+            [upvotes for upvotes, _ in pending.values()],
+            [downvotes for _, downvotes in pending.values()],
+        ]
+
+        # counts joined with current counters (not yet folded ones or `Speed` columns)
+        # and pending deltas, only drifted rows
+        drifted_query = f"""
+            SELECT
+                c.id,
+                COALESCE(sc.upvotes, sp.upvotes) + COALESCE(p.upvotes, 0) AS upvotes,
+                COALESCE(sc.downvotes, sp.downvotes) + COALESCE(p.downvotes, 0) AS downvotes,
+                COALESCE(sc.score, sp.score) + COALESCE(p.upvotes - p.downvotes, 0) AS score,
+                c.upvotes AS new_upvotes,
+                c.downvotes AS new_downvotes,
+                c.upvotes - c.downvotes AS new_score,
+                COALESCE(p.upvotes, 0) AS pending_upvotes,
+                COALESCE(p.downvotes, 0) AS pending_downvotes
+            FROM (
+                SELECT
+                    sp.id,
+                    COUNT(f.id) FILTER (WHERE f.vote = {int(Vote.UPVOTE)}) AS upvotes,
+                    COUNT(f.id) FILTER (WHERE f.vote = {int(Vote.DOWNVOTE)}) AS downvotes
+                FROM {speed_table} AS sp
+                LEFT JOIN {feedback_table} AS f ON f.speed_id = sp.id
+                WHERE sp.id = ANY(%s)
+                GROUP BY sp.id
+            ) AS c
+            JOIN {speed_table} AS sp ON sp.id = c.id
+            LEFT JOIN {counters_table} AS sc ON sc.speed_id = c.id AND NOT sc.is_folded
+            LEFT JOIN unnest(%s::uuid[], %s::integer[], %s::integer[])
+                AS p(id, upvotes, downvotes) ON p.id = c.id
+            WHERE (
+                COALESCE(sc.upvotes, sp.upvotes) + COALESCE(p.upvotes, 0),
+                COALESCE(sc.downvotes, sp.downvotes) + COALESCE(p.downvotes, 0),
+                COALESCE(sc.score, sp.score) + COALESCE(p.upvotes - p.downvotes, 0)
+            ) IS DISTINCT FROM (c.upvotes, c.downvotes, c.upvotes - c.downvotes)
+        """
+        columns = "id, upvotes, downvotes, score, new_upvotes, new_downvotes, new_score"
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if dry_run:
+                cursor.execute(
+                    f"SELECT {columns} FROM ({drifted_query}) AS d",
+                    [speed_ids, *pending_params],
+                )
+            else:
+                # a data-modifying CTE runs even if its rows aren't selected,
+                # pending deltas are added to written counters by the next flush
+                cursor.execute(
+                    f"""
+                    WITH d AS ({drifted_query}), written AS (
+                        INSERT INTO {counters_table} (speed_id, upvotes, downvotes, score, is_folded)
+                        SELECT
+                            d.id,
+                            d.new_upvotes - d.pending_upvotes,
+                            d.new_downvotes - d.pending_downvotes,
+                            d.new_score - d.pending_upvotes + d.pending_downvotes,
+                            false
+                        FROM d
+                        ON CONFLICT (speed_id) DO UPDATE SET
+                            upvotes = EXCLUDED.upvotes,
+                            downvotes = EXCLUDED.downvotes,
+                            score = EXCLUDED.score,
+                            is_folded = false
+                    )
+                    SELECT {columns} FROM d
+                    """,
+                    [speed_ids, *pending_params],
+                )
+            columns = [column.name for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
     def mark_synced_in_meilisearch(self):
         self.last_synced_to_meilisearch_at = datetime.now()
@@ -111,6 +262,40 @@ class Speed(models.Model):
         self.save()
         return self
 
+    @classmethod
+    def bulk_mark_synced_in_meilisearch(cls, ids: list, scores: None | list = None) -> int:
+        """
+        If `scores` of sent documents are passed, only rows whose score hasn't changed since
+        they were sent are marked, changed rows are synced again by
+        `core.speeds.tasks.synchronize_scores_in_meilisearch`.
+        """
+        if scores is None:
+            return cls.objects.filter(pk__in=ids).update(
+                last_synced_to_meilisearch_at=timezone.now(),
+                is_synced_in_meilisearch=True,
+            )
+
+        # a row locked by a fold is rechecked once the fold commits
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS s
+                SET last_synced_to_meilisearch_at = now(), is_synced_in_meilisearch = true
+                FROM unnest(%s::uuid[], %s::integer[]) AS sent(id, score)
+                WHERE s.id = sent.id AND s.score = sent.score
+                """,
+                [list(ids), list(scores)],
+            )
+            return cursor.rowcount
+
+    @classmethod
+    def bulk_mark_added_to_meilisearch(cls, ids: list) -> int:
+        return cls.objects.filter(pk__in=ids).update(
+            added_to_mielisearch_at=timezone.now(),
+            is_added_to_meilisearch=True,
+        )
+
     def __repr__(self) -> str:
         return self.name + " " + self.description
 
@@ -144,44 +329,368 @@ class SpeedFeedback(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     speed = models.ForeignKey(Speed, on_delete=models.CASCADE, related_name="feedback")
 
+    @classmethod
+    def insert_vote(
+        cls, user_id, speed_id, vote: int, count: bool = True
+    ) -> None | tuple["SpeedFeedback", None | tuple[int, int, int]]:
+        """
+        Inserts a vote with a single `INSERT ... ON CONFLICT DO NOTHING` statement, if `count` is set
+        the vote is added to `SpeedCounters` of its `Speed` object by the same statement
+        (the upsert locks the counters row, concurrent votes don't lose increments).
+        Returns `None` if the user has already voted, otherwise the inserted object
+        and new `(upvotes, downvotes, score)` counters (`None` if `count` isn't set).
+        """
+        table = cls._meta.db_table
+        speed_table = Speed._meta.db_table
+        counters_table = SpeedCounters._meta.db_table
+        upvotes = int(vote == Vote.UPVOTE)
+        downvotes = int(vote == Vote.DOWNVOTE)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH inserted AS (
+                    INSERT INTO {table} (vote, created_at, updated_at, user_id, speed_id)
+                    VALUES (%s, now(), now(), %s, %s)
+                    ON CONFLICT (user_id, speed_id) DO NOTHING
+                    RETURNING {get_returning_columns(cls)}
+                ), counted AS (
+                    -- the first vote seeds counters from the `Speed` row
+                    INSERT INTO {counters_table} AS c (speed_id, upvotes, downvotes, score, is_folded)
+                    SELECT s.id, s.upvotes + %s, s.downvotes + %s, s.score + %s, false
+                    FROM {speed_table} AS s
+                    WHERE s.id = %s AND %s AND EXISTS (SELECT 1 FROM inserted)
+                    ON CONFLICT (speed_id) DO UPDATE SET
+                        upvotes = c.upvotes + %s,
+                        downvotes = c.downvotes + %s,
+                        score = c.score + %s,
+                        is_folded = false
+                    RETURNING c.upvotes, c.downvotes, c.score
+                )
+                SELECT inserted.*, counted.upvotes, counted.downvotes, counted.score
+                FROM inserted LEFT JOIN counted ON true
+                """,
+                [
+                    vote,
+                    user_id,
+                    speed_id,
+                    *(upvotes, downvotes, upvotes - downvotes),
+                    speed_id,
+                    count,
+                    *(upvotes, downvotes, upvotes - downvotes),
+                ],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return from_returning(cls, row), (tuple(row[-3:]) if count else None)
+
+    @classmethod
+    def insert_votes(cls, user_id, votes: list[tuple]) -> list["SpeedFeedback"]:
+        """
+        Inserts `(speed_id, vote)` votes (in the given order) with a single
+        `INSERT ... ON CONFLICT DO NOTHING` statement, without counting them.
+        Returns inserted objects, votes for `Speed` objects the user has already voted on are skipped.
+        """
+        if not votes:
+            return []
+
+        table = cls._meta.db_table
+        values = ", ".join(["(%s, now(), now(), %s, %s::uuid)"] * len(votes))
+        params = []
+        for speed_id, vote in votes:
+            params += [vote, user_id, speed_id]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (vote, created_at, updated_at, user_id, speed_id)
+                VALUES {values}
+                ON CONFLICT (user_id, speed_id) DO NOTHING
+                RETURNING {get_returning_columns(cls)}
+                """,
+                params,
+            )
+            return [from_returning(cls, row) for row in cursor.fetchall()]
+
     def __str__(self) -> str:
         return str(self.vote)
 
 
-# class SpeedFeedbackCounter(models.Model):
-#     speed = models.OneToOneField(Speed, on_delete=models.CASCADE, related_name='feedback_counter')
+class SpeedCounters(models.Model):
+    """
+    Vote counters of a `Speed` object, kept off the wide `Speed` row, a vote updates this narrow row
+    instead of rewriting the `Speed` row (and its `tags` GIN index entries) and bumping its `updated_at`.
+    The table has no indexes besides the primary key and a lowered fillfactor (ref: migrations),
+    so updates of counters stay HOT (heap-only tuple).
 
-#     downvotes = models.PositiveIntegerField(_('downvotes'), default=0)
-#     upvotes = models.PositiveIntegerField(_('upvotes'), default=0)
+    A row is created by the first vote, seeded from counters of the `Speed` row.
+    `upvotes`, `downvotes` and `score` of `Speed` rows are a denormalized copy, changed counters
+    are folded into them periodically (ref: `fold`), readers overlay not yet folded counters
+    (ref: `overlay`).
 
-#     @property
-#     def score(self) -> int:
-#         return self.upvotes - self.downvotes
+    Filters and orderings by `Speed.score` aren't overlaid, they see folded counters, up to
+    `settings.SPEEDS["COUNTERS_FOLD_INTERVAL"]` seconds behind serialized scores: the `score > 0`
+    predicate of random speeds pools (ref: `SpeedQueries.get_random_sample_ids`), sorting in the
+    admin and Meilisearch documents. A join (or a correlated subquery) would keep them exact,
+    at the cost of `TABLESAMPLE` sampling and index scans of `Speed` rows.
+    """
 
-#     def recount_votes(self):
-#         with transaction.atomic():
-#             downvotes_counter = 0
-#             upvotes_counter = 0
-#             for feedback in SpeedFeedback.objects.select_for_update().filter(speed=self.speed):
-#                 if feedback.vote == Vote.DOWNVOTE:
-#                     downvotes_counter += 1
-#                 if feedback.vote == Vote.UPVOTE:
-#                     upvotes_counter += 1
+    speed = models.OneToOneField(
+        Speed, on_delete=models.CASCADE, primary_key=True, related_name="counters"
+    )
+
+    downvotes = models.PositiveIntegerField(_("downvotes"), default=0)
+    upvotes = models.PositiveIntegerField(_("upvotes"), default=1)
+    score = models.IntegerField(_("score"), default=1)
 
-#             self.downvotes = downvotes_counter
-#             self.upvotes = upvotes_counter
-#             self.save(update_fields=['downvotes', 'upvotes'])
+    # `False` until counters are copied into the `Speed` row
+    is_folded = models.BooleanField(default=False)
 
-#     @classmethod
-#     def recount_all_votes(cls):
-#         queryset = cls.objects.all()
-#         for object in queryset:
-#             object.recount_votes()
+    @classmethod
+    def add(cls, rows: list[tuple]) -> dict[str, tuple[int, int, int]]:
+        """
+        Adds `(speed_id, upvotes, downvotes)` deltas, returns new `(upvotes, downvotes, score)`
+        counters by `Speed` ids. Missing rows are seeded from `Speed` rows first,
+        the next statements see them (a new snapshot in READ COMMITTED).
+        Rows are seeded and locked in the order of `Speed` ids, so concurrent callers
+        with overlapping rows wait for each other instead of deadlocking.
+        """
+        if not rows:
+            return {}
+
+        table = cls._meta.db_table
+        speed_table = Speed._meta.db_table
+        speed_ids = [str(row[0]) for row in rows]
+        values = ", ".join(["(%s::uuid, %s::integer, %s::integer)"] * len(rows))
+        params = [param for row in rows for param in row]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (speed_id, upvotes, downvotes, score, is_folded)
+                SELECT s.id, s.upvotes, s.downvotes, s.score, true
+                FROM {speed_table} AS s
+                WHERE s.id = ANY(%s::uuid[])
+                ORDER BY s.id
+                ON CONFLICT (speed_id) DO NOTHING
+                """,
+                [speed_ids],
+            )
+            # the `UPDATE` below would lock rows in the order of its join
+            cursor.execute(
+                f"""
+                SELECT speed_id FROM {table}
+                WHERE speed_id = ANY(%s::uuid[])
+                ORDER BY speed_id
+                FOR UPDATE
+                """,
+                [speed_ids],
+            )
+            cursor.execute(
+                f"""
+                UPDATE {table} AS c
+                SET
+                    upvotes = GREATEST(c.upvotes + d.upvotes, 0),
+                    downvotes = GREATEST(c.downvotes + d.downvotes, 0),
+                    score = GREATEST(c.upvotes + d.upvotes, 0) - GREATEST(c.downvotes + d.downvotes, 0),
+                    is_folded = false
+                FROM (VALUES {values}) AS d(id, upvotes, downvotes)
+                WHERE c.speed_id = d.id
+                RETURNING c.speed_id, c.upvotes, c.downvotes, c.score
+                """,
+                params,
+            )
+            return {
+                str(speed_id): (upvotes, downvotes, score)
+                for speed_id, upvotes, downvotes, score in cursor.fetchall()
+            }
 
-#     def __str__(self):
-#         # don't modify the return statement
-#         # the returned value is used by serializers.StringRelatedField()
-#         return f'{self.score}'
+    @classmethod
+    def overlay(cls, speeds: list) -> None:
+        """
+        Sets not yet folded counters on `Speed` objects (or rows with the same attributes),
+        with one `IN (...)` query.
+        """
+        if not speeds:
+            return
+        counters = {
+            speed_id: (upvotes, downvotes, score)
+            for speed_id, upvotes, downvotes, score in cls.objects.filter(
+                speed_id__in=[speed.id for speed in speeds], is_folded=False
+            ).values_list("speed_id", "upvotes", "downvotes", "score")
+        }
+        for speed in speeds:
+            if speed.id in counters:
+                speed.upvotes, speed.downvotes, speed.score = counters[speed.id]
+
+    @classmethod
+    def fold(cls, chunk_size: int = 10_000) -> list:
+        """
+        Copies changed counters into `Speed` rows in chunks of `chunk_size`, returns ids of
+        `Speed` objects with changed counters. `updated_at` isn't touched, changed scores are
+        synced in Meilisearch by the `synchronize_scores_in_meilisearch` task.
+        Rows locked by votes are skipped, they are folded by the next run.
+        """
+        table = cls._meta.db_table
+        speed_table = Speed._meta.db_table
+
+        speed_ids = []
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    WITH folded AS (
+                        UPDATE {table}
+                        SET is_folded = true
+                        WHERE speed_id IN (
+                            SELECT speed_id FROM {table}
+                            WHERE NOT is_folded
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING speed_id, upvotes, downvotes, score
+                    ), changed AS (
+                        UPDATE {speed_table} AS s
+                        SET
+                            upvotes = f.upvotes,
+                            downvotes = f.downvotes,
+                            score = f.score,
+                            is_synced_in_meilisearch = false
+                        FROM folded AS f
+                        WHERE s.id = f.speed_id
+                            AND (s.upvotes, s.downvotes, s.score)
+                                IS DISTINCT FROM (f.upvotes, f.downvotes, f.score)
+                        RETURNING s.id
+                    )
+                    SELECT (SELECT COUNT(*) FROM folded), ARRAY(SELECT id FROM changed)
+                    """,
+                    [chunk_size],
+                )
+                folded, changed = cursor.fetchone()
+            speed_ids += changed
+            if folded < chunk_size:
+                return speed_ids
+
+    def __str__(self):
+        return f"{self.score}"
+
+
+class VoteFlush(models.Model):
+    """
+    A flush of write-behind vote deltas, recorded in the same transaction as its `SpeedCounters`
+    updates, a retried flush isn't applied twice, ref: `core.speeds.services.VoteCounter.flush`.
+    """
+
+    flush_id = models.UUIDField(_("flush id"), primary_key=True)
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+
+    @classmethod
+    def record(cls, flush_id) -> bool:
+        """
+        Returns `False` if the flush has already been recorded.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table} (flush_id, created_at)
+                VALUES (%s, now())
+                ON CONFLICT (flush_id) DO NOTHING
+                """,
+                [flush_id],
+            )
+            return cursor.rowcount == 1
+
+    def __str__(self) -> str:
+        return f"{self.flush_id}"
+
+
+class MeilisearchTask(models.Model):
+    """
+    A Meilisearch task that hasn't been reconciled yet,
+    ref: `core.meilisearch.MeilisearchClient.reconcile_tasks`.
+    """
+
+    class Meta:
+        ordering = ["enqueued_at"]
+
+    task_uid = models.BigIntegerField(_("task uid"), unique=True)
+    index_name = models.CharField(_("index name"), max_length=64)
+
+    added_ids = ArrayField(models.UUIDField(), default=list)
+    updated_ids = ArrayField(models.UUIDField(), default=list)
+    # sent scores of `updated_ids` documents (`None` if a document has no score)
+    updated_scores = ArrayField(models.IntegerField(null=True), default=list)
+    deleted_ids = ArrayField(models.UUIDField(), default=list)
+
+    enqueued_at = models.DateTimeField(_("enqueued at"), auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.index_name} ({self.task_uid})"
+
+
+class SearchOutbox(models.Model):
+    """
+    A document that has to be synced in (or deleted from) Meilisearch, written in the same
+    transaction as its row. Repeated changes of a document are coalesced into a single entry,
+    a drainer sends the latest state of the row, ref: `core.meilisearch.MeilisearchClient.drain_outbox`.
+    """
+
+    class Meta:
+        ordering = ["updated_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("index_name", "document_id"),
+                name="so_unique_index_document",
+            )
+        ]
+
+    class Action(models.TextChoices):
+        ADD = "add"
+        UPDATE = "update"
+        DELETE = "delete"
+
+    index_name = models.CharField(_("index name"), max_length=64)
+    document_id = models.UUIDField(_("document id"))
+    action = models.CharField(_("action"), max_length=8, choices=Action.choices)
+
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    @classmethod
+    def enqueue(cls, index_name: str, action: str, document_ids: list) -> None:
+        """
+        Upserts entries with one `INSERT ... ON CONFLICT`, a pending "add" stays an "add"
+        (unless the document is deleted).
+        """
+        # a row can't be affected twice by one `ON CONFLICT DO UPDATE`
+        document_ids = list(dict.fromkeys(str(document_id) for document_id in document_ids))
+        if not document_ids:
+            return
+
+        table = cls._meta.db_table
+        values = ", ".join(["(%s, %s::uuid, %s, now(), now())"] * len(document_ids))
+        params = []
+        for document_id in document_ids:
+            params += [index_name, document_id, action]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (index_name, document_id, action, created_at, updated_at)
+                VALUES {values}
+                ON CONFLICT (index_name, document_id) DO UPDATE SET
+                    action = CASE
+                        WHEN EXCLUDED.action = '{cls.Action.DELETE.value}' THEN EXCLUDED.action
+                        WHEN {table}.action = '{cls.Action.ADD.value}' THEN {table}.action
+                        ELSE EXCLUDED.action
+                    END,
+                    updated_at = EXCLUDED.updated_at
+                """,
+                params,
+            )
+
+    def __str__(self) -> str:
+        return f"{self.index_name} ({self.document_id}, {self.action})"
 
 
 class SpeedBookmark(models.Model):
@@ -202,6 +711,29 @@ class SpeedBookmark(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     speed = models.ForeignKey(Speed, on_delete=models.CASCADE, related_name="bookmark")
 
+    @classmethod
+    def insert(cls, user_id, speed_id, category: str) -> "None | SpeedBookmark":
+        """
+        Inserts a bookmark with a single `INSERT ... ON CONFLICT DO NOTHING` statement,
+        returns `None` if the `Speed` object is already bookmarked for this category.
+        """
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (category, created_at, updated_at, user_id, speed_id)
+                VALUES (%s, now(), now(), %s, %s)
+                ON CONFLICT (category, user_id, speed_id) DO NOTHING
+                RETURNING {get_returning_columns(cls)}
+                """,
+                [category, user_id, speed_id],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return None
+        return from_returning(cls, row)
+
     def __str__(self) -> str:
         return self.category
 
@@ -238,5 +770,27 @@ class SpeedReport(models.Model):
     )
     speed = models.ForeignKey(Speed, on_delete=models.CASCADE, related_name="report")
 
+    @classmethod
+    def upsert(cls, user_id, speed_id, report_reason: str, detail: str) -> "SpeedReport":
+        """
+        Creates a report or updates the user's previous report of the `Speed` object,
+        with a single `INSERT ... ON CONFLICT DO UPDATE` statement.
+        """
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (report_reason, detail, created_at, updated_at, user_id, speed_id)
+                VALUES (%s, %s, now(), now(), %s, %s)
+                ON CONFLICT (user_id, speed_id) DO UPDATE SET
+                    report_reason = EXCLUDED.report_reason,
+                    detail = EXCLUDED.detail,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING {get_returning_columns(cls)}
+                """,
+                [report_reason, detail, user_id, speed_id],
+            )
+            return from_returning(cls, cursor.fetchone())
+
     def __str__(self) -> str:
         return self.report_reason + " (" + self.detail[:25] + "...)"
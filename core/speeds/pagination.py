@@ -0,0 +1,211 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+from uuid import UUID
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class SpeedKeysetPagination(BasePagination):
+    """
+    An opt-in keyset (cursor) pagination for `Speed` lists,
+    enabled with the `?pagination=cursor` query parameter.
+    Pages on the `(updated_at, id)` pair instead of an `OFFSET`, and doesn't run a `COUNT(*)`,
+    so the cost of a page doesn't depend on how deep it is.
+    Returns opaque `next` and `previous` cursors.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    mode_query_param = "pagination"
+    mode = "cursor"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    # the `speed_updated_at_id_idx` index is defined in the same order
+    ordering = ("-updated_at", "-id")
+    reversed_ordering = ("updated_at", "id")
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        return (
+            request.query_params.get(cls.mode_query_param) == cls.mode
+            or cls.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        reverse, position = self.decode_cursor(request)
+
+        if reverse:
+            queryset = queryset.order_by(*self.reversed_ordering)
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            updated_at, pk = position
+            # `updated_at__lte`/`updated_at__gte` lets Postgres start
+            # an index range scan at the position instead of filtering every row
+            if reverse:
+                queryset = queryset.filter(
+                    Q(updated_at__gte=updated_at)
+                    & (Q(updated_at__gt=updated_at) | Q(id__gt=pk))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(updated_at__lte=updated_at)
+                    & (Q(updated_at__lt=updated_at) | Q(id__lt=pk))
+                )
+
+        # fetch one extra row to find out whether there is a following page
+        results = list(queryset[: self.page_size + 1])
+        has_following_page = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_following_page
+        else:
+            self.has_next = has_following_page
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_next_link(self) -> None | str:
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(reverse=False, item=self.page[-1])
+
+    def get_previous_link(self) -> None | str:
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(reverse=True, item=self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def decode_cursor(self, request) -> tuple[bool, None | tuple[datetime, str]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")).decode("utf-8"))
+            reverse = bool(cursor["r"])
+            updated_at = datetime.fromisoformat(cursor["u"])
+            pk = str(UUID(str(cursor["i"])))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return reverse, (updated_at, pk)
+
+    def encode_cursor(self, reverse: bool, item) -> str:
+        cursor = {
+            "r": int(reverse),
+            "u": item.updated_at.isoformat(),
+            "i": str(item.id),
+        }
+        encoded = b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+        url = remove_query_param(self.base_url, "page")
+        url = replace_query_param(url, self.mode_query_param, self.mode)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+
+class RandomSpeedsPermutationCursor:
+    """
+    Opaque cursors of the `random-list` endpoint, used to page through a seeded permutation
+    of a random speeds pool (`?seed=<int>` starts browsing, ref: `services.get_permuted_random_speeds`).
+    The whole state is encoded in the cursor, nothing is stored on the server.
+    """
+
+    seed_query_param = "seed"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+    expired_cursor_message = "The cursor has expired, start over with a new `seed`."
+    max_seed = 2**31 - 1
+
+    @classmethod
+    def is_requested(cls, request) -> bool:
+        return (
+            cls.seed_query_param in request.query_params
+            or cls.cursor_query_param in request.query_params
+        )
+
+    @classmethod
+    def decode(cls, request) -> dict:
+        encoded = request.query_params.get(cls.cursor_query_param)
+        if encoded is None:
+            try:
+                seed = int(request.query_params[cls.seed_query_param])
+            except ValueError:
+                raise ValidationError({"seed": "A valid integer is required."})
+            if not 0 <= seed <= cls.max_seed:
+                raise ValidationError(
+                    {"seed": f"Ensure this value is between 0 and {cls.max_seed}."}
+                )
+            return {"seed": seed, "offset": 0, "version": None}
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode("ascii")).decode("utf-8"))
+            state = {
+                "seed": int(cursor["s"]),
+                "offset": int(cursor["o"]),
+                "version": str(cursor["v"]),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(cls.invalid_cursor_message)
+        if not 0 <= state["seed"] <= cls.max_seed or state["offset"] < 0:
+            raise NotFound(cls.invalid_cursor_message)
+
+        return state
+
+    @classmethod
+    def get_next_link(cls, request, state: None | dict) -> None | str:
+        if state is None:
+            return None
+
+        cursor = {"s": state["seed"], "o": state["offset"], "v": state["version"]}
+        encoded = b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")
+
+        url = remove_query_param(request.build_absolute_uri(), cls.seed_query_param)
+        return replace_query_param(url, cls.cursor_query_param, encoded)
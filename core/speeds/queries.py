@@ -1,7 +1,9 @@
 from typing import Literal
+from random import sample
 
-from django.db.models import Q, OuterRef, Count
-from django.db.models.functions import JSONObject, Random
+from django.db import connection
+from django.db.models import Q, OuterRef, Count, F, Case, When
+from django.db.models.functions import Coalesce, JSONObject, Random
 from django.contrib.postgres.expressions import ArraySubquery
 
 from .models import Speed, SpeedFeedback, SpeedBookmark
@@ -22,13 +24,141 @@ class SpeedQueries:
                 .select_related('user')
         
     @staticmethod
-    def get_random_list_query(limit: int):
+    def get_random_list_query(
+        limit: int,
+        speed_type: None | str = None,
+        tag: None | str = None,
+        selectivity: None | float = None,
+    ):
         return Speed.objects\
-                .filter(is_public=True, score__gt=0)\
-                .order_by(Random())\
-                .select_related('user')\
-                [:limit]
+                .filter(
+                    id__in=SpeedQueries.get_random_sample_ids(limit, speed_type, tag, selectivity)
+                )\
+                .select_related('user')
+
+    @staticmethod
+    def get_random_sample_ids(
+        limit: int,
+        speed_type: None | str = None,
+        tag: None | str = None,
+        selectivity: None | float = None,
+        max_attempts: int = 6,
+    ) -> list:
+        '''
+        Samples up to `limit` unique ids of public `Speed` objects with a positive score,
+        optionally of a single `speed_type` or tag (`selectivity` is the estimated fraction of matching rows).
+        Instead of sorting the whole table with `ORDER BY random()`, `TABLESAMPLE SYSTEM` reads
+        random pages, sized from the `reltuples` estimate with 2x oversampling for the predicate,
+        a too small sample is topped up with a doubled percentage.
+        Small or not yet analyzed tables are sorted, sampling isn't worth it there.
+        '''
+        table = Speed._meta.db_table
+        queryset = Speed.objects.filter(is_public=True, score__gt=0)
+        conditions, params = ['is_public', 'score > 0'], []
+        if speed_type is not None:
+            queryset = queryset.filter(speed_type=speed_type)
+            conditions.append('speed_type = %s')
+            params.append(speed_type)
+            selectivity = selectivity or 1 / len(Speed.SpeedType)
+        if tag is not None:
+            queryset = queryset.filter(tags__contains=[tag])
+            conditions.append('tags @> ARRAY[%s]::varchar(20)[]')
+            params.append(tag)
+        selectivity = selectivity or 1.0
+
+        estimated_rows = SpeedQueries.get_estimated_rows(table) * selectivity
+        if estimated_rows < limit * 20:
+            return list(
+                queryset\
+                    .order_by(Random())\
+                    .values_list('id', flat=True)\
+                    [:limit]
+            )
+
+        ids = set()
+        percentage = min(100.0, 100.0 * 2 * limit / estimated_rows)
+        with connection.cursor() as cursor:
+            for _ in range(max_attempts):
+                cursor.execute(
+                    f'''
+                    SELECT id FROM {table} TABLESAMPLE SYSTEM (%s)
+                    WHERE {' AND '.join(conditions)}
+                    ''',
+                    [percentage, *params],
+                )
+                # rows of a page sample come in physical order, pick at random
+                sampled = [row[0] for row in cursor.fetchall() if row[0] not in ids]
+                ids.update(sample(sampled, min(limit - len(ids), len(sampled))))
+                if len(ids) >= limit or percentage >= 100.0:
+                    break
+                percentage = min(100.0, percentage * 2)
+
+        return list(ids)
+
+    @staticmethod
+    def get_estimated_rows(table: str) -> int:
+        '''
+        Returns the planner's estimate of rows of `table` (`pg_class.reltuples`),
+        -1 if it hasn't been analyzed yet.
+        '''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+    @staticmethod
+    def get_popular_tags(limit: int) -> list[tuple[str, None | float]]:
+        '''
+        Returns up to `limit` most common tags with their estimated frequencies,
+        read from the planner statistics (`pg_stats.most_common_elems`) instead of counting all rows.
+        Frequencies are `None` if the table hasn't been analyzed yet.
+        '''
+        table = Speed._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                '''
+                SELECT most_common_elems::text::text[], most_common_elem_freqs
+                FROM pg_stats
+                WHERE schemaname = current_schema() AND tablename = %s AND attname = 'tags'
+                ''',
+                [table],
+            )
+            row = cursor.fetchone()
+            if row and row[0]:
+                # `most_common_elem_freqs` has 3 extra trailing values, `zip` drops them
+                tags = sorted(zip(row[0], row[1]), key=lambda tag: tag[1], reverse=True)
+                return tags[:limit]
+
+            cursor.execute(
+                f'''
+                SELECT tag, COUNT(*) FROM {table}, unnest(tags) AS tag
+                WHERE is_public AND score > 0
+                GROUP BY tag
+                ORDER BY COUNT(*) DESC, tag
+                LIMIT %s
+                ''',
+                [limit],
+            )
+            return [(tag, None) for tag, _ in cursor.fetchall()]
     
+    @staticmethod
+    def get_leaderboards_query():
+        '''
+        Rows of public `Speed` objects for `core.speeds.leaderboards.SpeedLeaderboards.rebuild`,
+        scores of not yet folded counters (ref: `SpeedCounters`) take precedence.
+        '''
+        return Speed.objects\
+                .filter(is_public=True)\
+                .annotate(
+                    current_score=Coalesce(
+                        Case(When(counters__is_folded=False, then=F('counters__score'))), F('score')
+                    )
+                )\
+                .order_by()\
+                .values_list('id', 'speed_type', 'tags', 'kmph', 'current_score')
+
     # authenticated users
     
     @staticmethod
@@ -44,7 +174,35 @@ class SpeedQueries:
                 .values(json=JSONObject(bookmark_id="id", bookmark_category="category"))
 
     @staticmethod
-    def get_authenticated_user_query(user: User, mode: Literal['public_and_personal', 'personal']):
+    def get_user_speed_feedback_overlay_query(user: User, speed_ids: list):
+        '''
+        The second-pass counterpart of `get_user_speed_feedback_subquery`, ref: `services.set_user_speed_data`.
+        '''
+        return SpeedFeedback.objects\
+                .filter(user=user, speed_id__in=speed_ids)\
+                .order_by()\
+                .values_list('speed_id', 'id', 'vote')
+
+    @staticmethod
+    def get_user_speed_bookmark_overlay_query(user: User, speed_ids: list):
+        '''
+        The second-pass counterpart of `get_user_speed_bookmark_subquery`, ref: `services.set_user_speed_data`.
+        '''
+        return SpeedBookmark.objects\
+                .filter(user=user, speed_id__in=speed_ids)\
+                .order_by()\
+                .values_list('speed_id', 'id', 'category')
+
+    @staticmethod
+    def get_authenticated_user_query(
+        user: User, 
+        mode: Literal['public_and_personal', 'personal'], 
+        with_user_speed_data: bool = True,
+    ):
+        '''
+        Set `with_user_speed_data` to `False` to skip the per row `ArraySubquery` annotations,
+        `user_speed_feedback` and `user_speed_bookmark` should be set afterwards by `services.set_user_speed_data`.
+        '''
         if mode not in ('public_and_personal', 'personal'):
             raise ValueError('Invalid mode.')
         
@@ -54,22 +212,41 @@ class SpeedQueries:
         elif mode == 'personal':
             query_filter = Q(user=user)
         
-        return Speed.objects\
+        queryset = Speed.objects\
                 .filter(query_filter)\
-                .annotate(
-                    user_speed_feedback=ArraySubquery(SpeedQueries.get_user_speed_feedback_subquery(user)),
-                    user_speed_bookmark=ArraySubquery(SpeedQueries.get_user_speed_bookmark_subquery(user))
-                )\
                 .select_related('user')
+        if with_user_speed_data:
+            queryset = SpeedQueries.annotate_user_speed_data(queryset, user)
+        return queryset
     
     @staticmethod
-    def get_admin_query(user: User):
-        return Speed.objects\
+    def get_admin_query(user: User, with_user_speed_data: bool = True):
+        '''
+        Ref: `get_authenticated_user_query`.
+        '''
+        queryset = Speed.objects\
+                .select_related('user')
+        if with_user_speed_data:
+            queryset = SpeedQueries.annotate_user_speed_data(queryset, user)
+        return queryset
+
+    @staticmethod
+    def get_sparse_fieldset_query(queryset, only_fields: list):
+        '''
+        Pushes a sparse fieldset down to the `SELECT` list, the `user` join is skipped
+        unless `user__username` is requested, ref: `serializers.SpeedSparseFieldsMixin.get_only_fields`.
+        '''
+        if 'user__username' not in only_fields:
+            queryset = queryset.select_related(None)
+        return queryset.only(*only_fields)
+
+    @staticmethod
+    def annotate_user_speed_data(queryset, user: User):
+        return queryset\
                 .annotate(
                     user_speed_feedback=ArraySubquery(SpeedQueries.get_user_speed_feedback_subquery(user)),
                     user_speed_bookmark=ArraySubquery(SpeedQueries.get_user_speed_bookmark_subquery(user))
-                )\
-                .select_related('user')
+                )
 
     # tasks
     
@@ -95,6 +272,13 @@ class SpeedQueries:
                     Q(is_synced_in_meilisearch=False) & Q(is_added_to_meilisearch=True)
                 )
 
+    @staticmethod
+    def get_reindex_query():
+        return Speed.objects\
+                .filter(is_public=True)\
+                .select_related('user')\
+                .order_by()
+
     # admin site
 
     @staticmethod
@@ -120,6 +304,36 @@ class SpeedFeedbackQueries:
                 .select_related('user')\
                 .select_related('speed')
 
+    @staticmethod
+    def get_hot_scores(epoch: int, half_life: int, since, speed_ids: None | list = None) -> list[tuple]:
+        '''
+        Returns `(speed_id, hot score)` of public `Speed` objects (optionally of `speed_ids`)
+        with votes updated since `since`, a vote weighs `2 ^ ((updated_at - epoch) / half_life)`,
+        ref: `core.speeds.services.HotSpeeds`. A single aggregate of recent `SpeedFeedback` rows,
+        older votes are dropped (their weights are negligible).
+        '''
+        table = SpeedFeedback._meta.db_table
+        speed_table = Speed._meta.db_table
+        conditions, params = ['s.is_public', 'f.vote <> 0', 'f.updated_at >= %s'], [epoch, half_life, since]
+        if speed_ids is not None:
+            conditions.append('f.speed_id = ANY(%s::uuid[])')
+            params.append([str(speed_id) for speed_id in speed_ids])
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'''
+                SELECT f.speed_id, SUM(
+                    f.vote * power(2.0::float8, (extract(epoch FROM f.updated_at)::float8 - %s) / %s)
+                )
+                FROM {table} AS f
+                JOIN {speed_table} AS s ON s.id = f.speed_id
+                WHERE {' AND '.join(conditions)}
+                GROUP BY f.speed_id
+                ''',
+                params,
+            )
+            return cursor.fetchall()
+
 
 class SpeedBookmarkQueries:
 
@@ -1,14 +1,24 @@
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
-from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 
 from django.urls import reverse
-from django.db import transaction
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models.signals import post_save
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from . import logger
-from .models import Speed, SpeedFeedback, SpeedReport, SpeedBookmark, Vote
+from .models import (
+    Speed,
+    SpeedCounters,
+    SpeedFeedback,
+    SpeedReport,
+    SpeedBookmark,
+    Vote,
+)
 from .validators import (
     name_validator,
     description_validator,
@@ -17,9 +27,14 @@ from .validators import (
     tags_validator,
 )
 from .fields import TagsField
-from .decorators import prevent_unauthorized_create_and_data_reveal
+from .decorators import (
+    prevent_unauthorized_create_and_data_reveal,
+    check_unauthorized_create_and_data_reveal,
+)
 
-from .services import sync_or_add_document_to_meiliserach
+from .services import sync_or_add_document_to_meiliserach, VoteCounter, HotSpeeds
+from .cache import SpeedResponseCache, SpeedFragmentCache
+from .leaderboards import SpeedLeaderboards
 from core.common.decorators import restrict_field_updates
 
 
@@ -47,7 +62,59 @@ class BasicSpeedSerializer(serializers.ModelSerializer):
         return representation
 
 
-class SpeedBaseHyperlinkedSerializer(serializers.HyperlinkedModelSerializer):
+class SpeedSparseFieldsMixin:
+    """
+    Trims fields to a sparse fieldset (`?fields=id,name,kmph`) of the serializer's context,
+    ref: `core.speeds.views.SpeedViewSet.get_requested_fields`.
+    """
+
+    # model fields loaded for representation fields, ref: `get_only_fields`
+    field_columns = {
+        "url": ("id",),
+        "id": ("id",),
+        "name": ("name",),
+        "description": ("description",),
+        "speed_type": ("speed_type",),
+        "tags": ("tags",),
+        "kmph": ("kmph",),
+        "estimated": ("estimated",),
+        "is_public": ("is_public",),
+        "user": ("user", "user__username"),
+        # pending votes are merged into counters, ref: `VoteCounter.merge_pending`
+        "score": ("score", "upvotes", "downvotes"),
+        # annotations or a second pass, ref: `core.speeds.services.set_user_speed_data`
+        "user_speed_feedback": (),
+        "user_speed_bookmark": (),
+    }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested_fields = self.context.get("fields")
+        if requested_fields is None:
+            return fields
+        return {
+            field_name: field
+            for field_name, field in fields.items()
+            if field_name in requested_fields
+        }
+
+    @classmethod
+    def get_only_fields(cls, requested_fields) -> list[str]:
+        """
+        Returns arguments of `QuerySet.only()` for `requested_fields`,
+        `updated_at` is always loaded, paginators and `ETag`s rely on it.
+        """
+        only_fields = ["id", "updated_at"]
+        for field_name in requested_fields:
+            for column in cls.field_columns[field_name]:
+                if column not in only_fields:
+                    only_fields.append(column)
+        return only_fields
+
+
+class SpeedBaseHyperlinkedSerializer(
+    SpeedSparseFieldsMixin, serializers.HyperlinkedModelSerializer
+):
     """
     Serialzier for unauthenticated users.
     """
@@ -80,7 +147,8 @@ class SpeedBaseHyperlinkedSerializer(serializers.HyperlinkedModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
 
-        representation["user"] = instance.user.username
+        if "user" in representation:
+            representation["user"] = instance.user.username
 
         return representation
 
@@ -120,25 +188,20 @@ class SpeedHyperlinkedSerializer(SpeedBaseHyperlinkedSerializer):
             return obj.user_speed_bookmark[0]
         return None
 
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-
-        method = self.context.get("request").method
-        if method in ("POST", "PATCH", "PUT", "DELETE"):
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            speed_feedback = SpeedFeedback(
+                vote=Vote.UPVOTE, user=instance.user, speed=instance
+            )
+            speed_feedback.save()
             sync_or_add_document_to_meiliserach(
-                index_name="speeds",
-                action="add" if method == "POST" else "update",
-                data={**representation},
+                index_name="speeds", action="add", ids=[instance.id]
             )
-
-        return representation
-
-    def create(self, validated_data):
-        instance = super().create(validated_data)
-        speed_feedback = SpeedFeedback(
-            vote=Vote.UPVOTE, user=instance.user, speed=instance
-        )
-        speed_feedback.save()
+            if instance.is_public:
+                HotSpeeds.add_on_commit(
+                    instance.id, HotSpeeds.get_vote_changes(None, None, Vote.UPVOTE)
+                )
 
         # don't save, a workaround for the 'POST' method
         instance.user_speed_feedback = [
@@ -150,6 +213,57 @@ class SpeedHyperlinkedSerializer(SpeedBaseHyperlinkedSerializer):
 
         return instance
 
+    @staticmethod
+    def bulk_create(validated_data_list: list[dict], user) -> list[Speed]:
+        """
+        The batched counterpart of `create`, `Speed` objects and their initial upvotes
+        are inserted with one `bulk_create` each, and queued for indexing as a single batch.
+        `bulk_create` doesn't send signals, cached responses are invalidated here.
+        """
+        if not validated_data_list:
+            return []
+
+        instances = [
+            Speed(user=user, **validated_data) for validated_data in validated_data_list
+        ]
+        with transaction.atomic():
+            Speed.objects.bulk_create(instances)
+            speed_feedbacks = SpeedFeedback.objects.bulk_create(
+                [
+                    SpeedFeedback(vote=Vote.UPVOTE, user=user, speed=instance)
+                    for instance in instances
+                ]
+            )
+            sync_or_add_document_to_meiliserach(
+                index_name="speeds",
+                action="add",
+                ids=[instance.id for instance in instances],
+            )
+            for instance in instances:
+                if instance.is_public:
+                    HotSpeeds.add_on_commit(
+                        instance.id, HotSpeeds.get_vote_changes(None, None, Vote.UPVOTE)
+                    )
+            if SpeedResponseCache.is_enabled():
+                transaction.on_commit(lambda: SpeedResponseCache.bump([]))
+                transaction.on_commit(lambda: SpeedResponseCache.bump_user(user.id))
+            for instance in instances:
+                if instance.is_public:
+                    transaction.on_commit(
+                        lambda instance=instance: SpeedLeaderboards.sync_instance(instance)
+                    )
+
+        # don't save, a workaround for the 'POST' method
+        for instance, speed_feedback in zip(instances, speed_feedbacks):
+            instance.user_speed_feedback = [
+                {
+                    "feedback_id": speed_feedback.id,
+                    "feedback_vote": speed_feedback.vote,
+                },
+            ]
+
+        return instances
+
     def update(self, instance, validated_data):
         # ref: `core.speeds.views.SpeedViewSet.perform_delete`
         method = self.context.get("request").method
@@ -160,10 +274,188 @@ class SpeedHyperlinkedSerializer(SpeedBaseHyperlinkedSerializer):
                 "is_public": False,
             }
 
-        return super().update(instance, validated_data)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            sync_or_add_document_to_meiliserach(
+                index_name="speeds", action="update", ids=[instance.id]
+            )
+
+        return instance
+
+
+class SpeedListRow:
+    """
+    A mutable row of `SpeedFastListSerializer.values_fields`, used instead of `Speed` objects
+    by `SpeedViewSet` list actions, so `set_user_speed_data` and `VoteCounter.merge_pending` still apply.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "description",
+        "speed_type",
+        "tags",
+        "kmph",
+        "estimated",
+        "is_public",
+        "username",
+        "score",
+        "upvotes",
+        "downvotes",
+        "updated_at",
+        "user_speed_feedback",
+        "user_speed_bookmark",
+    )
+
+    def __init__(self, row: tuple):
+        (
+            self.id,
+            self.name,
+            self.description,
+            self.speed_type,
+            self.tags,
+            self.kmph,
+            self.estimated,
+            self.is_public,
+            self.username,
+            self.score,
+            self.upvotes,
+            self.downvotes,
+            self.updated_at,
+        ) = row
+        self.user_speed_feedback = []
+        self.user_speed_bookmark = []
+
+
+class SpeedFastListSerializer:
+    """
+    A read-only fast path of `SpeedBaseHyperlinkedSerializer` (anonymous users)
+    and `SpeedHyperlinkedSerializer` (authenticated users) for lists,
+    builds representations from `.values_list()` rows and a precompiled URL template
+    instead of DRF fields. The rendered output is byte-identical to theirs.
+    """
+
+    values_fields = (
+        "id",
+        "name",
+        "description",
+        "speed_type",
+        "tags",
+        "kmph",
+        "estimated",
+        "is_public",
+        "user__username",
+        "score",
+        "upvotes",
+        "downvotes",
+        "updated_at",
+    )
+    url_placeholder = "00000000-0000-0000-0000-000000000000"
+
+    def __init__(self, rows: list[SpeedListRow], context: dict):
+        self.rows = rows
+        self.context = context
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.SPEEDS["FAST_LIST_SERIALIZER"]
+
+    @classmethod
+    def get_values_queryset(cls, queryset):
+        # named rows, paginators read `updated_at` and `id` of the last row
+        return queryset.values_list(*cls.values_fields, named=True)
+
+    def get_url_template(self) -> tuple[str, str]:
+        url = self.context["request"].build_absolute_uri(
+            reverse("speed-detail", kwargs={"pk": self.url_placeholder})
+        )
+        prefix, suffix = url.split(self.url_placeholder)
+        return prefix, suffix
+
+    @staticmethod
+    def get_public_representation(row: SpeedListRow) -> dict:
+        """
+        Fields from `id` to `user`, ref: `SpeedFragmentCache`.
+        """
+        return {
+            "id": str(row.id),
+            "name": row.name,
+            "description": row.description,
+            "speed_type": row.speed_type,
+            "tags": row.tags,
+            "kmph": float(row.kmph),
+            "estimated": row.estimated,
+            "is_public": row.is_public,
+            "user": row.username,
+        }
+
+    def get_live_representation(self, row: SpeedListRow) -> dict:
+        representation = {"score": int(row.score)}
+        # ref: `SpeedHyperlinkedSerializer.get_user_speed_feedback` and `get_user_speed_bookmark`
+        if self.context["request"].user.is_authenticated:
+            representation["user_speed_feedback"] = (
+                row.user_speed_feedback[0] if len(row.user_speed_feedback) == 1 else None
+            )
+            representation["user_speed_bookmark"] = (
+                row.user_speed_bookmark[0] if len(row.user_speed_bookmark) == 1 else None
+            )
+        return representation
+
+    @property
+    def data(self) -> list[dict]:
+        prefix, suffix = self.get_url_template()
+        return [
+            {
+                "url": prefix + str(row.id) + suffix,
+                **self.get_public_representation(row),
+                **self.get_live_representation(row),
+            }
+            for row in self.rows
+        ]
+
+    def render(self) -> bytes:
+        """
+        Renders the list of representations (the same bytes `JSONRenderer` renders from `data`),
+        public parts are read from `SpeedFragmentCache` with a single `MGET`,
+        missing ones are encoded and stored.
+        """
+        renderer = JSONRenderer()
+        prefix, suffix = self.get_url_template()
+
+        items, missing = [], []
+        for row, fragment in zip(self.rows, SpeedFragmentCache.get_many(self.rows)):
+            if fragment is None:
+                # without braces
+                fragment = renderer.render(self.get_public_representation(row))[1:-1]
+                missing.append((row, fragment))
+            items.append(
+                b'{"url":'
+                + renderer.render(prefix + str(row.id) + suffix)
+                + b","
+                + fragment
+                + b","
+                + renderer.render(self.get_live_representation(row))[1:]
+            )
+        SpeedFragmentCache.set_many(missing)
+        return b"[" + b",".join(items) + b"]"
+
+
+class SpeedFeedbackBatchItemSerializer(serializers.Serializer):
+    """
+    An item of the `batch` endpoint, ref: `SpeedFeedbackSerializer.batch_vote`.
+    `Speed` objects of all items are fetched with a single query.
+    """
+
+    speed = serializers.UUIDField()
+    vote = serializers.ChoiceField(choices=Vote.choices)
 
 
 class SpeedFeedbackSerializer(serializers.ModelSerializer):
+    # a single query for the `Speed` object and its user (permission checks and nested representations)
+    speed = serializers.PrimaryKeyRelatedField(
+        queryset=Speed.objects.select_related("user")
+    )
+
     class Meta:
         model = SpeedFeedback
         fields = ["id", "vote", "speed", "user"]
@@ -187,42 +479,50 @@ class SpeedFeedbackSerializer(serializers.ModelSerializer):
                 "You should either upvote or downvote, not vote with 0. Please use 1 or -1 instead.",
             )
 
-        # this is a workaround since passing this validator into the Meta's `validators` attribute won't work
-        # the 'user' field is only available during the 'create' operation in validated_data (passed by the 'perform_create' method).
-        validator = UniqueTogetherValidator(
-            queryset=SpeedFeedback.objects.all(),
-            fields=["user", "speed"],
-            message="The UNIQUE constraint failed; the `Speed` object has already been voted on.",
-        )
-        validator(validated_data, self)
         serializers.raise_errors_on_nested_writes("create", self, validated_data)
 
-        # prevents a race conditions
+        user, speed = validated_data["user"], validated_data["speed"]
+        write_behind = VoteCounter.is_enabled()
+        # a single statement inserts the vote and (unless votes are written behind) counts it,
+        # ref: `SpeedFeedback.insert_vote`
         try:
-            with transaction.atomic():
-                speed = Speed.objects.select_for_update().get(
-                    id=validated_data["speed"].id
-                )
-
-                if curr_vote == -1:
-                    speed.downvotes += 1
-                elif curr_vote == 1:
-                    speed.upvotes += 1
-                speed.score = speed.upvotes - speed.downvotes
-
-                speed.is_synced_in_meilisearch = False
-                speed.save()
-
-                ModelClass = self.Meta.model
-                instance = ModelClass._default_manager.create(**validated_data)
+            inserted = SpeedFeedback.insert_vote(
+                user.id, speed.id, curr_vote, count=not write_behind
+            )
         except Exception as e:
             logger.warning(f"core.speeds.{__name__}; {str(e)}")
             raise APIException(
                 "An unexpected error occurred while processing your request. Please try again later."
             )
+        # a conflict of the `fb_unique_user_speed` constraint
+        if inserted is None:
+            raise ValidationError(
+                "The UNIQUE constraint failed; the `Speed` object has already been voted on.",
+                code="unique",
+            )
+
+        instance, counters = inserted
+        instance.user, instance.speed = user, speed
+        # raw inserts don't send signals
+        post_save.send(sender=SpeedFeedback, instance=instance, created=True)
+        if speed.is_public:
+            HotSpeeds.add_on_commit(
+                speed.id, HotSpeeds.get_vote_changes(None, None, curr_vote)
+            )
+
+        if write_behind:
+            VoteCounter.add_on_commit(
+                instance.speed_id, *VoteCounter.get_deltas(None, instance.vote)
+            )
+            # the nested representation of the Speed's score
+            SpeedCounters.overlay([speed])
+            VoteCounter.merge_pending([speed])
+            return instance
 
         # fix for the nested representation of the Speed's score
-        instance.speed.score = speed.score
+        speed.upvotes, speed.downvotes, speed.score = counters
+        transaction.on_commit(lambda: SpeedResponseCache.bump([speed.id]))
+        SpeedLeaderboards.set_scores_on_commit({speed.id: speed.score})
         return instance
 
     @restrict_field_updates("speed", "user")
@@ -240,28 +540,20 @@ class SpeedFeedbackSerializer(serializers.ModelSerializer):
         if curr_vote == prev_vote:
             return instance
 
-        # prevents a race conditions
+        if VoteCounter.is_enabled():
+            return self.update_write_behind(instance, validated_data)
+
+        prev_updated_at = instance.updated_at
+        # the counters row is locked by the update, ref: `SpeedCounters.add`
         try:
             with transaction.atomic():
-                speed = Speed.objects.select_for_update().get(id=instance.speed.id)
-
-                if prev_vote == -1:
-                    speed.downvotes -= 1
-                elif prev_vote == 1:
-                    speed.upvotes -= 1
-
-                if curr_vote == -1:
-                    speed.downvotes += 1
-                elif curr_vote == 1:
-                    speed.upvotes += 1
-                speed.score = speed.upvotes - speed.downvotes
-
-                speed.is_synced_in_meilisearch = False
-                speed.save()
-
                 for key, val in validated_data.items():
                     setattr(instance, key, val)
                 instance.save()
+
+                counters = SpeedCounters.add(
+                    [(instance.speed_id, *VoteCounter.get_deltas(prev_vote, curr_vote))]
+                )
         except Exception as e:
             logger.error(f"core.speeds.{__name__}; {str(e)}")
             raise APIException(
@@ -269,11 +561,209 @@ class SpeedFeedbackSerializer(serializers.ModelSerializer):
             )
 
         # fix for the nested representation of the Speed's score
-        instance.speed.score = speed.score
+        speed = instance.speed
+        speed.upvotes, speed.downvotes, speed.score = counters[str(speed.id)]
+        transaction.on_commit(lambda: SpeedResponseCache.bump([speed.id]))
+        SpeedLeaderboards.set_scores_on_commit({speed.id: speed.score})
+        if speed.is_public:
+            HotSpeeds.add_on_commit(
+                speed.id, HotSpeeds.get_vote_changes(prev_vote, prev_updated_at, curr_vote)
+            )
+        return instance
+
+    def update_write_behind(self, instance, validated_data):
+        """
+        Ref: `core.speeds.services.VoteCounter`.
+        """
+        prev_vote, prev_updated_at = instance.vote, instance.updated_at
+        try:
+            for key, val in validated_data.items():
+                setattr(instance, key, val)
+            instance.save()
+        except Exception as e:
+            logger.error(f"core.speeds.{__name__}; {str(e)}")
+            raise APIException(
+                "An unexpected error occurred while processing your request. Please try again later."
+            )
+
+        VoteCounter.add_on_commit(
+            instance.speed_id, *VoteCounter.get_deltas(prev_vote, instance.vote)
+        )
+        if instance.speed.is_public:
+            HotSpeeds.add_on_commit(
+                instance.speed_id,
+                HotSpeeds.get_vote_changes(prev_vote, prev_updated_at, instance.vote),
+            )
+        # the nested representation of the Speed's score
+        SpeedCounters.overlay([instance.speed])
+        VoteCounter.merge_pending([instance.speed])
         return instance
 
+    @staticmethod
+    def batch_vote(
+        items: list[tuple[int, dict]], user
+    ) -> tuple[list[tuple[int, SpeedFeedback, bool]], list[dict]]:
+        """
+        The batched counterpart of `create` and `update`, applies `(index, validated_data)` votes
+        of `SpeedFeedbackBatchItemSerializer` in one transaction. A vote is created if the user
+        hasn't voted on the `Speed` object yet, otherwise it's updated.
+        Returns `(index, instance, created)` results and `{"index", "errors"}` errors of items.
+
+        Rows are locked in the order of `Speed` ids, feedback rows of the user first, then
+        `SpeedCounters` rows (ref: `SpeedCounters.add`), the same order as single votes take them,
+        so concurrent batches (and single votes) with overlapping `Speed` objects can't deadlock.
+        Bulk writes don't send signals, cached responses are invalidated here.
+        """
+        results, errors = [], []
+        speeds = Speed.objects.select_related("user").in_bulk(
+            {validated_data["speed"] for _, validated_data in items}
+        )
+        votes = {}
+        for index, validated_data in items:
+            speed = speeds.get(validated_data["speed"])
+            if speed is None:
+                errors.append(
+                    {
+                        "index": index,
+                        "errors": {
+                            "speed": [
+                                f'Invalid pk "{validated_data["speed"]}" - object does not exist.'
+                            ]
+                        },
+                    }
+                )
+                continue
+            # the same rule guards `create` and `SpeedFeedbackPermissions` guards `update`
+            try:
+                check_unauthorized_create_and_data_reveal(user, speed)
+            except PermissionDenied as e:
+                errors.append({"index": index, "errors": {"detail": e.detail}})
+                continue
+            if speed.id in votes:
+                errors.append(
+                    {
+                        "index": index,
+                        "errors": {
+                            "speed": ["The `Speed` object has already been voted on in this batch."]
+                        },
+                    }
+                )
+                continue
+            votes[speed.id] = (index, validated_data["vote"])
+
+        if not votes:
+            return results, errors
+
+        write_behind = VoteCounter.is_enabled()
+        try:
+            with transaction.atomic():
+                existing = {
+                    feedback.speed_id: feedback
+                    for feedback in SpeedFeedback.objects.select_for_update()
+                    .filter(user=user, speed_id__in=votes)
+                    .order_by("speed_id")
+                }
+
+                new_votes, updated, deltas, hot_changes = [], [], [], []
+                updated_at = timezone.now()
+                for speed_id in sorted(votes):
+                    index, vote = votes[speed_id]
+                    feedback = existing.get(speed_id)
+                    if feedback is None:
+                        if vote == Vote.DEFAULT_STATE:
+                            errors.append(
+                                {
+                                    "index": index,
+                                    "errors": {
+                                        "vote": [
+                                            "You should either upvote or downvote, not vote with 0. Please use 1 or -1 instead."
+                                        ]
+                                    },
+                                }
+                            )
+                            continue
+                        new_votes.append((speed_id, vote))
+                        continue
+
+                    if feedback.vote != vote:
+                        deltas.append((speed_id, *VoteCounter.get_deltas(feedback.vote, vote)))
+                        hot_changes.append(
+                            (
+                                speed_id,
+                                HotSpeeds.get_vote_changes(feedback.vote, feedback.updated_at, vote),
+                            )
+                        )
+                        feedback.vote, feedback.updated_at = vote, updated_at
+                        updated.append(feedback)
+                    results.append((index, feedback, False))
+
+                inserted = {
+                    feedback.speed_id: feedback
+                    for feedback in SpeedFeedback.insert_votes(user.id, new_votes)
+                }
+                for speed_id, vote in new_votes:
+                    index = votes[speed_id][0]
+                    # a concurrent request has inserted the vote
+                    if speed_id not in inserted:
+                        errors.append(
+                            {
+                                "index": index,
+                                "errors": {
+                                    "speed": [
+                                        "The UNIQUE constraint failed; the `Speed` object has already been voted on."
+                                    ]
+                                },
+                            }
+                        )
+                        continue
+                    deltas.append((speed_id, *VoteCounter.get_deltas(None, vote)))
+                    hot_changes.append((speed_id, HotSpeeds.get_vote_changes(None, None, vote)))
+                    results.append((index, inserted[speed_id], True))
+
+                # `auto_now` isn't applied by `bulk_update`
+                SpeedFeedback.objects.bulk_update(updated, ["vote", "updated_at"])
+
+                deltas.sort()
+                if write_behind:
+                    for delta in deltas:
+                        VoteCounter.add_on_commit(*delta)
+                else:
+                    counters = SpeedCounters.add(deltas)
+                    SpeedLeaderboards.set_scores_on_commit(
+                        {speed_id: score for speed_id, (_, _, score) in counters.items()}
+                    )
+
+                for speed_id, changes in hot_changes:
+                    if speeds[speed_id].is_public:
+                        HotSpeeds.add_on_commit(speed_id, changes)
+
+                if deltas and SpeedResponseCache.is_enabled():
+                    speed_ids = [delta[0] for delta in deltas]
+                    transaction.on_commit(lambda: SpeedResponseCache.bump(speed_ids))
+                    transaction.on_commit(lambda: SpeedResponseCache.bump_user(user.id))
+        except Exception as e:
+            logger.error(f"core.speeds.{__name__}; {str(e)}")
+            raise APIException(
+                "An unexpected error occurred while processing your request. Please try again later."
+            )
+
+        for _, instance, _ in results:
+            instance.user, instance.speed = user, speeds[instance.speed_id]
+        # nested representations of Speeds' scores
+        result_speeds = [instance.speed for _, instance, _ in results]
+        SpeedCounters.overlay(result_speeds)
+        VoteCounter.merge_pending(result_speeds)
+
+        results.sort(key=lambda result: result[0])
+        errors.sort(key=lambda error: error["index"])
+        return results, errors
+
 
 class SpeedBookmarkSerializer(serializers.ModelSerializer):
+    # a single query for the `Speed` object and its user (permission checks and nested representations)
+    speed = serializers.PrimaryKeyRelatedField(
+        queryset=Speed.objects.select_related("user")
+    )
     category = serializers.CharField(
         default="favorites", validators=[category_validator]
     )
@@ -298,12 +788,25 @@ class SpeedBookmarkSerializer(serializers.ModelSerializer):
         representation["user"] = instance.user.username
         return representation
 
+    unique_error_message = "The UNIQUE constraint failed; the `Speed` object is already bookmarked for this category."
+
     @prevent_unauthorized_create_and_data_reveal
     def create(self, validated_data):
-        # this is a workaround since passing this validator into the Meta's `validators` attribute won't work
-        # the 'user' field is only available during the 'create' operation in validated_data (passed by the 'perform_create' method).
-        self.__unique_together_validator(validated_data)
-        return super().create(validated_data)
+        # a conflict of the `bm_unique_user_speed` constraint is reported by the insert itself,
+        # instead of a separate uniqueness query, ref: `SpeedBookmark.insert`
+        serializers.raise_errors_on_nested_writes("create", self, validated_data)
+        instance = SpeedBookmark.insert(
+            validated_data["user"].id,
+            validated_data["speed"].id,
+            validated_data["category"],
+        )
+        if instance is None:
+            raise ValidationError(self.unique_error_message, code="unique")
+
+        instance.user, instance.speed = validated_data["user"], validated_data["speed"]
+        # raw inserts don't send signals
+        post_save.send(sender=SpeedBookmark, instance=instance, created=True)
+        return instance
 
     @restrict_field_updates("speed", "user")
     def update(self, instance, validated_data):
@@ -311,21 +814,20 @@ class SpeedBookmarkSerializer(serializers.ModelSerializer):
         Only the 'category' field is modifiable via the HTTP `PATCH` method.
         The HTTP `PUT` method is disabled in the bookmark related view.
         """
-        self.__unique_together_validator(validated_data)
-        return super().update(instance, validated_data)
-
-    def __unique_together_validator(self, validated_data):
         # responds with 400 status code with a custom message instead of throwing `IntegrityError`
-        validator = UniqueTogetherValidator(
-            queryset=SpeedBookmark.objects.all(),
-            fields=["category", "user", "speed"],
-            message="The UNIQUE constraint failed; the `Speed` object is already bookmarked for this category.",
-        )
-        validator(validated_data, self)
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise ValidationError(self.unique_error_message, code="unique")
 
 
 class SpeedReportSerializer(serializers.ModelSerializer):
     detail = serializers.CharField(validators=[detail_validator])
+    # a single query for the `Speed` object and its user (permission checks and nested representations)
+    speed = serializers.PrimaryKeyRelatedField(
+        queryset=Speed.objects.select_related("user")
+    )
 
     class Meta:
         model = SpeedReport
@@ -348,13 +850,14 @@ class SpeedReportSerializer(serializers.ModelSerializer):
 
     @prevent_unauthorized_create_and_data_reveal
     def create(self, validated_data):
-        obj, _ = SpeedReport.objects.update_or_create(
-            user=validated_data["user"],
-            speed=validated_data["speed"],
-            defaults={
-                "report_reason": validated_data["report_reason"],
-                "detail": validated_data["detail"],
-            },
+        # a single `INSERT ... ON CONFLICT DO UPDATE` instead of `update_or_create`,
+        # ref: `SpeedReport.upsert`
+        obj = SpeedReport.upsert(
+            validated_data["user"].id,
+            validated_data["speed"].id,
+            validated_data["report_reason"],
+            validated_data["detail"],
         )
+        obj.user, obj.speed = validated_data["user"], validated_data["speed"]
 
         return obj
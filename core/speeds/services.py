@@ -1,85 +1,767 @@
-import pickle
-from random import sample
-from collections import OrderedDict
+import json
+import time
+from datetime import timedelta
+from random import getrandbits
+from collections import defaultdict
+from uuid import uuid4
 
+from redis.exceptions import LockError, RedisError
+from rest_framework.renderers import JSONRenderer
+
+from django.conf import settings
 from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 
-from .queries import SpeedQueries
+from core.meilisearch import client as ms_client
+from .cache import SpeedResponseCache
+from .leaderboards import SpeedLeaderboards
+from .models import Speed, SpeedCounters, SpeedFeedback, Vote, VoteFlush, SearchOutbox
+from .queries import SpeedQueries, SpeedFeedbackQueries
 from . import logger
 
 
 r = cache.client.get_client()
 
 
+# `random_speeds_pool_current:<pool_name>` points to the current version of a random speeds pool,
+# a `random_speeds_pool:<pool_name>:<version>` hash
+RANDOM_SPEEDS_POOL_PREFIX = "random_speeds_pool:"
+RANDOM_SPEEDS_POOL_POINTER_PREFIX = "random_speeds_pool_current:"
+RANDOM_SPEEDS_POOL_VERSION = "random_speeds_pool_version"
+#                          s  m  h    s  m
+RANDOM_SPEEDS_POOL_TTL = (60 * 60 * 12) + (60 * 20)
+# sampling readers keep a previous version for at most `RANDOM_SPEEDS_POOL_VERSION_CACHE_TTL` seconds,
+# cursors of `random-list` pages keep the version, once it has expired they get `410 Gone`
+RANDOM_SPEEDS_POOL_GRACE_PERIOD = 60
+
+
+def get_random_speeds_pool_key(pool_name: str, version) -> str:
+    return f"{RANDOM_SPEEDS_POOL_PREFIX}{pool_name}:{version}"
+
+
+def get_random_speeds_pool_pointer(pool_name: str) -> str:
+    return f"{RANDOM_SPEEDS_POOL_POINTER_PREFIX}{pool_name}"
+
+
+def get_random_speeds_pool_name(speed_type: None | str = None, tag: None | str = None) -> str:
+    if speed_type is not None:
+        return f"speed_type:{speed_type}"
+    if tag is not None:
+        return f"tag:{tag}"
+    return "all"
+
+
 def cache_random_speeds(k: int = 1200) -> None:
     """
     This function is responsible for generating and storing random `Speed` objects in the Redis cache,
-    along with caching the `upper_limit` (length value) of the generated list.
-    Random speed objects are cached as key-value pairs,
-    where keys (integers) are within the closed range from 0 to (`upper_limit` - 1).
+    a pool of all `Speed` objects, a pool for each `Speed.SpeedType`
+    and a pool for each of `settings.SPEEDS["RANDOM_POOL_TAGS"]` most popular tags.
+    Pools of tags that are no longer popular expire with their `RANDOM_SPEEDS_POOL_TTL`.
+    """
+    for pool_name, filters in get_random_speeds_pools().items():
+        cache_random_speeds_pool(pool_name, k, **filters)
+
+
+def get_random_speeds_pools() -> dict[str, dict]:
+    """
+    Returns filters of `SpeedQueries.get_random_list_query` by names of random speeds pools.
+    """
+    pools = {get_random_speeds_pool_name(): {}}
+    for speed_type in Speed.SpeedType.values:
+        pools[get_random_speeds_pool_name(speed_type=speed_type)] = {"speed_type": speed_type}
+    for tag, frequency in SpeedQueries.get_popular_tags(settings.SPEEDS["RANDOM_POOL_TAGS"]):
+        pools[get_random_speeds_pool_name(tag=tag)] = {"tag": tag, "selectivity": frequency}
+    return pools
+
+
+def cache_random_speeds_pool(pool_name: str, k: int, **filters) -> None:
+    """
+    A new pool is written under a new versioned key, then published by switching
+    the pool's pointer, readers never see a partially written pool.
+    The previous version expires after `RANDOM_SPEEDS_POOL_GRACE_PERIOD` seconds.
+    Random speed objects are cached as key-value pairs of UTF-8 JSON fragments,
+    where keys (integers) are within the closed range from 0 to (`HLEN` - 1).
     """
 
     from .serializers import BasicSpeedSerializer
 
     random_speeds_list = BasicSpeedSerializer(
-        SpeedQueries.get_random_list_query(k),
+        SpeedQueries.get_random_list_query(k, **filters),
         many=True,
     )
 
-    # redis hset doesn't allow an empy dict
-    mapping = {"-1": "dummy"}
+    renderer = JSONRenderer()
+    mapping = {}
     for i, speed in enumerate(random_speeds_list.data):
-        # <class 'collections.OrderedDict'>
-        pickled = pickle.dumps(speed)
-        mapping[str(i)] = pickled
+        mapping[str(i)] = renderer.render(speed)
+
+    # redis hset doesn't allow an empy dict, keep serving the previous version
+    if not mapping:
+        logger.warning(
+            f"core.speeds.{__name__}; `{cache_random_speeds_pool.__name__}` has found no `Speed` objects for the `{pool_name}` pool."
+        )
+        return
 
-    # `mapping` keys range from 0 to (`upper_limit` - 1) inclusive
-    upper_limit = len(mapping) - 1
+    version = r.incr(RANDOM_SPEEDS_POOL_VERSION)
+    pool = get_random_speeds_pool_key(pool_name, version)
+
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(pool, mapping=mapping)
+    pipe.expire(pool, RANDOM_SPEEDS_POOL_TTL)
+    pipe.execute()
+
+    previous_version = r.set(
+        get_random_speeds_pool_pointer(pool_name),
+        version,
+        ex=RANDOM_SPEEDS_POOL_TTL,
+        get=True,
+    )
+    if previous_version is not None:
+        r.expire(
+            get_random_speeds_pool_key(pool_name, previous_version.decode("utf-8")),
+            RANDOM_SPEEDS_POOL_GRACE_PERIOD,
+        )
 
-    r.hset("random_speeds_hash", mapping=mapping)
-    #                               s  m  h    s  m
-    r.expire("random_speeds_hash", (60 * 60 * 12) + (60 * 20))
-    r.set("random_speeds_hash_upper_limit", upper_limit)
-    r.expire("random_speeds_hash_upper_limit", (60 * 60 * 12) + (60 * 20))
 
+# Process-local cache of current pool versions, `{<pool_name>: (<version>, <expires at>)}`.
+# A cached version is read for at most `RANDOM_SPEEDS_POOL_VERSION_CACHE_TTL` seconds after
+# a refresh has switched the pointer, it stays readable for `RANDOM_SPEEDS_POOL_GRACE_PERIOD`.
+_random_speeds_pool_versions = {}
+RANDOM_SPEEDS_POOL_VERSION_CACHE_TTL = 10
 
-def get_random_speeds(k: int = 10) -> OrderedDict:
+
+def get_random_speeds_pool_version(pool_name: str, refresh: bool = False) -> None | str:
     """
-    This function is responsible for retrieving `k` random `Speed` objects from the Redis cache.
-    It returns a 'ready-to-serve' data for a DRF view's response.
+    Returns the current version of a random speeds pool, `None` if it hasn't been cached.
+    Scripts of random speeds pools only touch keys they are given, so the versioned key
+    is resolved here (ref: `_random_speeds_pool_versions`), not within a script.
     """
-    upper_limit = int(r.get("random_speeds_hash_upper_limit"))
-    k = k if upper_limit >= k else upper_limit
+    cached = _random_speeds_pool_versions.get(pool_name)
+    if cached is not None and not refresh and cached[1] > time.monotonic():
+        return cached[0]
+
+    version = r.get(get_random_speeds_pool_pointer(pool_name))
+    if version is None:
+        _random_speeds_pool_versions.pop(pool_name, None)
+        return None
+    version = version.decode("utf-8")
+    _random_speeds_pool_versions[pool_name] = (
+        version,
+        time.monotonic() + RANDOM_SPEEDS_POOL_VERSION_CACHE_TTL,
+    )
+    return version
+
+
+# Samples up to `ARGV[1]` distinct random `Speed` objects of the pool `KEYS[1]` with a partial
+# Fisher-Yates shuffle of keys from 0 to (`HLEN` - 1), the shuffle is seeded with `ARGV[2]`.
+SAMPLE_RANDOM_SPEEDS_SCRIPT = r.register_script(
+    """
+    local upper_limit = redis.call('HLEN', KEYS[1])
+    if upper_limit == 0 then
+        return {}
+    end
+    local k = math.min(tonumber(ARGV[1]), upper_limit)
+    math.randomseed(tonumber(ARGV[2]))
+
+    -- only swapped positions are stored
+    local swapped = {}
+    local fields = {}
+    for i = 0, k - 1 do
+        local j = math.random(i, upper_limit - 1)
+        local at_i = swapped[i] or i
+        local at_j = swapped[j] or j
+        swapped[j] = at_i
+        fields[#fields + 1] = tostring(at_j)
+    end
 
-    random_keys = sample(range(upper_limit), k)
-    random_speeds_list = []
-    flag = False
-    for key in random_keys:
-        # <class 'collections.OrderedDict'>
-        speed = r.hget(key=str(key), name="random_speeds_hash")
-        if speed != None:
-            random_speeds_list.append(pickle.loads(speed))
+    local speeds = {}
+    for _, speed in ipairs(redis.call('HMGET', KEYS[1], unpack(fields))) do
+        if speed then
+            speeds[#speeds + 1] = speed
+        end
+    end
+    return speeds
+    """
+)
+
+
+def get_random_speeds(k: int = 10, pool_name: str = "all") -> list[bytes]:
+    """
+    This function is responsible for retrieving `k` random `Speed` objects from a pool in the Redis cache,
+    with a single round trip while the pool's version is cached, ref: `SAMPLE_RANDOM_SPEEDS_SCRIPT`.
+    It returns JSON fragments, ref: `render_random_speeds`.
+    """
+    # a cached version may be gone (e.g. an evicted pool), the pointer is read again once
+    for refresh in (False, True):
+        version = get_random_speeds_pool_version(pool_name, refresh=refresh)
+        if version is None:
+            return []
+        random_speeds_list = SAMPLE_RANDOM_SPEEDS_SCRIPT(
+            keys=[get_random_speeds_pool_key(pool_name, version)],
+            args=[k, getrandbits(31)],
+        )
+        if random_speeds_list:
+            return random_speeds_list
+    return []
+
+
+# Returns up to `ARGV[1]` `Speed` objects of the pool `KEYS[1]` at positions from `ARGV[3]` of a permutation
+# seeded with `ARGV[2]`, `i -> (a * i + b) mod n` with `a` coprime to `n` (the pool's `HLEN`).
+# The same seed, version and offset always return the same objects, consecutive offsets never repeat them.
+# Returns the size of the pool and the objects, `{}` if the pool doesn't exist (or has expired).
+PERMUTED_RANDOM_SPEEDS_SCRIPT = r.register_script(
+    """
+    local n = redis.call('HLEN', KEYS[1])
+    if n == 0 then
+        return {}
+    end
+
+    local seed = tonumber(ARGV[2])
+    local offset = tonumber(ARGV[3])
+    local function gcd(x, y)
+        while y ~= 0 do
+            x, y = y, x % y
+        end
+        return x
+    end
+    local a = seed % n
+    if a == 0 then
+        a = 1
+    end
+    while gcd(a, n) ~= 1 do
+        a = a % n + 1
+    end
+    local b = (seed * 7919) % n
+
+    local fields = {}
+    for i = offset, math.min(offset + tonumber(ARGV[1]), n) - 1 do
+        fields[#fields + 1] = tostring((a * i + b) % n)
+    end
+
+    local result = {n}
+    if #fields > 0 then
+        for _, speed in ipairs(redis.call('HMGET', KEYS[1], unpack(fields))) do
+            if speed then
+                result[#result + 1] = speed
+            end
+        end
+    end
+    return result
+    """
+)
+
+
+def get_permuted_random_speeds(
+    k: int,
+    seed: int,
+    offset: int = 0,
+    version: None | str = None,
+    pool_name: str = "all",
+) -> tuple[list[bytes], None | dict]:
+    """
+    Pages through a deterministic permutation of a random speeds pool without repeats
+    and without any per-client state, ref: `PERMUTED_RANDOM_SPEEDS_SCRIPT`.
+    Without the pool `version` the current one is browsed.
+    Returns JSON fragments and the state of the next page (`None` if the pool has been exhausted),
+    fragments are `None` if the pool `version` has expired (restarting at the current version
+    would repeat objects of previous pages).
+    """
+    if version is not None:
+        result = PERMUTED_RANDOM_SPEEDS_SCRIPT(
+            keys=[get_random_speeds_pool_key(pool_name, version)],
+            args=[k, seed, offset],
+        )
+        if not result:
+            return None, None
+    else:
+        # a cached version may be gone (e.g. an evicted pool), the pointer is read again once
+        for refresh in (False, True):
+            version = get_random_speeds_pool_version(pool_name, refresh=refresh)
+            if version is None:
+                return [], None
+            result = PERMUTED_RANDOM_SPEEDS_SCRIPT(
+                keys=[get_random_speeds_pool_key(pool_name, version)],
+                args=[k, seed, offset],
+            )
+            if result:
+                break
         else:
-            flag = True
+            return [], None
+
+    upper_limit = int(result[0])
+    random_speeds_list = result[1:]
+    next_offset = offset + k
+    if next_offset >= upper_limit:
+        return random_speeds_list, None
+    return random_speeds_list, {"seed": seed, "offset": next_offset, "version": version}
+
+
+def render_random_speeds(random_speeds_list: list[bytes], next_link: None | str = None) -> bytes:
+    """
+    Joins JSON fragments into a 'ready-to-serve' response body,
+    the same as `JSONRenderer` renders an unpaginated list response.
+    """
+    return (
+        b'{"count":'
+        + str(len(random_speeds_list)).encode()
+        + b',"next":'
+        + json.dumps(next_link).encode()
+        + b',"previous":null,"results":['
+        + b",".join(random_speeds_list)
+        + b"]}"
+    )
+
+
+def set_user_speed_data(speeds: list, user) -> None:
+    """
+    Sets `user_speed_feedback` and `user_speed_bookmark` attributes of already paginated `Speed` objects,
+    with one `IN (...)` query for each, instead of evaluating
+    `SpeedQueries.annotate_user_speed_data` subqueries for every row of a queryset.
+    Values have the same shape as the annotations, lists of dicts.
+    """
+    speed_ids = [speed.id for speed in speeds]
+    if not speed_ids:
+        return
+
+    feedback = defaultdict(list)
+    for speed_id, feedback_id, vote in SpeedQueries.get_user_speed_feedback_overlay_query(
+        user, speed_ids
+    ):
+        feedback[speed_id].append({"feedback_id": feedback_id, "feedback_vote": vote})
 
-    if flag:
-        logger.debug(
-            f"core.speeds.{__name__}; `{get_random_speeds.__name__}` is not functioning correctly. "
-            + f"Length of random_speeds_list == {len(random_speeds_list)}, upper_limit == {upper_limit}."
+    bookmark = defaultdict(list)
+    for speed_id, bookmark_id, category in SpeedQueries.get_user_speed_bookmark_overlay_query(
+        user, speed_ids
+    ):
+        bookmark[speed_id].append(
+            {"bookmark_id": bookmark_id, "bookmark_category": category}
         )
 
-    random_speeds = OrderedDict()
-    random_speeds["count"] = len(random_speeds_list)
-    random_speeds["next"] = None
-    random_speeds["previous"] = None
-    random_speeds["results"] = random_speeds_list
+    for speed in speeds:
+        speed.user_speed_feedback = feedback.get(speed.id, [])
+        speed.user_speed_bookmark = bookmark.get(speed.id, [])
 
-    return random_speeds
 
+# Renames the deltas hash (`KEYS[1]`) to the flushing hash (`KEYS[2]`), unless a previous flush
+# hasn't finished, and tags it with the `ARGV[1]` flush id.
+# Returns the flush id of the flushing hash, `nil` if there is nothing to flush.
+START_VOTES_FLUSH_SCRIPT = r.register_script(
+    """
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return false
+        end
+        redis.call('RENAME', KEYS[1], KEYS[2])
+    end
+    redis.call('HSETNX', KEYS[2], 'flush_id', ARGV[1])
+    return redis.call('HGET', KEYS[2], 'flush_id')
+    """
+)
+
+
+class VoteCounter:
+    """
+    Write-behind vote counters (enabled by `settings.SPEEDS["VOTES_WRITE_BEHIND"]`).
+    Vote deltas are added to a Redis hash with atomic `HINCRBY` instead of updating
+    a counters row per vote, `flush` folds them into `SpeedCounters` rows with a set-based `UPDATE`.
+    Hash fields are `<speed_id>:up` and `<speed_id>:down`, the flushing hash has a `flush_id` field.
+    """
+
+    deltas_hash = "speed_vote_deltas"
+    # deltas that are being folded into `SpeedCounters` rows, still pending for readers
+    # until their flush is committed
+    flushing_hash = "speed_vote_deltas_flushing"
+    flush_lock = "speed_vote_deltas_lock"
+    flush_lock_timeout = 60
+    flush_chunk_size = 5000
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.SPEEDS["VOTES_WRITE_BEHIND"]
+
+    @staticmethod
+    def get_deltas(prev_vote: None | int, curr_vote: int) -> tuple[int, int]:
+        """
+        Returns `(upvotes, downvotes)` deltas of a vote change.
+        """
+        upvotes, downvotes = 0, 0
+        if prev_vote == Vote.UPVOTE:
+            upvotes -= 1
+        elif prev_vote == Vote.DOWNVOTE:
+            downvotes -= 1
+
+        if curr_vote == Vote.UPVOTE:
+            upvotes += 1
+        elif curr_vote == Vote.DOWNVOTE:
+            downvotes += 1
+
+        return upvotes, downvotes
+
+    @classmethod
+    def add(cls, speed_id, upvotes: int, downvotes: int) -> None:
+        try:
+            pipe = r.pipeline(transaction=True)
+            if upvotes:
+                pipe.hincrby(cls.deltas_hash, f"{speed_id}:up", upvotes)
+            if downvotes:
+                pipe.hincrby(cls.deltas_hash, f"{speed_id}:down", downvotes)
+            pipe.execute()
+        except RedisError as e:
+            # the `SpeedFeedback` row is already saved, don't lose its vote
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.add` has failed, updating counters directly, {str(e)}"
+            )
+            counters = SpeedCounters.add([(speed_id, upvotes, downvotes)])
+            SpeedResponseCache.bump([speed_id])
+            SpeedLeaderboards.set_scores(
+                {speed_id: score for speed_id, (_, _, score) in counters.items()}
+            )
+
+    @classmethod
+    def add_on_commit(cls, speed_id, upvotes: int, downvotes: int) -> None:
+        transaction.on_commit(lambda: cls.add(speed_id, upvotes, downvotes))
+
+    @classmethod
+    def get_pending(cls, speed_ids: list) -> dict[str, tuple[int, int]]:
+        """
+        Returns not yet flushed `(upvotes, downvotes)` deltas, with one round trip.
+        """
+        fields = []
+        for speed_id in speed_ids:
+            fields += [f"{speed_id}:up", f"{speed_id}:down"]
+        if not fields:
+            return {}
+
+        pipe = r.pipeline(transaction=False)
+        pipe.hmget(cls.deltas_hash, fields)
+        pipe.hmget(cls.flushing_hash, fields + ["flush_id"])
+        deltas, (*flushing, flush_id) = pipe.execute()
+        # deltas of a committed flush are already counted in `SpeedCounters` rows,
+        # the flushing hash is deleted right after the commit
+        if (
+            flush_id is not None
+            and any(flushing)
+            and VoteFlush.objects.filter(flush_id=flush_id.decode("utf-8")).exists()
+        ):
+            flushing = [None] * len(fields)
 
-def sync_or_add_document_to_meiliserach(
-    index_name: str, action: str, data: dict
-):
-    from .tasks import sync_or_add_document_to_meiliserach_task
+        pending = {}
+        for i, speed_id in enumerate(speed_ids):
+            upvotes = int(deltas[2 * i] or 0) + int(flushing[2 * i] or 0)
+            downvotes = int(deltas[2 * i + 1] or 0) + int(flushing[2 * i + 1] or 0)
+            if upvotes or downvotes:
+                pending[str(speed_id)] = (upvotes, downvotes)
+        return pending
+
+    @classmethod
+    def merge_pending(cls, speeds: list) -> None:
+        """
+        Adds pending deltas to `upvotes`, `downvotes` and `score` of `Speed` objects (without saving them),
+        so scores look consistent to the client before a flush.
+        """
+        if not cls.is_enabled():
+            return
+        try:
+            pending = cls.get_pending([speed.id for speed in speeds])
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.merge_pending` has failed, {str(e)}"
+            )
+            return
+
+        for speed in speeds:
+            if str(speed.id) in pending:
+                upvotes, downvotes = pending[str(speed.id)]
+                speed.upvotes = max(speed.upvotes + upvotes, 0)
+                speed.downvotes = max(speed.downvotes + downvotes, 0)
+                speed.score = speed.upvotes - speed.downvotes
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Folds pending deltas into `SpeedCounters` rows, returns the number of updated rows.
+        The deltas hash is renamed first, so votes counted during a flush wait for the next one.
+        Deltas are applied exactly once, the flush id is recorded in the same transaction
+        (ref: `VoteFlush`), if a worker dies between the commit and the `DEL`,
+        the next flush only deletes the flushing hash.
+        """
+        try:
+            with r.lock(cls.flush_lock, timeout=cls.flush_lock_timeout, blocking_timeout=0):
+                return cls.flush_locked()
+        except LockError:
+            # another worker is flushing
+            return 0
+
+    @classmethod
+    def flush_locked(cls) -> int:
+        """
+        `flush` of a caller that holds the flush lock.
+        """
+        # a previous flush might have failed, finish it first
+        flush_id = START_VOTES_FLUSH_SCRIPT(
+            keys=[cls.deltas_hash, cls.flushing_hash], args=[uuid4().hex]
+        )
+        if flush_id is None:
+            return 0
+        flush_id = flush_id.decode("utf-8")
+
+        deltas = defaultdict(lambda: [0, 0])
+        for field, value in r.hgetall(cls.flushing_hash).items():
+            field = field.decode("utf-8")
+            if field == "flush_id":
+                continue
+            speed_id, direction = field.split(":")
+            deltas[speed_id][0 if direction == "up" else 1] += int(value)
+
+        rows = [
+            (speed_id, upvotes, downvotes)
+            for speed_id, (upvotes, downvotes) in deltas.items()
+            if upvotes or downvotes
+        ]
+        scores = {}
+        with transaction.atomic():
+            if VoteFlush.record(flush_id):
+                for i in range(0, len(rows), cls.flush_chunk_size):
+                    counters = SpeedCounters.add(rows[i : i + cls.flush_chunk_size])
+                    for speed_id, (_, _, score) in counters.items():
+                        scores[speed_id] = score
+            else:
+                # applied by a flush that has failed to delete the flushing hash
+                scores = {
+                    str(speed_id): score
+                    for speed_id, score in SpeedCounters.objects.filter(
+                        speed_id__in=[speed_id for speed_id, _, _ in rows]
+                    ).values_list("speed_id", "score")
+                }
+            # flushing hashes don't outlive a flush interval, only recent ids are checked
+            VoteFlush.objects.filter(
+                created_at__lt=timezone.now() - timedelta(days=1)
+            ).delete()
+
+        r.delete(cls.flushing_hash)
+        SpeedResponseCache.bump([speed_id for speed_id, _, _ in rows])
+        SpeedLeaderboards.set_scores(scores)
+        return len(scores)
+
+    @classmethod
+    def recount_all_votes(cls, dry_run: bool = False, **kwargs) -> list[dict]:
+        """
+        `Speed.recount_all_votes` of write-behind counters. Flushes are held off by the flush lock,
+        pending deltas are flushed first, deltas of votes counted in the meantime are subtracted
+        from recounted counters (the next flush adds them). Votes committed between reading deltas
+        of a chunk and its aggregate (a window of a single round trip) may still drift.
+        """
+        if not cls.is_enabled():
+            return Speed.recount_all_votes(dry_run=dry_run, **kwargs)
+        if dry_run:
+            return Speed.recount_all_votes(dry_run=True, get_pending=cls.get_pending, **kwargs)
+
+        with r.lock(
+            cls.flush_lock,
+            timeout=cls.flush_lock_timeout,
+            blocking_timeout=cls.flush_lock_timeout,
+        ) as lock:
+            cls.flush_locked()
+
+            def get_pending(speed_ids: list) -> dict[str, tuple[int, int]]:
+                # a chunk takes less than the lock's timeout
+                lock.reacquire()
+                return cls.get_pending(speed_ids)
+
+            return Speed.recount_all_votes(get_pending=get_pending, **kwargs)
+
+
+# Adds weighted `(vote, timestamp)` pairs (`ARGV[4..]`) of the `ARGV[1]` member to the current hot set,
+# a vote weighs `2 ^ ((timestamp - epoch) / ARGV[2])`, the epoch is the pointer's value.
+# Votes are dropped if the set hasn't been built yet, `HotSpeeds.rebuild` counts them.
+# KEYS[1] - the set's pointer, ARGV[3] - the set's key prefix.
+ADD_HOT_VOTES_SCRIPT = r.register_script(
+    """
+    local epoch = redis.call('GET', KEYS[1])
+    if not epoch then
+        return 0
+    end
+    local half_life = tonumber(ARGV[2])
+    local delta = 0
+    for i = 4, #ARGV, 2 do
+        delta = delta + tonumber(ARGV[i]) * math.pow(2, (tonumber(ARGV[i + 1]) - tonumber(epoch)) / half_life)
+    end
+    redis.call('ZINCRBY', ARGV[3] .. epoch, delta, ARGV[1])
+    return 1
+    """
+)
+
+
+# Returns the size of the current hot set and up to `ARGV[1]` members from the offset `ARGV[2]`,
+# highest scores first. KEYS[1] - the set's pointer, ARGV[3] - the set's key prefix.
+GET_HOT_SPEEDS_SCRIPT = r.register_script(
+    """
+    local epoch = redis.call('GET', KEYS[1])
+    if not epoch then
+        return {}
+    end
+    local hot = ARGV[3] .. epoch
+    local offset = tonumber(ARGV[2])
+    local result = {redis.call('ZCARD', hot)}
+    for _, member in ipairs(redis.call('ZREVRANGE', hot, offset, offset + tonumber(ARGV[1]) - 1)) do
+        result[#result + 1] = member
+    end
+    return result
+    """
+)
+
+
+# Removes the `ARGV[1]` member from the current hot set.
+# KEYS[1] - the set's pointer, ARGV[2] - the set's key prefix.
+REMOVE_HOT_SPEED_SCRIPT = r.register_script(
+    """
+    local epoch = redis.call('GET', KEYS[1])
+    if not epoch then
+        return 0
+    end
+    return redis.call('ZREM', ARGV[2] .. epoch, ARGV[1])
+    """
+)
+
+
+class HotSpeeds:
+    """
+    A time-decayed "hot" ranking of public `Speed` objects in a Redis sorted set.
+    A vote weighs `2 ^ ((timestamp - epoch) / half_life)`, a downvote negatively, and a member's score
+    is the sum of its weighted votes. All members share the epoch, so their order is the order of
+    scores decayed to any moment, a vote increments a single member and the rest never
+    has to be rescored. Weights grow with time, `rebuild` periodically recomputes the set
+    from `SpeedFeedback` timestamps with a new epoch and drops members without recent votes.
+    """
+
+    pointer = "speeds_hot_current"
+    prefix = "speeds_hot:"
+    # older votes weigh less than 1/1024 of a current one
+    window_half_lives = 10
+    chunk_size = 5000
+
+    @staticmethod
+    def get_half_life() -> int:
+        return settings.SPEEDS["HOT_HALF_LIFE"]
+
+    @staticmethod
+    def get_vote_changes(
+        prev_vote: None | int, prev_updated_at, curr_vote: int
+    ) -> list[tuple[int, float]]:
+        """
+        Returns `(vote, timestamp)` pairs of a vote change, the previous vote is withdrawn
+        with its own weight.
+        """
+        # the Redis client rejects `Vote` members (int subclasses)
+        changes = []
+        if prev_vote:
+            changes.append((-int(prev_vote), prev_updated_at.timestamp()))
+        if curr_vote:
+            changes.append((int(curr_vote), time.time()))
+        return changes
+
+    @classmethod
+    def add(cls, speed_id, changes: list[tuple[int, float]]) -> None:
+        if not changes:
+            return
+        args = [str(speed_id), cls.get_half_life(), cls.prefix]
+        for vote, timestamp in changes:
+            args += [vote, timestamp]
+        try:
+            ADD_HOT_VOTES_SCRIPT(keys=[cls.pointer], args=args)
+        except RedisError as e:
+            # the next `rebuild` counts the vote
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.add` has failed, {str(e)}"
+            )
+
+    @classmethod
+    def add_on_commit(cls, speed_id, changes: list[tuple[int, float]]) -> None:
+        transaction.on_commit(lambda: cls.add(speed_id, changes))
+
+    @classmethod
+    def remove(cls, speed_id) -> None:
+        """
+        Removes a hidden or deleted `Speed` object, it's counted again by the next `rebuild`
+        once it's public.
+        """
+        try:
+            REMOVE_HOT_SPEED_SCRIPT(keys=[cls.pointer], args=[str(speed_id), cls.prefix])
+        except RedisError as e:
+            # the next `rebuild` drops it
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.remove` has failed, {str(e)}"
+            )
+
+    @classmethod
+    def get_ids(cls, k: int, offset: int = 0) -> None | tuple[list[str], int]:
+        """
+        Returns up to `k` ids of the hottest `Speed` objects from `offset` and the size of the set,
+        with a single round trip, `None` if the set hasn't been built yet.
+        """
+        try:
+            result = GET_HOT_SPEEDS_SCRIPT(keys=[cls.pointer], args=[k, offset, cls.prefix])
+        except RedisError as e:
+            logger.error(
+                f"core.speeds.{__name__}; `{cls.__name__}.get_ids` has failed, {str(e)}"
+            )
+            return None
+        if not result:
+            return None
+        return [member.decode("utf-8") for member in result[1:]], int(result[0])
+
+    @classmethod
+    def write(cls, key: str, scores: list[tuple]) -> None:
+        for i in range(0, len(scores), cls.chunk_size):
+            r.zadd(
+                key,
+                {str(speed_id): score for speed_id, score in scores[i : i + cls.chunk_size]},
+            )
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """
+        Recomputes the set from votes of the last `window_half_lives` half-lives with a new epoch,
+        returns its size. The set is written under a temporary key and published by switching
+        the pointer. Votes added to the previous set in the meantime are caught up from rows
+        updated since the rebuild has started (the same as `reindexspeeds` catches up documents).
+        """
+        half_life = cls.get_half_life()
+        started_at = timezone.now()
+        epoch = int(started_at.timestamp())
+        since = started_at - timedelta(seconds=half_life * cls.window_half_lives)
+        key = f"{cls.prefix}{epoch}"
+
+        scores = SpeedFeedbackQueries.get_hot_scores(epoch, half_life, since)
+        r.delete(f"{key}:building")
+        cls.write(f"{key}:building", scores)
+        if scores:
+            r.rename(f"{key}:building", key)
+        previous_epoch = r.set(cls.pointer, epoch, get=True)
+        if previous_epoch is not None and previous_epoch.decode("utf-8") != str(epoch):
+            r.delete(f"{cls.prefix}{previous_epoch.decode('utf-8')}")
+
+        changed_speed_ids = list(
+            SpeedFeedback.objects.filter(updated_at__gte=started_at)
+            .order_by()
+            .values_list("speed_id", flat=True)
+            .distinct()
+        )
+        if changed_speed_ids:
+            cls.write(
+                key,
+                SpeedFeedbackQueries.get_hot_scores(epoch, half_life, since, changed_speed_ids),
+            )
+        return len(scores)
+
+
+def sync_or_add_document_to_meiliserach(index_name: str, action: str, ids: list) -> None:
+    """
+    Adds documents to the search outbox, must be called in the same transaction as the change,
+    ref: `core.speeds.tasks.drain_search_outbox_task`.
+    """
+    if ms_client.is_disabled():
+        return
 
-    sync_or_add_document_to_meiliserach_task.delay(index_name, action, data)
+    SearchOutbox.enqueue(index_name, action, ids)
@@ -0,0 +1,91 @@
+from django.db import transaction
+from django.db.models.signals import post_delete
+
+
+def handle_speed_change(sender, instance, **kwargs):
+    """
+    Invalidates cached anonymous responses and fragments once the change is committed,
+    ref: `core.speeds.cache.SpeedResponseCache` and `SpeedFragmentCache`.
+    `QuerySet.update` doesn't send signals, callers bump generations themselves.
+    """
+    from .cache import SpeedResponseCache, SpeedFragmentCache
+
+    if SpeedResponseCache.is_enabled() or SpeedFragmentCache.is_enabled():
+        # the pk of a deleted instance is unset before commit callbacks run
+        speed_id = instance.pk
+        transaction.on_commit(lambda: SpeedResponseCache.bump([speed_id]))
+
+
+def handle_user_speed_data_change(sender, instance, **kwargs):
+    """
+    Invalidates list validators of the user once the change of feedback or a bookmark is committed,
+    ref: `core.speeds.conditional.SpeedConditionalGet`.
+    """
+    from .cache import SpeedResponseCache
+
+    if SpeedResponseCache.is_enabled():
+        transaction.on_commit(lambda: SpeedResponseCache.bump_user(instance.user_id))
+
+
+def handle_speed_leaderboards_change(sender, instance, update_fields=None, **kwargs):
+    """
+    Syncs leaderboards of a created, changed, hidden or deleted `Speed` object once the change
+    is committed, ref: `core.speeds.leaderboards.SpeedLeaderboards`.
+    """
+    from .leaderboards import SpeedLeaderboards
+
+    if update_fields is not None and not SpeedLeaderboards.fields & set(update_fields):
+        return
+    if kwargs["signal"] is post_delete:
+        # the pk of a deleted instance is unset before commit callbacks run
+        speed_id = instance.pk
+        transaction.on_commit(lambda: SpeedLeaderboards.sync(speed_id, None))
+        return
+    transaction.on_commit(lambda: SpeedLeaderboards.sync_instance(instance))
+
+
+def handle_speed_feedback_delete(sender, instance, origin=None, **kwargs):
+    """
+    Subtracts the vote of deleted feedback (e.g. of a deleted user), so `recountvotes --dirty-since`
+    doesn't have to find `Speed` objects that have lost feedback rows, and withdraws it from the hot set.
+    Feedback deleted together with its `Speed` object has nothing left to count.
+    """
+    from .models import Speed, SpeedCounters, Vote
+    from .services import VoteCounter, HotSpeeds
+    from .cache import SpeedResponseCache
+    from .leaderboards import SpeedLeaderboards
+
+    if isinstance(origin, Speed) or getattr(origin, "model", None) is Speed:
+        return
+    upvotes, downvotes = VoteCounter.get_deltas(instance.vote, Vote.DEFAULT_STATE)
+    if not upvotes and not downvotes:
+        return
+    # votes of private `Speed` objects aren't ranked
+    if instance.speed.is_public:
+        HotSpeeds.add_on_commit(
+            instance.speed_id,
+            HotSpeeds.get_vote_changes(instance.vote, instance.updated_at, Vote.DEFAULT_STATE),
+        )
+
+    if VoteCounter.is_enabled():
+        VoteCounter.add_on_commit(instance.speed_id, upvotes, downvotes)
+        return
+    counters = SpeedCounters.add([(instance.speed_id, upvotes, downvotes)])
+    speed_id = instance.speed_id
+    transaction.on_commit(lambda: SpeedResponseCache.bump([speed_id]))
+    SpeedLeaderboards.set_scores_on_commit(
+        {speed_id: score for _, _, score in counters.values()}
+    )
+
+
+def handle_hot_speeds_change(sender, instance, **kwargs):
+    """
+    Removes a hidden or deleted `Speed` object from the hot set once the change is committed,
+    ref: `core.speeds.services.HotSpeeds`.
+    """
+    from .services import HotSpeeds
+
+    if kwargs["signal"] is post_delete or not instance.is_public:
+        # the pk of a deleted instance is unset before commit callbacks run
+        speed_id = instance.pk
+        transaction.on_commit(lambda: HotSpeeds.remove(speed_id))
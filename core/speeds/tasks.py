@@ -7,11 +7,19 @@ from celery import shared_task
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import transaction
 
 from core.celery import app
 from core.meilisearch import client as ms_client
+from .models import Speed, SpeedCounters, SearchOutbox
+from .leaderboards import SpeedLeaderboards
 from .queries import SpeedQueries
-from .services import cache_random_speeds
+from .services import (
+    cache_random_speeds,
+    sync_or_add_document_to_meiliserach,
+    VoteCounter,
+    HotSpeeds,
+)
 from . import logger
 
 
@@ -41,6 +49,46 @@ def setup_periodic_tasks(sender, **kwargs):
             name="cache random speeds",
         )
 
+    if VoteCounter.is_enabled():
+        sender.add_periodic_task(
+            settings.SPEEDS["VOTES_FLUSH_INTERVAL"],
+            flush_vote_counters_task.s(),
+            name="flush vote counters",
+        )
+
+    try:
+        # the hot set is served before the first periodic rebuild
+        HotSpeeds.rebuild()
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {setup_periodic_tasks.__name__} initial hot speeds rebuild failed, {str(e)}"
+        )
+    sender.add_periodic_task(
+        settings.SPEEDS["HOT_REBUILD_INTERVAL"],
+        rebuild_hot_speeds_task.s(),
+        name="rebuild hot speeds",
+    )
+
+    try:
+        # leaderboards are served before the first periodic rebuild (e.g. after Redis has lost them)
+        SpeedLeaderboards.rebuild()
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {setup_periodic_tasks.__name__} initial leaderboards rebuild failed, {str(e)}"
+        )
+    # also restores members of failed syncs and picks popular tags anew
+    sender.add_periodic_task(
+        settings.SPEEDS["LEADERBOARD_REBUILD_INTERVAL"],
+        rebuild_leaderboards_task.s(),
+        name="rebuild leaderboards",
+    )
+
+    sender.add_periodic_task(
+        settings.SPEEDS["COUNTERS_FOLD_INTERVAL"],
+        fold_speed_counters_task.s(),
+        name="fold speed counters",
+    )
+
     if not ms_client.is_disabled():
         if settings.DEBUG:
             crontab_ = crontab(minute="*/1")
@@ -59,6 +107,18 @@ def setup_periodic_tasks(sender, **kwargs):
             name="synchronize scores in meilisearch",
         )
 
+        sender.add_periodic_task(
+            settings.MEILISEARCH["RECONCILE_INTERVAL"],
+            reconcile_meilisearch_tasks.s(),
+            name="reconcile meilisearch tasks",
+        )
+
+        sender.add_periodic_task(
+            ms_client.get_batch_window(),
+            drain_search_outbox_task.s("speeds"),
+            name="drain search outbox",
+        )
+
 
 if settings.DEBUG:
     app.on_after_finalize.connect(setup_periodic_tasks)
@@ -79,6 +139,66 @@ def cache_random_speeds_task(**kwargs):
         )
 
 
+@app.task
+def rebuild_leaderboards_task(**kwargs):
+    """
+    Periodic task.
+    """
+    try:
+        SpeedLeaderboards.rebuild()
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {rebuild_leaderboards_task.__name__} is not working properly, {str(e)}"
+        )
+
+
+@app.task
+def rebuild_hot_speeds_task(**kwargs):
+    """
+    Periodic task.
+    """
+    try:
+        HotSpeeds.rebuild()
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {rebuild_hot_speeds_task.__name__} is not working properly, {str(e)}"
+        )
+
+
+@app.task
+def fold_speed_counters_task(**kwargs):
+    """
+    Periodic task.
+    """
+    try:
+        speed_ids = SpeedCounters.fold()
+        if speed_ids:
+            logger.info(
+                f"core.speeds.{__name__}; {fold_speed_counters_task.__name__} has updated {len(speed_ids)} `Speed` rows."
+            )
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {fold_speed_counters_task.__name__} is not working properly, {str(e)}"
+        )
+
+
+@app.task
+def flush_vote_counters_task(**kwargs):
+    """
+    Periodic task.
+    """
+    try:
+        updated = VoteCounter.flush()
+        if updated:
+            logger.info(
+                f"core.speeds.{__name__}; {flush_vote_counters_task.__name__} has updated {updated} `SpeedCounters` rows."
+            )
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {flush_vote_counters_task.__name__} is not working properly, {str(e)}"
+        )
+
+
 @app.task
 def delete_meilisearch_deleted_user_data(**kwargs):
     """
@@ -87,23 +207,23 @@ def delete_meilisearch_deleted_user_data(**kwargs):
     timestamp = time.time()
 
     user = get_user_model().objects.get(username="deleted")
-    qs = SpeedQueries.get_deleted_user_query(user=user)
-    for speed in qs:
+    speed_ids = list(
+        SpeedQueries.get_deleted_user_query(user=user).values_list("id", flat=True)
+    )
+    batch_size = ms_client.get_batch_size()
+    for i in range(0, len(speed_ids), batch_size):
+        batch = speed_ids[i : i + batch_size]
         try:
-            task_info = ms_client.index("speeds").delete_document(speed.id)
-            if ms_client.task_succeeded(task_info):
-                try:
-                    speed.delete()
-                except Exception as e:
-                    logger.error(
-                        f"The `delete()` for {speed.id} of deleted user has failed.\n {str(e)}"
-                    )
-            else:
-                logger.error(
-                    f"core.speeds.{__name__}; the `delete_document()` for {speed.id} of deleted user has not succeeded."
+            # documents are deleted by the `drain_search_outbox_task`
+            with transaction.atomic():
+                sync_or_add_document_to_meiliserach(
+                    index_name="speeds", action=SearchOutbox.Action.DELETE, ids=batch
                 )
+                Speed.objects.filter(id__in=batch).delete()
         except Exception as e:
-            logger.error(f"core.speeds.{__name__}; {str(e)}.")
+            logger.error(
+                f"core.speeds.{__name__}; the `delete()` of {len(batch)} `Speed` objects of deleted user has failed, {str(e)}"
+            )
 
     logger.info(
         f"core.speeds.{__name__}; the `delete_meilisearch_deleted_user_data` perdiodic task has finished in {time.time() - timestamp} seconds."
@@ -114,24 +234,59 @@ def delete_meilisearch_deleted_user_data(**kwargs):
 def synchronize_scores_in_meilisearch(**kwargs):
     """
     Periodic task.
-    (Not optimized.)
     """
-    qs = SpeedQueries.get_not_synced_in_meilisearch_query()
-    for speed in qs:
-        ms_client.sync_document(
-            "speeds",
-            "update",
-            data={"id": str(speed.id), "score": speed.score},
+    if ms_client.is_disabled():
+        return
+
+    qs = SpeedQueries.get_not_synced_in_meilisearch_query().values_list("id", "score")
+    batch_size = ms_client.get_batch_size()
+    pending = []
+    for speed_id, score in qs.iterator(chunk_size=batch_size):
+        pending.append(("update", {"id": str(speed_id), "score": score}))
+        if len(pending) == batch_size:
+            ms_client.sync_documents("speeds", pending)
+            pending = []
+    ms_client.sync_documents("speeds", pending)
+
+
+@app.task
+def reconcile_meilisearch_tasks(**kwargs):
+    """
+    Periodic task.
+    """
+    try:
+        ms_client.reconcile_tasks()
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {reconcile_meilisearch_tasks.__name__} is not working properly, {str(e)}"
         )
 
 
-@shared_task
-def sync_or_add_document_to_meiliserach_task(
-    index_name: Literal["speeds"],
-    action: Literal["add", "update"],
-    data: dict,
-):
-    ms_client.sync_document(index_name, action, data)
+@app.task
+def drain_search_outbox_task(index_name: Literal["speeds"], max_batches: int = 20, **kwargs):
+    """
+    Periodic task.
+    """
+    if ms_client.is_disabled():
+        return
+
+    batch_size = ms_client.get_batch_size()
+    drained = 0
+    try:
+        for _ in range(max_batches):
+            count = ms_client.drain_outbox(index_name, batch_size)
+            drained += count
+            if count < batch_size:
+                break
+    except Exception as e:
+        logger.error(
+            f"core.speeds.{__name__}; {drain_search_outbox_task.__name__} is not working properly, {str(e)}"
+        )
+
+    if drained:
+        logger.info(
+            f"core.speeds.{__name__}; {drain_search_outbox_task.__name__} has drained {drained} documents."
+        )
 
 
 @shared_task
@@ -139,24 +294,25 @@ def delete_meilisearch_banned_user_data(user_pk):
     timestamp = time.time()
 
     user = get_user_model().objects.get(pk=user_pk)
-    qs = SpeedQueries.get_banned_user_query(user=user)
-    for speed in qs:
+    speeds = list(SpeedQueries.get_banned_user_query(user=user))
+    batch_size = ms_client.get_batch_size()
+    for i in range(0, len(speeds), batch_size):
+        batch = speeds[i : i + batch_size]
         try:
-            task_info = ms_client.index("speeds").delete_document(speed.id)
-            if ms_client.task_succeeded(task_info):
-                try:
+            # documents are deleted by the `drain_search_outbox_task`
+            with transaction.atomic():
+                sync_or_add_document_to_meiliserach(
+                    index_name="speeds",
+                    action=SearchOutbox.Action.DELETE,
+                    ids=[speed.id for speed in batch],
+                )
+                for speed in batch:
                     speed.is_public = False
                     speed.save()
-                except Exception as e:
-                    logger.error(
-                        f"The `save()` (update) for {speed.id} of banned user has failed.\n {str(e)}"
-                    )
-            else:
-                logger.error(
-                    f"core.speeds.{__name__}; the `delete_document()` for {speed.id} of banned user has not succeeded."
-                )
         except Exception as e:
-            logger.error(f"core.speeds.{__name__}; {str(e)}.")
+            logger.error(
+                f"core.speeds.{__name__}; the `save()` (update) of {len(batch)} `Speed` objects of banned user has failed, {str(e)}"
+            )
 
     logger.info(
         f"core.speeds.{__name__}; the `delete_meilisearch_banned_user_data` task has finished in {time.time() - timestamp} seconds."
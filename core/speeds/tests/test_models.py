@@ -1,12 +1,36 @@
+import json
 import random
-from unittest.mock import patch
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
 from collections import defaultdict
 
+from redis.exceptions import RedisError
+
+from django.conf import settings
+from django.db import connection
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
 from django.contrib.auth import get_user_model
 
 from rest_framework.test import APITestCase, override_settings
 
-from ..models import Speed
+from ..models import (
+    MeilisearchTask,
+    SearchOutbox,
+    Speed,
+    SpeedCounters,
+    SpeedFeedback,
+    SpeedBookmark,
+    SpeedReport,
+    Vote,
+)
+from ..queries import SpeedQueries, SpeedFeedbackQueries
+from ..services import HotSpeeds, VoteCounter, r
+from ..leaderboards import SpeedLeaderboards
+from .. import services, tasks
 
 
 User = get_user_model()
@@ -57,21 +81,26 @@ class CustomAPITestCase(APITestCase):
 
 class SpeedTestCase(CustomAPITestCase):
     def test_recount_votes(self):
+        counters = {}
         for speed in Speed.objects.all():
-            curr_score = speed.score
-            curr_upvotes = speed.upvotes
-            curr_downvotes = speed.downvotes
+            counters[speed.id] = (speed.score, speed.upvotes, speed.downvotes)
 
             speed.score = random.randint(-1000, 1000)
             speed.downvotes = random.randint(0, 1000)
             speed.upvotes = random.randint(0, 1000)
             speed.save()
+            drifted = (speed.score, speed.upvotes, speed.downvotes)
 
             speed.recount_votes()
 
-            self.assertEqual(speed.score, curr_score)
-            self.assertEqual(speed.upvotes, curr_upvotes)
-            self.assertEqual(speed.downvotes, curr_downvotes)
+            self.assertEqual((speed.score, speed.upvotes, speed.downvotes), counters[speed.id])
+            # the `Speed` row isn't rewritten until counters are folded
+            speed.refresh_from_db()
+            self.assertEqual((speed.score, speed.upvotes, speed.downvotes), drifted)
+
+        SpeedCounters.fold()
+        for speed in Speed.objects.all():
+            self.assertEqual((speed.score, speed.upvotes, speed.downvotes), counters[speed.id])
 
     def test_recount_all_votes(self):
         cache = defaultdict(dict)
@@ -94,3 +123,712 @@ class SpeedTestCase(CustomAPITestCase):
             self.assertEqual(
                 speed.downvotes, cache[str(speed.id)]["downvotes"]
             )
+
+    def test_recount_all_votes_dry_run(self):
+        self.assertEqual(Speed.recount_all_votes(dry_run=True), [])
+
+        speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        Speed.objects.filter(pk=speed.pk).update(upvotes=100, downvotes=7, score=93)
+
+        drifted = Speed.recount_all_votes(dry_run=True)
+        self.assertEqual(len(drifted), 1)
+        self.assertEqual(str(drifted[0]["id"]), str(speed.pk))
+        self.assertEqual(drifted[0]["upvotes"], 100)
+        self.assertEqual(drifted[0]["new_upvotes"], speed.upvotes)
+        self.assertEqual(drifted[0]["new_downvotes"], speed.downvotes)
+        self.assertEqual(drifted[0]["new_score"], speed.score)
+        # nothing was updated
+        self.assertEqual(Speed.objects.get(pk=speed.pk).upvotes, 100)
+
+        self.assertEqual(len(Speed.recount_all_votes(chunk_size=2)), 1)
+        speed_recounted = Speed.objects.get(pk=speed.pk)
+        self.assertEqual(speed_recounted.upvotes, speed.upvotes)
+        self.assertEqual(speed_recounted.downvotes, speed.downvotes)
+        self.assertEqual(speed_recounted.score, speed.score)
+
+    def test_recount_all_votes_dirty_since(self):
+        dirty_speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        clean_speed = Speed.objects.get(pk="66fca277-3329-49aa-96a2-cc240a659549")
+        Speed.objects.filter(pk__in=[dirty_speed.pk, clean_speed.pk]).update(
+            upvotes=100, downvotes=0, score=100
+        )
+        # the feedback's `updated_at` is bumped
+        SpeedFeedback.objects.filter(speed=dirty_speed).first().save()
+
+        drifted = Speed.recount_all_votes(
+            dirty_since=timezone.now() - timedelta(minutes=1)
+        )
+        self.assertEqual([str(row["id"]) for row in drifted], [str(dirty_speed.pk)])
+        self.assertEqual(Speed.objects.get(pk=dirty_speed.pk).score, dirty_speed.score)
+        self.assertEqual(Speed.objects.get(pk=clean_speed.pk).score, 100)
+
+    def test_delete_feedback(self):
+        speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        SpeedFeedback.objects.get(user=self.testuserone, speed=speed).delete()
+
+        counters = SpeedCounters.objects.get(speed=speed)
+        self.assertEqual(counters.upvotes, speed.upvotes - 1)
+        self.assertEqual(counters.score, speed.score - 1)
+        # `dirty_since` can't find speeds that have lost feedback, they aren't drifted
+        self.assertEqual(Speed.recount_all_votes(dry_run=True), [])
+
+        # feedback deleted together with its speed isn't counted
+        speed = Speed.objects.get(pk="67e77deb-13d5-43fa-af9f-cc6f1b2a1c5c")
+        speed.delete()
+        self.assertFalse(SpeedCounters.objects.filter(speed_id=speed.pk).exists())
+
+    def test_set_user_speed_data(self):
+        # a second bookmark of another category, lists of a `Speed` object keep all of them
+        SpeedBookmark.objects.create(
+            user=self.testuserone,
+            speed_id="67e77deb-13d5-43fa-af9f-cc6f1b2a1c5c",
+            category="favorites",
+        )
+        # `personal` doesn't include `Speed` objects of other users
+        for mode, bookmarked in (("public_and_personal", 1), ("personal", 0)):
+            annotated = SpeedQueries.get_authenticated_user_query(
+                self.testuserone, mode
+            ).order_by("id")
+            speeds = list(
+                SpeedQueries.get_authenticated_user_query(
+                    self.testuserone, mode, with_user_speed_data=False
+                ).order_by("id")
+            )
+            with self.assertNumQueries(2):
+                services.set_user_speed_data(speeds, self.testuserone)
+            for expected, speed in zip(annotated, speeds, strict=True):
+                self.assertCountEqual(speed.user_speed_feedback, expected.user_speed_feedback)
+                self.assertCountEqual(speed.user_speed_bookmark, expected.user_speed_bookmark)
+            self.assertEqual(
+                len([speed for speed in speeds if len(speed.user_speed_bookmark) == 2]), bookmarked
+            )
+
+    def test_get_random_sample_ids(self):
+        Speed.objects.filter(pk="d26c8bad-6548-4918-8e63-1bd59579917b").update(score=0)
+        expected_ids = set(
+            Speed.objects.filter(is_public=True, score__gt=0).values_list("id", flat=True)
+        )
+
+        ids = SpeedQueries.get_random_sample_ids(1200)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), expected_ids)
+
+        ids = SpeedQueries.get_random_sample_ids(2)
+        self.assertEqual(len(set(ids)), 2)
+        self.assertTrue(set(ids) <= expected_ids)
+
+        for speed_type in Speed.SpeedType.values:
+            ids = SpeedQueries.get_random_sample_ids(1200, speed_type=speed_type)
+            self.assertEqual(
+                set(ids),
+                {speed.id for speed in Speed.objects.filter(id__in=expected_ids, speed_type=speed_type)},
+            )
+
+    def test_get_random_sample_ids_tablesample(self):
+        Speed.objects.filter(pk="d26c8bad-6548-4918-8e63-1bd59579917b").update(score=0)
+        expected_ids = set(
+            Speed.objects.filter(is_public=True, score__gt=0).values_list("id", flat=True)
+        )
+
+        # a sample of 10% of the table, doubled until it's the whole table (a single page here)
+        with (
+            patch.object(SpeedQueries, "get_estimated_rows", return_value=40),
+            CaptureQueriesContext(connection) as context,
+        ):
+            ids = SpeedQueries.get_random_sample_ids(2)
+        self.assertIn("TABLESAMPLE SYSTEM", context.captured_queries[-1]["sql"])
+        self.assertEqual(len(ids), 2)
+        self.assertTrue(set(ids) <= expected_ids)
+
+        with patch.object(SpeedQueries, "get_estimated_rows", return_value=40):
+            ids = SpeedQueries.get_random_sample_ids(2, tag="one", selectivity=1.0)
+        self.assertEqual(
+            set(ids),
+            {speed.id for speed in Speed.objects.filter(id__in=expected_ids, tags__contains=["one"])},
+        )
+
+    def test_get_hot_scores(self):
+        half_life = 3600
+        now = timezone.now()
+        epoch = int(now.timestamp())
+        # out of the window
+        SpeedFeedback.objects.update(updated_at=now - timedelta(seconds=half_life * 20))
+        SpeedFeedback.objects.filter(speed="d26c8bad-6548-4918-8e63-1bd59579917b").update(
+            updated_at=now - timedelta(seconds=half_life)
+        )
+        SpeedFeedback.objects.filter(
+            speed="706efb42-5d91-4115-a52b-3e0c98fb8cd5", vote=Vote.UPVOTE
+        ).update(updated_at=now)
+        SpeedFeedback.objects.filter(
+            speed="706efb42-5d91-4115-a52b-3e0c98fb8cd5", vote=Vote.DOWNVOTE
+        ).update(updated_at=now - timedelta(seconds=half_life * 2))
+        # private
+        SpeedFeedback.objects.filter(speed="2dbc2429-a8cc-4f80-922a-5dbc4715a76c").update(
+            updated_at=now
+        )
+
+        since = now - timedelta(seconds=half_life * 10)
+        scores = {
+            str(speed_id): score
+            for speed_id, score in SpeedFeedbackQueries.get_hot_scores(epoch, half_life, since)
+        }
+        self.assertEqual(
+            set(scores),
+            {"d26c8bad-6548-4918-8e63-1bd59579917b", "706efb42-5d91-4115-a52b-3e0c98fb8cd5"},
+        )
+        # two upvotes of a half-life ago
+        self.assertAlmostEqual(scores["d26c8bad-6548-4918-8e63-1bd59579917b"], 1.0, places=2)
+        # a current upvote and a downvote of two half-lives ago
+        self.assertAlmostEqual(scores["706efb42-5d91-4115-a52b-3e0c98fb8cd5"], 0.75, places=2)
+
+        scores = SpeedFeedbackQueries.get_hot_scores(
+            epoch, half_life, since, ["706efb42-5d91-4115-a52b-3e0c98fb8cd5"]
+        )
+        self.assertEqual(
+            [str(speed_id) for speed_id, _ in scores], ["706efb42-5d91-4115-a52b-3e0c98fb8cd5"]
+        )
+
+    def test_get_leaderboards_query(self):
+        speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        SpeedCounters.add([(speed.id, 2, 0)])
+
+        rows = {row[0]: row for row in SpeedQueries.get_leaderboards_query()}
+        self.assertEqual(
+            set(rows), set(Speed.objects.filter(is_public=True).values_list("id", flat=True))
+        )
+        # not yet folded counters
+        self.assertEqual(
+            rows[speed.id], (speed.id, speed.speed_type, speed.tags, speed.kmph, speed.score + 2)
+        )
+        other = Speed.objects.get(pk="e63fe0ca-4235-4a20-9555-2926e353e9e2")
+        self.assertEqual(rows[other.id][4], other.score)
+
+        SpeedCounters.fold()
+        speed.refresh_from_db()
+        rows = {row[0]: row for row in SpeedQueries.get_leaderboards_query()}
+        self.assertEqual(rows[speed.id][4], speed.score)
+
+    def test_insert_vote(self):
+        speed = Speed.objects.exclude(feedback__user=self.testusertwo).first()
+
+        instance, counters = SpeedFeedback.insert_vote(
+            self.testusertwo.id, speed.id, Vote.DOWNVOTE
+        )
+        self.assertEqual(instance.vote, Vote.DOWNVOTE)
+        self.assertEqual(instance, SpeedFeedback.objects.get(user=self.testusertwo, speed=speed))
+        self.assertEqual(counters, (speed.upvotes, speed.downvotes + 1, speed.score - 1))
+        speed_counters = SpeedCounters.objects.get(speed=speed)
+        self.assertEqual(
+            (speed_counters.upvotes, speed_counters.downvotes, speed_counters.score), counters
+        )
+
+        # a conflict doesn't count the vote again
+        self.assertIsNone(
+            SpeedFeedback.insert_vote(self.testusertwo.id, speed.id, Vote.UPVOTE)
+        )
+        speed_counters.refresh_from_db()
+        self.assertEqual(
+            (speed_counters.upvotes, speed_counters.downvotes, speed_counters.score), counters
+        )
+
+        speed = Speed.objects.exclude(feedback__user=self.testusertwo).first()
+        _, counters = SpeedFeedback.insert_vote(
+            self.testusertwo.id, speed.id, Vote.UPVOTE, count=False
+        )
+        self.assertIsNone(counters)
+        self.assertEqual(speed.upvotes, Speed.objects.get(pk=speed.pk).upvotes)
+
+    def test_insert_bookmark_and_upsert_report(self):
+        speed = Speed.objects.filter(is_public=True).first()
+
+        instance = SpeedBookmark.insert(self.testusertwo.id, speed.id, "upserts")
+        self.assertEqual(instance, SpeedBookmark.objects.get(category="upserts"))
+        self.assertIsNone(SpeedBookmark.insert(self.testusertwo.id, speed.id, "upserts"))
+
+        SpeedReport.objects.filter(speed=speed).delete()
+        report = SpeedReport.upsert(self.testusertwo.id, speed.id, "spam", "one")
+        updated_report = SpeedReport.upsert(self.testusertwo.id, speed.id, "other", "two")
+        self.assertEqual(report.id, updated_report.id)
+        self.assertEqual(report.created_at, updated_report.created_at)
+        report.refresh_from_db()
+        self.assertEqual((report.report_reason, report.detail), ("other", "two"))
+
+    def test_speed_counters(self):
+        speed = Speed.objects.filter(is_public=True).first()
+        updated_at = speed.updated_at
+
+        counters = SpeedCounters.add([(speed.id, 2, 1)])
+        self.assertEqual(
+            counters[str(speed.id)], (speed.upvotes + 2, speed.downvotes + 1, speed.score + 1)
+        )
+        # `Speed` rows aren't touched until counters are folded
+        speed.refresh_from_db()
+        self.assertNotEqual(speed.score, counters[str(speed.id)][2])
+
+        SpeedCounters.overlay([speed])
+        self.assertEqual((speed.upvotes, speed.downvotes, speed.score), counters[str(speed.id)])
+
+        self.assertEqual(SpeedCounters.fold(), [speed.id])
+        speed.refresh_from_db()
+        self.assertEqual((speed.upvotes, speed.downvotes, speed.score), counters[str(speed.id)])
+        self.assertEqual(speed.updated_at, updated_at)
+        self.assertFalse(speed.is_synced_in_meilisearch)
+        self.assertTrue(SpeedCounters.objects.get(speed=speed).is_folded)
+        self.assertEqual(SpeedCounters.fold(), [])
+
+    def test_reconcile_meilisearch_tasks(self):
+        from core.meilisearch import client as ms_client
+
+        speeds = list(Speed.objects.filter(is_public=True).order_by("id")[:3])
+        Speed.objects.filter(pk__in=[speed.pk for speed in speeds]).update(
+            is_synced_in_meilisearch=False
+        )
+        MeilisearchTask.objects.create(
+            task_uid=1,
+            index_name="speeds",
+            updated_ids=[speed.id for speed in speeds[:2]],
+            updated_scores=[speed.score for speed in speeds[:2]],
+        )
+        # a newer send of the second `Speed` object
+        MeilisearchTask.objects.create(
+            task_uid=2,
+            index_name="speeds",
+            updated_ids=[speeds[1].id],
+            updated_scores=[speeds[1].score + 1],
+        )
+        MeilisearchTask.objects.create(
+            task_uid=3,
+            index_name="speeds",
+            updated_ids=[speeds[2].id],
+            updated_scores=[speeds[2].score],
+        )
+        MeilisearchTask.objects.create(task_uid=4, index_name="speeds")
+        statuses = {1: "succeeded", 2: "succeeded", 3: "failed", 4: "processing"}
+        results = SimpleNamespace(
+            results=[SimpleNamespace(uid=uid, status=status) for uid, status in statuses.items()]
+        )
+
+        with patch.object(ms_client, "get_tasks", return_value=results):
+            self.assertEqual(ms_client.reconcile_tasks(), 3)
+
+        # the score of the second `Speed` object has changed since it was sent
+        self.assertEqual(
+            {
+                speed.id: speed.is_synced_in_meilisearch
+                for speed in Speed.objects.filter(pk__in=[speed.pk for speed in speeds])
+            },
+            {speeds[0].id: True, speeds[1].id: False, speeds[2].id: False},
+        )
+        self.assertEqual(list(MeilisearchTask.objects.values_list("task_uid", flat=True)), [4])
+
+    @override_settings(
+        MEILISEARCH={"disabled": False, "MASTER_KEY": None, "URL": None, "BATCH_SIZE": 2},
+    )
+    def test_delete_meilisearch_deleted_user_data(self):
+        from core.meilisearch import client as ms_client
+        from ..tasks import delete_meilisearch_deleted_user_data
+
+        speed_ids = [str(speed.id) for speed in self.testuserone.speed_set.all()]
+        self.testuserone.speed_set.update(user=User.objects.get(username="deleted"))
+        # a pending "add" of a deleted document is replaced
+        SearchOutbox.enqueue("speeds", SearchOutbox.Action.ADD, speed_ids[:1])
+
+        with patch.object(ms_client, "index") as mock_index:
+            delete_meilisearch_deleted_user_data()
+        # rows are deleted without waiting for Meilisearch, documents are queued
+        mock_index.assert_not_called()
+        self.assertFalse(Speed.objects.filter(id__in=speed_ids).exists())
+        self.assertEqual(
+            sorted(
+                (str(document_id), action)
+                for document_id, action in SearchOutbox.objects.values_list(
+                    "document_id", "action"
+                )
+            ),
+            sorted((speed_id, "delete") for speed_id in speed_ids),
+        )
+
+        with patch.object(ms_client, "index") as mock_index:
+            mock_index.return_value.delete_documents.return_value.task_uid = 1
+            self.assertEqual(ms_client.drain_outbox("speeds", 10), len(speed_ids))
+        mock_index.return_value.update_documents.assert_not_called()
+        self.assertEqual(
+            sorted(mock_index.return_value.delete_documents.call_args.args[0]), sorted(speed_ids)
+        )
+        self.assertEqual(SearchOutbox.objects.count(), 0)
+
+        # deletes of a failed task are queued again
+        results = SimpleNamespace(results=[SimpleNamespace(uid=1, status="failed")])
+        with patch.object(ms_client, "get_tasks", return_value=results):
+            self.assertEqual(ms_client.reconcile_tasks(), 1)
+        self.assertEqual(
+            sorted(
+                str(document_id)
+                for document_id in SearchOutbox.objects.filter(action="delete").values_list(
+                    "document_id", flat=True
+                )
+            ),
+            sorted(speed_ids),
+        )
+
+    @override_settings(
+        MEILISEARCH={"disabled": False, "MASTER_KEY": None, "URL": None, "BATCH_SIZE": 2},
+    )
+    def test_synchronize_scores_in_meilisearch(self):
+        from core.meilisearch import client as ms_client
+        from ..tasks import synchronize_scores_in_meilisearch
+
+        Speed.objects.update(is_added_to_meilisearch=True, is_synced_in_meilisearch=True)
+        speeds = list(Speed.objects.order_by("id")[:3])
+        Speed.objects.filter(pk__in=[speed.pk for speed in speeds]).update(
+            is_synced_in_meilisearch=False
+        )
+
+        with patch.object(ms_client, "index") as mock_index:
+            mock_index.return_value.update_documents.side_effect = [
+                SimpleNamespace(task_uid=uid) for uid in (1, 2)
+            ]
+            synchronize_scores_in_meilisearch()
+
+        # batches of `BATCH_SIZE` documents, rows are marked once tasks are reconciled
+        documents = [
+            call.args[0] for call in mock_index.return_value.update_documents.call_args_list
+        ]
+        self.assertEqual([len(batch) for batch in documents], [2, 1])
+        self.assertEqual(
+            sorted(document["id"] for batch in documents for document in batch),
+            [str(speed.id) for speed in speeds],
+        )
+        self.assertEqual(
+            {
+                str(speed_id): score
+                for task in MeilisearchTask.objects.all()
+                for speed_id, score in zip(task.updated_ids, task.updated_scores)
+            },
+            {str(speed.id): speed.score for speed in speeds},
+        )
+        self.assertFalse(
+            Speed.objects.filter(
+                pk__in=[speed.pk for speed in speeds], is_synced_in_meilisearch=True
+            ).exists()
+        )
+
+
+@override_settings(SPEEDS={**settings.SPEEDS, "VOTES_WRITE_BEHIND": True})
+class VoteCounterTestCase(CustomAPITestCase):
+    def setUp(self):
+        # don't touch deltas of a running instance
+        for attr in ("deltas_hash", "flushing_hash", "flush_lock"):
+            patcher = patch.object(VoteCounter, attr, f"test_{getattr(VoteCounter, attr)}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(
+            lambda: r.delete(VoteCounter.deltas_hash, VoteCounter.flushing_hash)
+        )
+        self.speed = Speed.objects.filter(is_public=True).first()
+        return super().setUp()
+
+    def get_counters(self) -> tuple[int, int]:
+        counters = SpeedCounters.objects.get(speed=self.speed)
+        return counters.upvotes - self.speed.upvotes, counters.downvotes - self.speed.downvotes
+
+    def test_flush(self):
+        VoteCounter.add(self.speed.id, 2, 1)
+        VoteCounter.add(self.speed.id, 1, 0)
+        self.assertEqual(VoteCounter.get_pending([self.speed.id]), {str(self.speed.id): (3, 1)})
+
+        self.assertEqual(VoteCounter.flush(), 1)
+        self.assertEqual(VoteCounter.get_pending([self.speed.id]), {})
+        self.assertEqual(self.get_counters(), (3, 1))
+        self.assertEqual(VoteCounter.flush(), 0)
+
+    def test_flush_after_failed_delete(self):
+        VoteCounter.add(self.speed.id, 1, 0)
+        with patch.object(r, "delete", side_effect=RedisError("Connection lost.")):
+            with self.assertRaises(RedisError):
+                VoteCounter.flush()
+        self.assertEqual(self.get_counters(), (1, 0))
+        # deltas of the committed flush aren't pending anymore
+        self.assertEqual(VoteCounter.get_pending([self.speed.id]), {})
+
+        VoteCounter.add(self.speed.id, 0, 1)
+        self.assertEqual(VoteCounter.get_pending([self.speed.id]), {str(self.speed.id): (0, 1)})
+        # finishes the failed flush without applying its deltas again
+        self.assertEqual(VoteCounter.flush(), 1)
+        self.assertEqual(self.get_counters(), (1, 0))
+        self.assertEqual(VoteCounter.flush(), 1)
+        self.assertEqual(self.get_counters(), (1, 1))
+        self.assertEqual(VoteCounter.get_pending([self.speed.id]), {})
+
+    @override_settings(SPEEDS={**settings.SPEEDS, "VOTES_WRITE_BEHIND": True})
+    def test_recount_all_votes(self):
+        speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        Speed.objects.filter(pk=speed.pk).update(upvotes=100, downvotes=7, score=93)
+        # flushed before speeds are recounted
+        VoteCounter.add(speed.id, 1, 0)
+        get_pending = VoteCounter.get_pending
+
+        def vote_and_get_pending(speed_ids):
+            # a vote is changed (and its delta is added) while speeds are recounted
+            SpeedFeedback.objects.filter(user=self.testuserone, speed=speed).update(
+                vote=Vote.DOWNVOTE
+            )
+            VoteCounter.add(speed.id, -1, 1)
+            return get_pending(speed_ids)
+
+        with patch.object(VoteCounter, "get_pending", side_effect=vote_and_get_pending):
+            drifted = VoteCounter.recount_all_votes()
+        self.assertEqual([str(row["id"]) for row in drifted], [str(speed.pk)])
+        self.assertEqual(VoteCounter.get_pending([speed.id]), {str(speed.pk): (-1, 1)})
+
+        self.assertEqual(VoteCounter.flush(), 1)
+        counters = SpeedCounters.objects.get(speed=speed)
+        self.assertEqual(
+            (counters.upvotes, counters.downvotes, counters.score),
+            (speed.upvotes - 1, speed.downvotes + 1, speed.score - 2),
+        )
+        self.assertEqual(Speed.recount_all_votes(dry_run=True), [])
+
+
+class SpeedLeaderboardsTestCase(CustomAPITestCase):
+    def setUp(self):
+        # don't touch leaderboards of a running instance
+        for attr in ("prefix", "tags"):
+            patcher = patch.object(
+                SpeedLeaderboards, attr, f"test_{getattr(SpeedLeaderboards, attr)}"
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(
+            lambda: r.delete(*r.keys(f"{SpeedLeaderboards.prefix}*"), SpeedLeaderboards.tags)
+        )
+        self.speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        return super().setUp()
+
+    def get_boards(self, speed_id, metric: str = "score") -> dict[str, float]:
+        boards = {}
+        for key in r.keys(f"{SpeedLeaderboards.prefix}{metric}:*"):
+            value = r.zscore(key, str(speed_id))
+            if value is not None:
+                boards[key.decode("utf-8").split(":", 2)[2]] = value
+        return boards
+
+    def test_rebuild(self):
+        # a member of a deleted `Speed` object and a leaderboard of a tag that isn't tracked anymore
+        r.zadd(SpeedLeaderboards.get_key("score", "all"), {"stale": 100})
+        r.sadd(SpeedLeaderboards.tags, "gone")
+        r.zadd(SpeedLeaderboards.get_key("score", "tag:gone"), {str(self.speed.id): 1})
+
+        self.assertEqual(SpeedLeaderboards.rebuild(), 5)
+        speed_ids, count = SpeedLeaderboards.get_page("score", "all", 10)
+        self.assertEqual(count, 5)
+        public_speed_ids = Speed.objects.filter(is_public=True).values_list("id", flat=True)
+        self.assertEqual(set(speed_ids), {str(speed_id) for speed_id in public_speed_ids})
+        # the highest score first
+        self.assertEqual(speed_ids[0], str(self.speed.id))
+        self.assertFalse(r.exists(SpeedLeaderboards.get_key("score", "tag:gone")))
+        self.assertNotIn(b"gone", r.smembers(SpeedLeaderboards.tags))
+
+        self.assertEqual(
+            self.get_boards(self.speed.id, "kmph"),
+            {"all": 2.0, "speed_type:relative": 2.0, "tag:two": 2.0, "tag:five": 2.0, "tag:six": 2.0},
+        )
+        self.assertEqual(
+            SpeedLeaderboards.get_rank("kmph", "speed_type:relative", self.speed.id), (1, 2.0, 3)
+        )
+        # private `Speed` objects aren't ranked
+        self.assertIsNone(
+            SpeedLeaderboards.get_rank("score", "all", "2dbc2429-a8cc-4f80-922a-5dbc4715a76c")
+        )
+
+    def test_sync(self):
+        SpeedLeaderboards.rebuild()
+        self.speed.speed_type = Speed.SpeedType.TOP
+        self.speed.tags = ["one"]
+        SpeedLeaderboards.sync_instance(self.speed)
+        self.assertEqual(
+            self.get_boards(self.speed.id), {"all": 2, "speed_type:top": 2, "tag:one": 2}
+        )
+
+        self.speed.is_public = False
+        SpeedLeaderboards.sync_instance(self.speed)
+        self.assertEqual(self.get_boards(self.speed.id), {})
+        self.assertEqual(self.get_boards(self.speed.id, "kmph"), {})
+
+    def test_set_scores(self):
+        SpeedLeaderboards.rebuild()
+        private_speed_id = "2dbc2429-a8cc-4f80-922a-5dbc4715a76c"
+        SpeedLeaderboards.set_scores({self.speed.id: 10, private_speed_id: 5})
+
+        self.assertEqual(
+            self.get_boards(self.speed.id),
+            {"all": 10, "speed_type:relative": 10, "tag:two": 10, "tag:five": 10, "tag:six": 10},
+        )
+        self.assertEqual(self.get_boards(self.speed.id, "kmph")["all"], 2.0)
+        # `ZADD XX` never adds members
+        self.assertEqual(self.get_boards(private_speed_id), {})
+
+    @override_settings(TESTING=False)
+    def test_setup_periodic_tasks(self):
+        sender = SimpleNamespace(add_periodic_task=Mock())
+        # leaderboards don't depend on random speeds pools
+        with (
+            patch.object(tasks, "cache_random_speeds", side_effect=RedisError("Connection lost.")),
+            patch.object(tasks.HotSpeeds, "rebuild"),
+            patch.object(tasks.SpeedLeaderboards, "rebuild") as rebuild,
+        ):
+            tasks.setup_periodic_tasks(sender)
+        rebuild.assert_called_once()
+        names = [call.kwargs["name"] for call in sender.add_periodic_task.call_args_list]
+        self.assertIn("rebuild leaderboards", names)
+        self.assertNotIn("cache random speeds", names)
+
+
+class HotSpeedsTestCase(CustomAPITestCase):
+    def setUp(self):
+        # don't touch the hot set of a running instance
+        for attr in ("pointer", "prefix"):
+            patcher = patch.object(HotSpeeds, attr, f"test_{getattr(HotSpeeds, attr)}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: r.delete(*r.keys(f"{HotSpeeds.prefix}*"), HotSpeeds.pointer))
+        # fixture votes are older than the window of the hot set
+        SpeedFeedback.objects.update(updated_at=timezone.now())
+        self.speed = Speed.objects.get(pk="d26c8bad-6548-4918-8e63-1bd59579917b")
+        return super().setUp()
+
+    def get_expected_score(self, speed_id) -> None | float:
+        epoch = int(r.get(HotSpeeds.pointer))
+        half_life = HotSpeeds.get_half_life()
+        since = timezone.now() - timedelta(seconds=half_life * HotSpeeds.window_half_lives)
+        scores = SpeedFeedbackQueries.get_hot_scores(epoch, half_life, since, [speed_id])
+        return scores[0][1] if scores else None
+
+    def get_score(self, speed_id) -> None | float:
+        return r.zscore(f"{HotSpeeds.prefix}{int(r.get(HotSpeeds.pointer))}", str(speed_id))
+
+    def test_rebuild(self):
+        self.assertIsNone(HotSpeeds.get_ids(10))
+        # votes are dropped until the set is built
+        HotSpeeds.add(self.speed.id, HotSpeeds.get_vote_changes(None, None, Vote.UPVOTE))
+
+        size = HotSpeeds.rebuild()
+        score = self.get_score(self.speed.id)
+        HotSpeeds.add(self.speed.id, HotSpeeds.get_vote_changes(None, None, Vote.UPVOTE))
+        self.assertGreater(self.get_score(self.speed.id), score)
+        HotSpeeds.rebuild()
+        speed_ids, count = HotSpeeds.get_ids(10)
+        self.assertEqual(count, size)
+        self.assertEqual(len(speed_ids), count)
+        # private `Speed` objects aren't ranked
+        self.assertNotIn("2dbc2429-a8cc-4f80-922a-5dbc4715a76c", speed_ids)
+        # 2 upvotes, the highest score first
+        self.assertEqual(speed_ids[0], str(self.speed.id))
+        self.assertAlmostEqual(self.get_score(self.speed.id), self.get_expected_score(self.speed.id))
+
+        speed_ids, count = HotSpeeds.get_ids(1, offset=1)
+        self.assertEqual((len(speed_ids), count), (1, size))
+
+    def test_delete_feedback(self):
+        HotSpeeds.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            SpeedFeedback.objects.get(user=self.testuserone, speed=self.speed).delete()
+        # the vote is withdrawn with its own weight
+        self.assertAlmostEqual(self.get_score(self.speed.id), self.get_expected_score(self.speed.id))
+
+    def test_hide_and_delete_speed(self):
+        HotSpeeds.rebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.speed.is_public = False
+            self.speed.save()
+        self.assertNotIn(str(self.speed.id), HotSpeeds.get_ids(10)[0])
+
+        speed = Speed.objects.get(pk="66fca277-3329-49aa-96a2-cc240a659549")
+        self.assertIn(str(speed.id), HotSpeeds.get_ids(10)[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            speed.delete()
+        self.assertNotIn(str(speed.id), HotSpeeds.get_ids(10)[0])
+
+
+class RandomSpeedsPoolsTestCase(CustomAPITestCase):
+    def setUp(self):
+        # don't touch pools of a running instance
+        for attr in ("RANDOM_SPEEDS_POOL_PREFIX", "RANDOM_SPEEDS_POOL_POINTER_PREFIX"):
+            patcher = patch.object(services, attr, f"test_{getattr(services, attr)}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.dict(services._random_speeds_pool_versions, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.delete_pools)
+        self.public_speed_ids = {
+            str(speed_id)
+            for speed_id in Speed.objects.filter(is_public=True, score__gt=0).values_list(
+                "id", flat=True
+            )
+        }
+        return super().setUp()
+
+    def delete_pools(self):
+        keys = r.keys("test_random_speeds_pool*")
+        if keys:
+            r.delete(*keys)
+
+    def test_get_random_speeds(self):
+        self.assertEqual(services.get_random_speeds(3), [])
+        services.cache_random_speeds_pool("all", 1200)
+
+        speed_ids = [json.loads(speed)["id"] for speed in services.get_random_speeds(3)]
+        self.assertEqual(len(set(speed_ids)), 3)
+        self.assertLessEqual(set(speed_ids), self.public_speed_ids)
+        # `k` is capped by the size of the pool, sampled objects never repeat
+        speed_ids = [json.loads(speed)["id"] for speed in services.get_random_speeds(1000)]
+        self.assertEqual(len(speed_ids), len(self.public_speed_ids))
+        self.assertEqual(set(speed_ids), self.public_speed_ids)
+
+        # a cached version, a single round trip
+        with patch.object(r, "execute_command", wraps=r.execute_command) as execute_command:
+            self.assertEqual(len(services.get_random_speeds(3)), 3)
+        self.assertEqual(execute_command.call_count, 1)
+        self.assertEqual(execute_command.call_args.args[0], "EVALSHA")
+
+    def test_cache_random_speeds(self):
+        pools = services.get_random_speeds_pools()
+        tags = SpeedQueries.get_popular_tags(settings.SPEEDS["RANDOM_POOL_TAGS"])
+        self.assertIn("two", [tag for tag, _ in tags])
+        self.assertEqual(
+            set(pools),
+            {"all"}
+            | {f"speed_type:{speed_type}" for speed_type in Speed.SpeedType.values}
+            | {f"tag:{tag}" for tag, _ in tags},
+        )
+        services.cache_random_speeds()
+
+        for pool_name, filters in pools.items():
+            queryset = Speed.objects.filter(is_public=True, score__gt=0)
+            if "speed_type" in filters:
+                queryset = queryset.filter(speed_type=filters["speed_type"])
+            if "tag" in filters:
+                queryset = queryset.filter(tags__contains=[filters["tag"]])
+            speed_ids = {
+                json.loads(speed)["id"]
+                for speed in services.get_random_speeds(1000, pool_name)
+            }
+            # pools without `Speed` objects aren't cached, e.g. `speed_type:top`
+            self.assertEqual(
+                speed_ids,
+                {str(speed_id) for speed_id in queryset.values_list("id", flat=True)},
+            )
+
+        # `random-list` is served from the pool of a single speed type or tag
+        url = reverse("speed-random-list")
+        for params, pool_name in (
+            ({"speed_type": "relative"}, "speed_type:relative"),
+            ({"tags": "Two"}, "tag:two"),
+        ):
+            response = self.client.get(url, {**params, "k": 50})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                {result["id"] for result in response.json()["results"]},
+                {json.loads(speed)["id"] for speed in services.get_random_speeds(50, pool_name)},
+            )
@@ -1,14 +1,38 @@
+import json
 import string
+from base64 import b64encode
+from uuid import uuid4
 from unittest.mock import patch
 
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.forms.models import model_to_dict
-from django.db import transaction
+from django.db import transaction, connection
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from django.utils import timezone
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase, override_settings
 
-from ..models import Speed, SpeedFeedback, SpeedBookmark, SpeedReport
+from core.meilisearch import client as ms_client
+from ..models import (
+    Speed,
+    SpeedCounters,
+    SpeedFeedback,
+    SpeedBookmark,
+    SpeedReport,
+    MeilisearchTask,
+    SearchOutbox,
+)
+from ..cache import SpeedFragmentCache, SpeedResponseCache
+from ..serializers import BasicSpeedSerializer
+from ..leaderboards import SpeedLeaderboards, r
+from ..services import (
+    HotSpeeds,
+    cache_random_speeds_pool,
+    get_random_speeds_pool_name,
+)
 
 
 User = get_user_model()
@@ -145,6 +169,150 @@ class SpeedTests(CustomAPITestCase):
         for result in response.data["results"]:
             self.assertEqual(result["user"], "testusertwo")
 
+    def test_speed_list_cursor_pagination(self):
+        url = reverse("speed-list")
+        response = self.client.get(url, {"pagination": "cursor", "page_size": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("count", response.data)
+        self.assertEqual(response.data["previous"], None)
+
+        pages = [response.data["results"]]
+        while response.data["next"] is not None:
+            response = self.client.get(response.data["next"])
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data["results"])
+        self.assertEqual(len(pages), 3)
+
+        ids = [speed["id"] for page in pages for speed in page]
+        self.assertEqual(len(ids), len(set(ids)), 5)
+        self.assertEqual(
+            ids,
+            [
+                str(speed.id)
+                for speed in Speed.objects.filter(is_public=True).order_by(
+                    "-updated_at", "-id"
+                )
+            ],
+        )
+
+        # walks back from the last page
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [speed["id"] for speed in response.data["results"]],
+            [speed["id"] for speed in pages[1]],
+        )
+
+        # filters
+        response = self.client.get(url, {"pagination": "cursor", "tags": "one"})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["next"], None)
+
+        response = self.client.get(url, {"cursor": "invalid"})
+        self.assertEqual(response.status_code, 404)
+        # a tampered cursor
+        cursor = {"r": 0, "u": "2024-01-01T00:00:00+00:00", "i": "not-a-uuid"}
+        response = self.client.get(
+            url, {"cursor": b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii")}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_login(self.testuserone)
+        url = reverse("speed-personal-list")
+        response = self.client.get(url, {"pagination": "cursor"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 3)
+        for result in response.data["results"]:
+            self.assertEqual(result["user"], "testuserone")
+            self.assertIn("user_speed_feedback", result)
+
+    def test_speed_list_fast_serializer(self):
+        # don't touch leaderboards of a running instance
+        for attr in ("prefix", "tags"):
+            patcher = patch.object(
+                SpeedLeaderboards, attr, f"test_{getattr(SpeedLeaderboards, attr)}"
+            )
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(
+            lambda: r.delete(*r.keys(f"{SpeedLeaderboards.prefix}*"), SpeedLeaderboards.tags)
+        )
+        SpeedLeaderboards.rebuild()
+
+        slow_settings = {**settings.SPEEDS, "FAST_LIST_SERIALIZER": False}
+        requests = [
+            (reverse("speed-list"), {}),
+            (reverse("speed-list"), {"tags": "one"}),
+            (reverse("speed-list"), {"page": 1}),
+            (reverse("speed-list"), {"pagination": "cursor", "page_size": 2}),
+            (reverse("speed-leaderboard-list"), {}),
+            (reverse("speed-leaderboard-list"), {"by": "kmph", "k": 1, "offset": 1}),
+        ]
+        for user in (None, self.testuserone, self.testusertwo):
+            if user is None:
+                self.client.logout()
+            else:
+                self.client.force_login(user)
+                requests.append((reverse("speed-personal-list"), {}))
+
+            for url, params in requests:
+                with override_settings(SPEEDS=slow_settings):
+                    expected = self.client.get(url, params, HTTP_ACCEPT="application/json")
+                response = self.client.get(url, params, HTTP_ACCEPT="application/json")
+                self.assertEqual(response.status_code, expected.status_code, 200)
+                # byte-identical
+                self.assertEqual(response.content, expected.content)
+                self.assertTrue(response.json()["results"])
+
+    @override_settings(SPEEDS={**settings.SPEEDS, "FRAGMENT_CACHE": True})
+    def test_speed_list_fragment_cache(self):
+        # don't touch fragments of a running instance
+        patcher = patch.object(SpeedFragmentCache, "prefix", f"test_{SpeedFragmentCache.prefix}")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: r.delete(*r.keys(f"{SpeedFragmentCache.prefix}*")))
+
+        no_fragments_settings = {**settings.SPEEDS, "FRAGMENT_CACHE": False}
+        requests = [
+            (reverse("speed-list"), {}),
+            (reverse("speed-list"), {"pagination": "cursor", "page_size": 2}),
+        ]
+        for user in (None, self.testuserone, self.testusertwo):
+            if user is None:
+                self.client.logout()
+            else:
+                self.client.force_login(user)
+            for url, params in requests:
+                with override_settings(SPEEDS=no_fragments_settings):
+                    expected = self.client.get(url, params, HTTP_ACCEPT="application/json")
+                # the first request stores fragments, the second one assembles the page of them
+                for _ in range(2):
+                    response = self.client.get(url, params, HTTP_ACCEPT="application/json")
+                    self.assertEqual(response.status_code, expected.status_code, 200)
+                    # byte-identical
+                    self.assertEqual(response.content, expected.content)
+
+        speed = Speed.objects.filter(is_public=True).first()
+        key = SpeedFragmentCache.get_key(speed.pk)
+        self.assertTrue(r.exists(key))
+
+        # a fragment of another version of the row is ignored
+        self.client.logout()
+        r.set(key, b'stale|"id":"stale"')
+        response = self.client.get(reverse("speed-list"))
+        self.assertNotIn(b"stale", response.content)
+        self.assertFalse(r.get(key).startswith(b"stale"))
+
+        # a committed change deletes the fragment
+        with self.captureOnCommitCallbacks(execute=True):
+            speed.name = "fragment name changed"
+            speed.save()
+        self.assertFalse(r.exists(key))
+        response = self.client.get(reverse("speed-list"))
+        self.assertIn(
+            "fragment name changed", [result["name"] for result in response.json()["results"]]
+        )
+
     def test_speed_retrieve(self):
         speeds = Speed.objects.all()
         for speed in speeds:
@@ -185,6 +353,157 @@ class SpeedTests(CustomAPITestCase):
                     "`user_speed_feedback` was not found in response' data."
                 )
 
+    def test_speed_sparse_fieldsets(self):
+        speed = Speed.objects.filter(is_public=True).first()
+        detail_url = reverse("speed-detail", kwargs={"pk": str(speed.pk)})
+        for url in (reverse("speed-list"), detail_url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url, {"fields": "id,name,kmph"})
+            self.assertEqual(response.status_code, 200)
+            data = response.data["results"][0] if url != detail_url else response.data
+            self.assertEqual(list(data), ["id", "name", "kmph"])
+            # no `user` join
+            for query in context.captured_queries:
+                self.assertNotIn("JOIN", query["sql"])
+
+            response = self.client.get(url, {"fields": "id,user_speed_feedback"})
+            self.assertEqual(response.status_code, 400)
+
+        self.client.force_login(self.testuserone)
+        for url in (reverse("speed-list"), detail_url):
+            response = self.client.get(url, {"fields": "id,user"})
+            self.assertEqual(response.status_code, 200)
+            data = response.data["results"][0] if url != detail_url else response.data
+            self.assertEqual(list(data), ["id", "user"])
+
+            response = self.client.get(url, {"fields": "url,user_speed_feedback"})
+            data = response.data["results"][0] if url != detail_url else response.data
+            self.assertEqual(list(data), ["url", "user_speed_feedback"])
+
+            response = self.client.get(url, {"fields": "id,unknown"})
+            self.assertEqual(response.status_code, 400)
+
+    def assert_validated_early(self, url: str) -> str:
+        """
+        Checks conditional requests of `url` validated before the main query,
+        returns the probed `ETag`.
+        """
+        # validators aren't probed without conditional headers, an `ETag` of the content
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content_etag = response["ETag"]
+
+        # a matching content, probed validators are sent with `304 Not Modified`
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=content_etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        etag = response["ETag"]
+
+        # validated before the main query and serialization
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+        for query in context.captured_queries:
+            self.assertNotIn('"speeds_speed"."name"', query["sql"])
+
+        # other params, other representation
+        response = self.client.get(url, {"page_size": 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return etag
+
+    def test_speed_conditional_get(self):
+        speed = Speed.objects.filter(is_public=True).first()
+        list_url = reverse("speed-list")
+        detail_url = reverse("speed-detail", kwargs={"pk": str(speed.pk)})
+        for user in (None, self.testuserone):
+            if user is not None:
+                self.client.force_login(user)
+            etag = self.assert_validated_early(detail_url)
+
+            # without generation counters lists are validated by their content once it's built
+            response = self.client.get(list_url)
+            content_etag = response["ETag"]
+            response = self.client.get(list_url, HTTP_IF_NONE_MATCH=content_etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], content_etag)
+
+            speed.score += 1
+            speed.save(update_fields=["score"])
+            response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+            response = self.client.get(list_url, HTTP_IF_NONE_MATCH=content_etag)
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(
+            reverse("speed-detail", kwargs={"pk": "not-an-uuid"}),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(SPEEDS={**settings.SPEEDS, "RESPONSE_CACHE": True})
+    def test_speed_list_conditional_get(self):
+        speed = Speed.objects.filter(is_public=True).first()
+        list_url = reverse("speed-list")
+        for user in (None, self.testuserone):
+            if user is not None:
+                self.client.force_login(user)
+            # validated by generation counters
+            etag = self.assert_validated_early(list_url)
+            with self.captureOnCommitCallbacks(execute=True):
+                speed.name = f"conditional name {user}"
+                speed.save()
+            response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(SPEEDS={**settings.SPEEDS, "RESPONSE_CACHE": True})
+    def test_speed_response_cache(self):
+        speed = Speed.objects.filter(is_public=True).first()
+        # entries of earlier runs (of the same fixture) aren't read again
+        SpeedResponseCache.bump([speed.pk])
+
+        list_url = reverse("speed-list")
+        detail_url = reverse("speed-detail", kwargs={"pk": str(speed.pk)})
+        # another spelling of the same id shares the entry and its generation
+        upper_detail_url = reverse("speed-detail", kwargs={"pk": str(speed.pk).upper()})
+        for url in (list_url, detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            with self.assertNumQueries(0):
+                cached_response = self.client.get(url)
+            self.assertEqual(cached_response.content, response.content)
+        with self.assertNumQueries(0):
+            response = self.client.get(upper_detail_url)
+        self.assertEqual(response.json()["name"], speed.name)
+
+        # a committed change bumps generations of the list and of the speed
+        with self.captureOnCommitCallbacks(execute=True):
+            speed.name = "cached name changed"
+            speed.save()
+        for url in (detail_url, upper_detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response.json()["name"], "cached name changed")
+        response = self.client.get(list_url)
+        self.assertIn(
+            "cached name changed", [result["name"] for result in response.json()["results"]]
+        )
+
+        # a deleted speed isn't served from its cached entry
+        self.assertEqual(self.client.get(detail_url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            speed.delete()
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+        # only successful responses are cached
+        url = reverse("speed-detail", kwargs={"pk": str(uuid4())})
+        for _ in range(2):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse("speed-detail", kwargs={"pk": "not-an-uuid"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
     def test_speed_create(self):
         url = reverse("speed-list")
         data = {
@@ -286,6 +605,49 @@ class SpeedTests(CustomAPITestCase):
         response = self.client.post(url, data, format="json")
         self.assertEqual(response.status_code, 201)
 
+    def test_speed_bulk_create(self):
+        url = reverse("speed-bulk-create")
+        data = {
+            "name": "bulk name",
+            "description": "bulk description",
+            "speed_type": "relative",
+            "tags": ["three", "four"],
+            "kmph": 4.0,
+            "estimated": False,
+        }
+        response = self.client.post(url, [data], format="json")
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(self.testuserone)
+        for invalid_data in ([], data, [data] * (settings.SPEEDS["BULK_CREATE_MAX_SIZE"] + 1)):
+            response = self.client.post(url, invalid_data, format="json")
+            self.assertEqual(response.status_code, 400)
+
+        speeds_count = Speed.objects.count()
+        response = self.client.post(
+            url, [data, {**data, "kmph": -1}, {**data, "name": "bulk name two"}], format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertIn("kmph", response.data["errors"][0]["errors"])
+        self.assertEqual(Speed.objects.count(), speeds_count + 2)
+
+        for representation in response.data["created"]:
+            speed = Speed.objects.get(pk=representation["id"])
+            self.assertEqual(speed.user, self.testuserone)
+            self.assertEqual(speed.score, 1)
+            feedback = SpeedFeedback.objects.get(speed=speed, user=self.testuserone)
+            self.assertEqual(feedback.vote, 1)
+            self.assertEqual(
+                representation["user_speed_feedback"],
+                {"feedback_id": feedback.id, "feedback_vote": 1},
+            )
+
+        response = self.client.post(url, [{**data, "kmph": -1}], format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.data["created"]), 0)
+
     def test_speed_update(self):
         for speed in self.testuserone.speed_set.all():
             url = reverse("speed-detail", kwargs={"pk": str(speed.id)})
@@ -439,8 +801,229 @@ class SpeedTests(CustomAPITestCase):
 
         self.assertEqual(len(self.testuserone.speed_set.all()), 0)
 
+    def test_speed_random_list_params(self):
+        url = reverse("speed-random-list")
+        for k in ("0", "51", "ten"):
+            response = self.client.get(url, {"k": k})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("k", response.data)
+
+        response = self.client.get(url, {"speed_type": "fastest"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("speed_type", response.data)
+        for params in ({"tags": "one,seven"}, {"tags": "one", "speed_type": "top"}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("tags", response.data)
+
+        for seed in ("-1", str(2**31), "abc"):
+            response = self.client.get(url, {"seed": seed})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("seed", response.data)
+        response = self.client.get(url, {"cursor": "not a cursor"})
+        self.assertEqual(response.status_code, 404)
+
+    def cache_test_random_speeds_pool(self, tag: str = "test-pool") -> str:
+        """
+        Caches public `Speed` objects in a pool of an unused tag, pools of a running instance
+        aren't touched. Returns the pool's name.
+        """
+        pool_name = get_random_speeds_pool_name(tag=tag)
+        self.addCleanup(
+            lambda: r.delete(
+                *r.keys(f"random_speeds_pool:{pool_name}:*"),
+                f"random_speeds_pool_current:{pool_name}",
+            )
+        )
+        cache_random_speeds_pool(pool_name, 1200)
+        return pool_name
+
+    def test_speed_random_list(self):
+        self.cache_test_random_speeds_pool()
+        url = reverse("speed-random-list")
+
+        # served from the pool's JSON fragments, without queries
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"tags": "test-pool", "k": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        results = response.json()["results"]
+        self.assertEqual(len({result["id"] for result in results}), 3)
+        # the same body `JSONRenderer` renders from `BasicSpeedSerializer` data
+        speeds = {str(speed.id): speed for speed in Speed.objects.filter(is_public=True)}
+        data = {
+            "count": 3,
+            "next": None,
+            "previous": None,
+            "results": [BasicSpeedSerializer(speeds[result["id"]]).data for result in results],
+        }
+        self.assertEqual(response.content, JSONRenderer().render(data))
+
+        response = self.client.get(url, {"tags": "no-pool"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_speed_random_list_cursor(self):
+        pool_name = self.cache_test_random_speeds_pool()
+        url = reverse("speed-random-list")
+        public_speed_ids = {
+            str(speed_id)
+            for speed_id in Speed.objects.filter(is_public=True, score__gt=0).values_list(
+                "id", flat=True
+            )
+        }
+
+        # pages of a permutation never repeat objects, the last page has no `next` link
+        speed_ids, pages = [], 0
+        response = self.client.get(url, {"tags": "test-pool", "seed": 7, "k": 2})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages += 1
+            speed_ids += [result["id"] for result in response.json()["results"]]
+            if response.json()["next"] is None:
+                break
+            response = self.client.get(response.json()["next"])
+        self.assertEqual(len(speed_ids), len(public_speed_ids))
+        self.assertEqual(set(speed_ids), public_speed_ids)
+        self.assertEqual(pages, (len(public_speed_ids) + 1) // 2)
+
+        # the same seed, the same permutation
+        response = self.client.get(url, {"tags": "test-pool", "seed": 7, "k": 2})
+        self.assertEqual([result["id"] for result in response.json()["results"]], speed_ids[:2])
+        next_link = response.json()["next"]
+
+        # a refreshed pool doesn't change pages of a cursor, until its version expires
+        version = r.get(f"random_speeds_pool_current:{pool_name}")
+        cache_random_speeds_pool(pool_name, 1200)
+        response = self.client.get(next_link)
+        self.assertEqual([result["id"] for result in response.json()["results"]], speed_ids[2:4])
+        r.delete(f"random_speeds_pool:{pool_name}:{version.decode('utf-8')}")
+        response = self.client.get(next_link)
+        self.assertEqual(response.status_code, 410)
+        self.assertIn("seed", response.data["detail"])
+
+        # the expired version is still cached by this process, the pointer is read again
+        response = self.client.get(url, {"tags": "test-pool", "seed": 7, "k": 2})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, {"tags": "test-pool", "k": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_speed_hot_list_params(self):
+        url = reverse("speed-hot-list")
+        for k in ("0", "51", "ten"):
+            response = self.client.get(url, {"k": k})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("k", response.data)
+        for offset in ("-1", "abc"):
+            response = self.client.get(url, {"offset": offset})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("offset", response.data)
+
+    def test_speed_hot_list(self):
+        # don't touch the hot set of a running instance
+        for attr in ("pointer", "prefix"):
+            patcher = patch.object(HotSpeeds, attr, f"test_{getattr(HotSpeeds, attr)}")
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: r.delete(*r.keys(f"{HotSpeeds.prefix}*"), HotSpeeds.pointer))
+        url = reverse("speed-hot-list")
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+        SpeedFeedback.objects.update(updated_at=timezone.now())
+        size = HotSpeeds.rebuild()
+        response = self.client.get(url, {"k": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], size)
+        self.assertEqual(
+            [result["id"] for result in response.data["results"]], HotSpeeds.get_ids(2)[0]
+        )
+        self.assertIsNotNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+        # a hidden speed is withdrawn at once
+        speed = Speed.objects.get(pk=response.data["results"][0]["id"])
+        with self.captureOnCommitCallbacks(execute=True):
+            speed.is_public = False
+            speed.save()
+        response = self.client.get(url, {"k": 2})
+        self.assertEqual(response.data["count"], size - 1)
+        self.assertNotIn(str(speed.id), [result["id"] for result in response.data["results"]])
+
+    def test_speed_leaderboard_params(self):
+        url = reverse("speed-leaderboard-list")
+        rank_url = reverse("speed-rank", kwargs={"pk": "d26c8bad-6548-4918-8e63-1bd59579917b"})
+        for k in ("0", "51", "ten"):
+            response = self.client.get(url, {"k": k})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("k", response.data)
+
+        for params, field in (
+            ({"by": "upvotes"}, "by"),
+            ({"speed_type": "fastest"}, "speed_type"),
+            ({"tags": "one,seven"}, "tags"),
+            ({"tags": "one", "speed_type": "top"}, "tags"),
+        ):
+            for leaderboard_url in (url, rank_url):
+                response = self.client.get(leaderboard_url, params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+
+    @override_settings(
+        MEILISEARCH={
+            "disabled": False,
+            "MASTER_KEY": None,
+            "URL": None,
+            "BATCH_SIZE": 500,
+            "BATCH_WINDOW": 2,
+        },
+    )
+    def test_speed_search_outbox(self):
+        self.client.force_login(self.testuserone)
+        data = {
+            "name": "testuserone name four",
+            "description": "testuserone description four",
+            "speed_type": "relative",
+            "tags": ["three", "four", "nine"],
+            "kmph": 4.0,
+            "estimated": False,
+            "is_public": True,
+        }
+        response = self.client.post(reverse("speed-list"), data, format="json")
+        self.assertEqual(response.status_code, 201)
+
+        url = reverse("speed-detail", kwargs={"pk": response.data["id"]})
+        for kmph in (5.0, 6.0):
+            response = self.client.patch(url, {"kmph": kmph}, format="json")
+            self.assertEqual(response.status_code, 200)
+
+        # repeated changes are coalesced, a pending "add" stays an "add"
+        entries = SearchOutbox.objects.filter(index_name="speeds")
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(str(entries[0].document_id), response.data["id"])
+        self.assertEqual(entries[0].action, "add")
+
+        with patch.object(ms_client, "index") as mock_index:
+            mock_index.return_value.update_documents.return_value.task_uid = 1
+            self.assertEqual(ms_client.drain_outbox("speeds"), 1)
+
+        documents = mock_index.return_value.update_documents.call_args.args[0]
+        self.assertEqual(len(documents), 1)
+        self.assertEqual(documents[0]["kmph"], 6.0)
+        self.assertEqual(documents[0]["user"], "testuserone")
+        self.assertEqual(SearchOutbox.objects.count(), 0)
+        self.assertEqual(
+            [str(speed_id) for speed_id in MeilisearchTask.objects.get(task_uid=1).added_ids],
+            [response.data["id"]],
+        )
+
 
 class SpeedFeedbackTests(CustomAPITestCase):
+    def get_counted_speed(self, pk) -> Speed:
+        # votes are counted in `SpeedCounters` rows, folded into `Speed` rows periodically
+        SpeedCounters.fold()
+        return Speed.objects.get(pk=pk)
+
     def test_speed_feedback_list(self):
         url = reverse("speedfeedback-list")
 
@@ -552,7 +1135,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             self.assertEqual(response.status_code, 201)
             self.assertEqual(response.data["speed"]["score"], speed.score + 1)
 
-            speed_updated = Speed.objects.get(pk="66fca277-3329-49aa-96a2-cc240a659549")
+            speed_updated = self.get_counted_speed("66fca277-3329-49aa-96a2-cc240a659549")
             self.assertEqual(speed_updated.upvotes, speed.upvotes + 1)
 
             transaction.set_rollback(True)
@@ -564,7 +1147,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(response.data["speed"]["score"], speed.score - 1)
 
-        speed_updated = Speed.objects.get(pk="66fca277-3329-49aa-96a2-cc240a659549")
+        speed_updated = self.get_counted_speed("66fca277-3329-49aa-96a2-cc240a659549")
         self.assertEqual(speed_updated.downvotes, speed.downvotes + 1)
 
         # a user attempts to vote second time for the same object
@@ -711,7 +1294,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score + 2)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes + 1)
             self.assertEqual(curr_speed.downvotes, speed_downvotes - 1)
 
@@ -729,7 +1312,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes)
             self.assertEqual(curr_speed.downvotes, speed_downvotes)
 
@@ -747,7 +1330,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score + 1)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes)
             self.assertEqual(curr_speed.downvotes, speed_downvotes - 1)
 
@@ -786,7 +1369,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes)
             self.assertEqual(curr_speed.downvotes, speed_downvotes)
 
@@ -804,7 +1387,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score - 2)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes - 1)
             self.assertEqual(curr_speed.downvotes, speed_downvotes + 1)
 
@@ -822,7 +1405,7 @@ class SpeedFeedbackTests(CustomAPITestCase):
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(response.data["speed"]["score"], speed_score - 1)
-            curr_speed = Speed.objects.get(pk=speed_feedback.speed.id)
+            curr_speed = self.get_counted_speed(speed_feedback.speed.id)
             self.assertEqual(curr_speed.upvotes, speed_upvotes - 1)
             self.assertEqual(curr_speed.downvotes, speed_downvotes)
 
@@ -857,6 +1440,73 @@ class SpeedFeedbackTests(CustomAPITestCase):
             "You do not have permission to perform this action.",
         )
 
+    def test_speed_feedback_batch(self):
+        url = reverse("speedfeedback-batch")
+        data = [
+            # a new vote
+            {"speed": "66fca277-3329-49aa-96a2-cc240a659549", "vote": 1},
+            # a private `Speed` object of another user
+            {"speed": "2dbc2429-a8cc-4f80-922a-5dbc4715a76c", "vote": 1},
+            # a downvote changed to an upvote
+            {"speed": "706efb42-5d91-4115-a52b-3e0c98fb8cd5", "vote": 1},
+            # an unchanged vote
+            {"speed": "e63fe0ca-4235-4a20-9555-2926e353e9e2", "vote": 1},
+            {"speed": "66fca277-3329-49aa-96a2-cc240a659549", "vote": -1},
+            {"speed": "00000000-0000-0000-0000-000000000000", "vote": 1},
+            {"speed": "67e77deb-13d5-43fa-af9f-cc6f1b2a1c5c", "vote": 5},
+        ]
+
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(self.testusertwo)
+        for invalid_data in ([], data[0], data * 20):
+            response = self.client.post(url, invalid_data, format="json")
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result["index"], result["created"]) for result in response.data["results"]],
+            [(0, True), (2, False), (3, False)],
+        )
+        self.assertEqual([error["index"] for error in response.data["errors"]], [1, 4, 5, 6])
+        self.assertEqual(
+            response.data["errors"][0]["errors"]["detail"],
+            "You do not have permission to perform this action.",
+        )
+        # nested representations have counted scores
+        self.assertEqual(response.data["results"][0]["feedback"]["speed"]["score"], 2)
+        self.assertEqual(response.data["results"][1]["feedback"]["speed"]["score"], 2)
+
+        self.assertEqual(
+            SpeedFeedback.objects.get(
+                user=self.testusertwo, speed="66fca277-3329-49aa-96a2-cc240a659549"
+            ).vote,
+            1,
+        )
+        self.assertEqual(
+            SpeedFeedback.objects.get(
+                user=self.testusertwo, speed="706efb42-5d91-4115-a52b-3e0c98fb8cd5"
+            ).vote,
+            1,
+        )
+        self.assertFalse(
+            SpeedFeedback.objects.filter(
+                user=self.testusertwo, speed="2dbc2429-a8cc-4f80-922a-5dbc4715a76c"
+            ).exists()
+        )
+        speed = self.get_counted_speed("706efb42-5d91-4115-a52b-3e0c98fb8cd5")
+        self.assertEqual((speed.upvotes, speed.downvotes, speed.score), (2, 0, 2))
+        speed = self.get_counted_speed("e63fe0ca-4235-4a20-9555-2926e353e9e2")
+        self.assertEqual(speed.score, 1)
+
+        # a new vote with 0 is rejected, nothing is applied
+        response = self.client.post(
+            url, [{"speed": "2dbc2429-a8cc-4f80-922a-5dbc4715a76c", "vote": 0}], format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
     def test_speed_feedback_destroy(self):
         # vote: upvote, user: testuserone, speed: "d26c8bad-6548-4918-8e63-1bd59579917b"
         speed_feedback = SpeedFeedback.objects.get(pk=7)
@@ -1,12 +1,18 @@
+import builtins
+from uuid import UUID
+
 from rest_framework import viewsets, response, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
+from django.http import HttpResponse
 
-from .models import Speed, SpeedFeedback, SpeedBookmark, SpeedReport
+from .models import Speed, SpeedCounters, SpeedFeedback, SpeedBookmark, SpeedReport
 from .permissions import (
     UserIsAuthorized,
     SpeedFeedbackPermissions,
@@ -16,13 +22,29 @@ from .serializers import (
     SpeedBaseHyperlinkedSerializer,
     SpeedHyperlinkedSerializer,
     SpeedFeedbackSerializer,
+    SpeedFeedbackBatchItemSerializer,
     SpeedBookmarkSerializer,
     SpeedReportSerializer,
+    SpeedFastListSerializer,
+    SpeedListRow,
 )
 from core.common.renderers import CustomBrowsableAPIRenderer
 from .queries import SpeedQueries, SpeedFeedbackQueries, SpeedBookmarkQueries
 from .filters import SpeedFilter, SpeedFeedbackFilter, SpeedBookmarkFilter
-from .services import get_random_speeds
+from .services import (
+    get_random_speeds,
+    get_random_speeds_pool_name,
+    get_permuted_random_speeds,
+    render_random_speeds,
+    set_user_speed_data,
+    VoteCounter,
+    HotSpeeds,
+)
+from .pagination import SpeedKeysetPagination, RandomSpeedsPermutationCursor
+from .cache import SpeedResponseCache, SpeedFragmentCache
+from .leaderboards import SpeedLeaderboards
+from .conditional import SpeedConditionalGet
+from .exceptions import Gone
 
 
 class SpeedViewSet(viewsets.ModelViewSet):
@@ -54,6 +76,40 @@ class SpeedViewSet(viewsets.ModelViewSet):
     # custom attribute
     forbidden_object_level_actions = []
 
+    # custom attribute
+    user_speed_data_per_page_actions = [
+        "list",
+        "personal_list",
+        "hot_list",
+        "leaderboard_list",
+    ]
+    # custom attribute
+    keyset_paginated_actions = [
+        "list",
+        "personal_list",
+    ]
+    # custom attribute
+    sparse_fieldset_actions = [
+        "list",
+        "personal_list",
+        "retrieve",
+    ]
+    user_speed_data_fields = (
+        "user_speed_feedback",
+        "user_speed_bookmark",
+    )
+
+    @property
+    def paginator(self):
+        # opt-in keyset pagination, ref: `core.speeds.pagination.SpeedKeysetPagination`
+        if (
+            not hasattr(self, "_paginator")
+            and self.action in self.keyset_paginated_actions
+            and SpeedKeysetPagination.is_requested(self.request)
+        ):
+            self._paginator = SpeedKeysetPagination()
+        return super().paginator
+
     def get_permissions(self):
         if self.action in (
             "list",
@@ -63,18 +119,35 @@ class SpeedViewSet(viewsets.ModelViewSet):
         if self.action in self.object_level_actions or self.action in (
             "personal_list",
             "create",
+            "bulk_create",
         ):
             self.permission_classes = [UserIsAuthorized]
 
         return super().get_permissions()
 
     def get_queryset(self):
+        queryset = self.get_user_queryset()
+        requested_fields = self.get_requested_fields()
+        if requested_fields is not None:
+            queryset = SpeedQueries.get_sparse_fieldset_query(
+                queryset, self.get_serializer_class().get_only_fields(requested_fields)
+            )
+        return queryset
+
+    def get_user_queryset(self):
+        # paginated actions get `user_speed_feedback` and `user_speed_bookmark`
+        # for a page only, ref: `paginate_queryset`
+        with_user_speed_data = (
+            self.requests_fields(*self.user_speed_data_fields)
+            and not self.sets_user_speed_data_per_page()
+        )
+
         if (
             self.action in ("personal_list",)
             and not self.request.user.is_anonymous
         ):
             return SpeedQueries.get_authenticated_user_query(
-                self.request.user, "personal"
+                self.request.user, "personal", with_user_speed_data
             )
 
         if self.request.user.is_anonymous:
@@ -82,11 +155,175 @@ class SpeedViewSet(viewsets.ModelViewSet):
         # an user
         elif not self.request.user.is_admin:
             return SpeedQueries.get_authenticated_user_query(
-                self.request.user, "public_and_personal"
+                self.request.user, "public_and_personal", with_user_speed_data
             )
         # an admin
         else:
-            return SpeedQueries.get_admin_query(self.request.user)
+            return SpeedQueries.get_admin_query(
+                self.request.user, with_user_speed_data
+            )
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.prepare_page(page)
+        return page
+
+    def prepare_page(self, page: list) -> None:
+        if self.sets_user_speed_data_per_page():
+            set_user_speed_data(page, self.request.user)
+        # counters of a sparse fieldset without `score` aren't loaded
+        if self.requests_fields("score"):
+            SpeedCounters.overlay(page)
+            VoteCounter.merge_pending(page)
+
+    def get_object(self):
+        instance = super().get_object()
+        # don't merge for write actions, merged counters would be saved with the instance
+        if self.action == "retrieve" and self.requests_fields("score"):
+            SpeedCounters.overlay([instance])
+            VoteCounter.merge_pending([instance])
+        return instance
+
+    def get_requested_fields(self) -> None | list[str]:
+        """
+        Returns a sparse fieldset (`?fields=id,name,kmph`) of read actions, or `None` for all fields.
+        """
+        if (
+            self.action not in self.sparse_fieldset_actions
+            or "fields" not in self.request.query_params
+        ):
+            return None
+        if not hasattr(self, "_requested_fields"):
+            requested_fields = [
+                field_name.strip()
+                for field_name in self.request.query_params["fields"].split(",")
+                if field_name.strip()
+            ]
+            allowed_fields = self.get_serializer_class().Meta.fields
+            unknown_fields = [
+                field_name
+                for field_name in requested_fields
+                if field_name not in allowed_fields
+            ]
+            if not requested_fields or unknown_fields:
+                raise ValidationError(
+                    {
+                        "fields": "Ensure this value is a comma-separated list of: "
+                        + ", ".join(allowed_fields)
+                        + "."
+                    }
+                )
+            self._requested_fields = requested_fields
+        return self._requested_fields
+
+    def requests_fields(self, *field_names) -> bool:
+        requested_fields = self.get_requested_fields()
+        return requested_fields is None or any(
+            field_name in requested_fields for field_name in field_names
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.get_requested_fields()
+        return context
+
+    def list(self, request, *args, **kwargs):
+        # validators of conditional requests are checked before the response cache,
+        # the main query and serialization
+        return SpeedConditionalGet.respond(
+            request,
+            lambda: SpeedConditionalGet.get_list_validators(self),
+            lambda: self.list_cached(request, *args, **kwargs),
+        )
+
+    def list_cached(self, request, *args, **kwargs):
+        if SpeedResponseCache.is_cacheable(request, self.action):
+            return SpeedResponseCache.get_or_build(
+                request,
+                self.action,
+                lambda: self.list_speeds(request, *args, **kwargs),
+            )
+        return self.list_speeds(request, *args, **kwargs)
+
+    def uses_fast_list_serializer(self) -> bool:
+        """
+        Lists (`list`, `personal_list` and ranked ones) are serialized by `SpeedFastListSerializer`
+        from `.values_list()` rows, unless a format suffix or a sparse fieldset is requested.
+        """
+        return (
+            SpeedFastListSerializer.is_enabled()
+            and not self.format_kwarg
+            and self.get_requested_fields() is None
+        )
+
+    def list_speeds(self, request, *args, **kwargs):
+        if self.paginator is None or not self.uses_fast_list_serializer():
+            return super().list(request, *args, **kwargs)
+
+        queryset = SpeedFastListSerializer.get_values_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = [
+            SpeedListRow(row) for row in super().paginate_queryset(queryset)
+        ]
+        self.prepare_page(page)
+        serializer = SpeedFastListSerializer(page, context=self.get_serializer_context())
+        return self.get_fast_list_response(serializer, self.get_paginated_response)
+
+    def get_fast_list_response(self, serializer, get_response):
+        """
+        Returns `get_response(results)` (a DRF `Response` with `results` as its last key),
+        plain JSON bodies are assembled from pre-encoded representations instead,
+        ref: `SpeedFastListSerializer.render`.
+        """
+        request = self.request
+        if (
+            not SpeedFragmentCache.is_enabled()
+            or type(request.accepted_renderer) is not JSONRenderer
+            or "indent" in request.accepted_media_type
+        ):
+            return get_response(serializer.data)
+
+        envelope = JSONRenderer().render(get_response([]).data)
+        return HttpResponse(
+            envelope[: -len(b"[]}")] + serializer.render() + b"}",
+            content_type="application/json",
+            status=200,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        speed_id = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        # the lookup matches any spelling of a UUID (e.g. uppercase), generations and entries
+        # are keyed by the canonical one, ref: `SpeedResponseCache.bump`
+        try:
+            speed_id = str(UUID(speed_id))
+        except ValueError:
+            # not found, there's nothing to validate or to cache
+            return super().retrieve(request, *args, **kwargs)
+        return SpeedConditionalGet.respond(
+            request,
+            lambda: SpeedConditionalGet.get_detail_validators(self, speed_id),
+            lambda: self.retrieve_cached(request, speed_id, *args, **kwargs),
+        )
+
+    def retrieve_cached(self, request, speed_id, *args, **kwargs):
+        if SpeedResponseCache.is_cacheable(request, self.action):
+            return SpeedResponseCache.get_or_build(
+                request,
+                self.action,
+                lambda: super(SpeedViewSet, self).retrieve(request, *args, **kwargs),
+                speed_id=speed_id,
+            )
+        return super().retrieve(request, *args, **kwargs)
+
+    def sets_user_speed_data_per_page(self) -> bool:
+        return (
+            self.action in self.user_speed_data_per_page_actions
+            and not self.request.user.is_anonymous
+            and self.paginator is not None
+            and self.requests_fields(*self.user_speed_data_fields)
+        )
 
     def get_serializer_class(self):
         if self.request.user.is_anonymous:
@@ -112,8 +349,6 @@ class SpeedViewSet(viewsets.ModelViewSet):
             # If 'prefetch_related' has been applied to a queryset, we need to
             # forcibly invalidate the prefetch cache on the instance.
             instance._prefetched_objects_cache = {}
-        # invokes `to_represent` method resposible for syncing data
-        serializer.data
 
     @action(methods=["get"], detail=False, url_path="personal-list")
     def personal_list(self, request, *args, **kwargs):
@@ -125,15 +360,223 @@ class SpeedViewSet(viewsets.ModelViewSet):
         """
         return self.list(request, *args, **kwargs)
 
+    @action(methods=["post"], detail=False, url_path="bulk")
+    def bulk_create(self, request, *args, **kwargs):
+        """
+        Creates up to `settings.SPEEDS["BULK_CREATE_MAX_SIZE"]` `Speed` objects from a list,
+        ref: `SpeedHyperlinkedSerializer.bulk_create`.
+        Invalid items don't fail the batch, they are reported by their index in `errors`.
+        """
+        max_size = settings.SPEEDS["BULK_CREATE_MAX_SIZE"]
+        if not isinstance(request.data, list) or not 1 <= len(request.data) <= max_size:
+            raise ValidationError(
+                {"non_field_errors": f"Ensure this value is a list of 1 to {max_size} items."}
+            )
+
+        validated_data_list, errors = [], []
+        for index, data in enumerate(request.data):
+            serializer = self.get_serializer(data=data)
+            if serializer.is_valid():
+                validated_data_list.append(serializer.validated_data)
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        instances = SpeedHyperlinkedSerializer.bulk_create(
+            validated_data_list, request.user
+        )
+        serializer = self.get_serializer(instances, many=True)
+        return response.Response(
+            {"created": serializer.data, "errors": errors},
+            status=status.HTTP_201_CREATED if instances else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(methods=["get"], detail=False, url_path="hot")
+    def hot_list(self, request, *args, **kwargs):
+        """
+        An endpoint that retrieves public `Speed` objects ranked by a time-decayed score
+        of their votes, ref: `core.speeds.services.HotSpeeds`.
+        Ids are read from a Redis sorted set (`?k=10&offset=0`), only the page's rows are queried.
+        """
+        k, offset = self.get_ranked_page_params(settings.SPEEDS["HOT_LIST_MAX_SIZE"])
+
+        hot = HotSpeeds.get_ids(k, offset)
+        if hot is None:
+            data = {"message": "Data not available. Please try again later."}
+            return response.Response(data=data, status=404)
+        # members of `Speed` objects that are no longer public are dropped by the next rebuild
+        return self.get_ranked_response(*hot, k, offset)
+
+    @action(methods=["get"], detail=False, url_path="leaderboard")
+    def leaderboard_list(self, request, *args, **kwargs):
+        """
+        An endpoint that retrieves public `Speed` objects ranked by `score` or by `kmph`
+        (`?by=kmph`), optionally of a single `speed_type` or a single popular tag
+        (`?speed_type=top` or `?tags=car`), ref: `core.speeds.leaderboards.SpeedLeaderboards`.
+        Ids are read from a Redis sorted set (`?k=10&offset=0`), only the page's rows are queried.
+        """
+        k, offset = self.get_ranked_page_params(settings.SPEEDS["LEADERBOARD_MAX_SIZE"])
+        metric = self.get_leaderboard_metric()
+        board = self.get_pool_name("Leaderboards")
+
+        speed_ids, count = SpeedLeaderboards.get_page(metric, board, k, offset)
+        if not count:
+            data = {"message": "Data not available. Please try again later."}
+            return response.Response(data=data, status=404)
+        return self.get_ranked_response(speed_ids, count, k, offset)
+
+    @action(methods=["get"], detail=True, url_path="rank")
+    def rank(self, request, *args, **kwargs):
+        """
+        An endpoint that retrieves the rank (1-based) of a public `Speed` object on a leaderboard
+        with the same params as `leaderboard`, a single `ZREVRANK` without database queries.
+        """
+        metric = self.get_leaderboard_metric()
+        board = self.get_pool_name("Leaderboards")
+        speed_id = kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+        ranked = SpeedLeaderboards.get_rank(metric, board, speed_id)
+        if ranked is None:
+            return response.Response(data={"detail": "Not found."}, status=404)
+        rank, value, count = ranked
+        return response.Response(
+            {
+                "id": speed_id,
+                "leaderboard": board,
+                "by": metric,
+                "rank": rank + 1,
+                metric: int(value) if metric == "score" else value,
+                "count": count,
+            }
+        )
+
+    def get_ranked_page_params(self, max_k: int) -> tuple[int, int]:
+        """
+        Returns validated `k` and `offset` query params of ranked lists.
+        """
+        params = {}
+        for name, default in (("k", 10), ("offset", 0)):
+            try:
+                params[name] = int(self.request.query_params.get(name, default))
+            except ValueError:
+                raise ValidationError({name: "A valid integer is required."})
+        k, offset = params["k"], params["offset"]
+        if not 1 <= k <= max_k:
+            raise ValidationError({"k": f"Ensure this value is between 1 and {max_k}."})
+        if offset < 0:
+            raise ValidationError({"offset": "Ensure this value is greater than or equal to 0."})
+        return k, offset
+
+    def get_leaderboard_metric(self) -> str:
+        metric = self.request.query_params.get("by", "score")
+        if metric not in SpeedLeaderboards.metrics:
+            raise ValidationError({"by": f'"{metric}" is not a valid choice.'})
+        return metric
+
+    def get_pool_name(self, subject: str) -> str:
+        """
+        Returns the name of a random speeds pool (or a leaderboard) of a single `speed_type`
+        or a single tag query param.
+        """
+        speed_type = self.request.query_params.get("speed_type")
+        if speed_type is not None and speed_type not in Speed.SpeedType.values:
+            raise ValidationError({"speed_type": f'"{speed_type}" is not a valid choice.'})
+        tags = [
+            tag.strip()
+            for tag in self.request.query_params.get("tags", "").lower().split(",")
+            if tag.strip()
+        ]
+        if len(tags) > 1 or (tags and speed_type is not None):
+            raise ValidationError(
+                {"tags": f"{subject} can be filtered by a single `speed_type` or a single tag."}
+            )
+        return get_random_speeds_pool_name(
+            speed_type=speed_type, tag=tags[0] if tags else None
+        )
+
+    def get_ranked_response(
+        self, speed_ids: builtins.list[str], count: int, k: int, offset: int
+    ):
+        """
+        Serializes a page of ranked ids (in their order) with offset links,
+        ids of `Speed` objects that aren't visible anymore are skipped.
+        """
+        queryset = self.get_queryset().filter(is_public=True)
+        fast = self.uses_fast_list_serializer()
+        if fast:
+            speeds = {
+                row.id: SpeedListRow(row)
+                for row in SpeedFastListSerializer.get_values_queryset(
+                    queryset.filter(id__in=speed_ids)
+                )
+            }
+        else:
+            speeds = queryset.in_bulk(speed_ids)
+        page = [speeds[speed_id] for speed_id in map(UUID, speed_ids) if speed_id in speeds]
+        self.prepare_page(page)
+
+        url = self.request.build_absolute_uri()
+        next_link, previous_link = None, None
+        if offset + k < count:
+            next_link = replace_query_param(url, "offset", offset + k)
+        if offset > 0:
+            previous_link = (
+                replace_query_param(url, "offset", offset - k)
+                if offset - k > 0
+                else remove_query_param(url, "offset")
+            )
+
+        def get_response(results):
+            return response.Response(
+                {
+                    "count": count,
+                    "next": next_link,
+                    "previous": previous_link,
+                    "results": results,
+                }
+            )
+
+        if fast:
+            serializer = SpeedFastListSerializer(page, context=self.get_serializer_context())
+            return self.get_fast_list_response(serializer, get_response)
+        return get_response(self.get_serializer(page, many=True).data)
+
     @action(methods=["get"], detail=False, url_path="random-list")
     def random_list(self, request, *args, **kwargs):
         """
         An endpoint that retrieves a collection of random public Speed objects
-        stored in the Redis cache.
+        stored in the Redis cache, optionally of a single `speed_type` or a single popular tag
+        (`?speed_type=top` or `?tags=car`).
+        With `?seed=<int>` the pool is paged through without repeats, follow the `next` link.
         """
-        random_speeds_ord_dict = get_random_speeds()
-        if random_speeds_ord_dict["count"] > 0:
-            return response.Response(data=random_speeds_ord_dict, status=200)
+        max_k = settings.SPEEDS["RANDOM_LIST_MAX_SIZE"]
+        try:
+            k = int(request.query_params.get("k", 10))
+        except ValueError:
+            raise ValidationError({"k": "A valid integer is required."})
+        if not 1 <= k <= max_k:
+            raise ValidationError({"k": f"Ensure this value is between 1 and {max_k}."})
+
+        pool_name = self.get_pool_name("Random speeds")
+        next_link = None
+        if RandomSpeedsPermutationCursor.is_requested(request):
+            # non-repeating pages of the pool, `next` continues the same permutation
+            random_speeds_list, next_state = get_permuted_random_speeds(
+                k, **RandomSpeedsPermutationCursor.decode(request), pool_name=pool_name
+            )
+            # pools are refreshed every few hours, a previous version expires shortly after
+            if random_speeds_list is None:
+                raise Gone(RandomSpeedsPermutationCursor.expired_cursor_message)
+            next_link = RandomSpeedsPermutationCursor.get_next_link(request, next_state)
+        else:
+            random_speeds_list = get_random_speeds(k, pool_name)
+
+        if random_speeds_list:
+            # cached fragments are already JSON, they skip serializers and renderers
+            return HttpResponse(
+                render_random_speeds(random_speeds_list, next_link),
+                content_type="application/json",
+                status=200,
+            )
         else:
             data = {"message": "Data not available. Please try again later."}
             return response.Response(data=data, status=404)
@@ -189,6 +632,44 @@ class SpeedFeedbackViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @action(methods=["post"], detail=False, url_path="batch")
+    def batch(self, request, *args, **kwargs):
+        """
+        Creates or updates votes of up to `settings.SPEEDS["FEEDBACK_BATCH_MAX_SIZE"]`
+        `{"speed", "vote"}` items in one transaction, ref: `SpeedFeedbackSerializer.batch_vote`.
+        Invalid items don't fail the batch, they are reported by their index in `errors`.
+        """
+        max_size = settings.SPEEDS["FEEDBACK_BATCH_MAX_SIZE"]
+        if not isinstance(request.data, list) or not 1 <= len(request.data) <= max_size:
+            raise ValidationError(
+                {"non_field_errors": f"Ensure this value is a list of 1 to {max_size} items."}
+            )
+
+        items, errors = [], []
+        for index, data in enumerate(request.data):
+            serializer = SpeedFeedbackBatchItemSerializer(data=data)
+            if serializer.is_valid():
+                items.append((index, serializer.validated_data))
+            else:
+                errors.append({"index": index, "errors": serializer.errors})
+
+        results, item_errors = SpeedFeedbackSerializer.batch_vote(items, request.user)
+        errors = sorted(errors + item_errors, key=lambda error: error["index"])
+        return response.Response(
+            {
+                "results": [
+                    {
+                        "index": index,
+                        "created": created,
+                        "feedback": self.get_serializer(instance).data,
+                    }
+                    for index, instance, created in results
+                ],
+                "errors": errors,
+            },
+            status=status.HTTP_200_OK if results else status.HTTP_400_BAD_REQUEST,
+        )
+
 
 class SpeedBookmarkViewSet(viewsets.ModelViewSet):
     """